@@ -3,9 +3,11 @@ import yaml
 from flask import Flask, jsonify
 from flasgger import Swagger
 from .prints.swagger.swag import SwaggerDoc
+from .cache import cache
 from .db import db
 from .elastic import elastic
-from .prints import base, search, uuid
+from .prints import base, export, search, uuid
+from sessionManager import SessionManager
 
 def loadConfig():
     with open('config.yaml-dist', 'r') as yamlFile:
@@ -13,7 +15,8 @@ def loadConfig():
         for section in config:
             sectionDict = config[section]
             for key, value in sectionDict.items():
-                os.environ[key] = value
+                if value is None: continue
+                os.environ[key] = str(value)
 
 try:
     loadConfig()
@@ -24,13 +27,11 @@ application = Flask(__name__)
 application.register_blueprint(base.bp)
 application.register_blueprint(search.search)
 application.register_blueprint(uuid.uuid)
-application.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://{}:{}@{}:{}/{}'.format(
-    os.environ['DB_USER'],
-    os.environ['DB_PSWD'],
-    os.environ['DB_HOST'],
-    os.environ['DB_PORT'],
-    os.environ['DB_NAME']
-)
+application.register_blueprint(export.export)
+dbManager = SessionManager()
+application.config['SQLALCHEMY_DATABASE_URI'] = dbManager.databaseURL()\
+    .render_as_string(hide_password=False)
+application.config['SQLALCHEMY_ENGINE_OPTIONS'] = dbManager.engineOptions()
 application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 application.config['ELASTICSEARCH_INDEX_URI'] = '{}:{}'.format(
@@ -41,5 +42,6 @@ application.config['ELASTICSEARCH_INDEX_URI'] = '{}:{}'.format(
 application.config['SWAGGER'] = {'title': 'CCE Search'}
 db.init_app(application)
 elastic.init_app(application)
+cache.init_app(application)
 docs = SwaggerDoc()
 swagger = Swagger(application, template=docs.getDocs())
@@ -0,0 +1,178 @@
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+from flask import make_response, request
+from werkzeug.http import is_resource_modified
+
+from api.db import db
+from helpers.generation import GenerationManager
+
+
+class LRUCache():
+    """An in-process cache holding at most maxSize values, each for at most
+    ttl seconds. When full the least recently used value is dropped."""
+    def __init__(self, maxSize, ttl):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            cached = self.values.get(key, None)
+            if cached is None: return None
+            expires, value = cached
+            if expires < time.monotonic():
+                del self.values[key]
+                return None
+            self.values.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.values[key] = (time.monotonic() + self.ttl, value)
+            self.values.move_to_end(key)
+            while len(self.values) > self.maxSize:
+                self.values.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+class RedisCache():
+    """A cache shared between API processes, stored in Redis as JSON with
+    an expiry of ttl seconds. This requires the redis package."""
+    def __init__(self, url, ttl, prefix='bardo'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get('{}:{}'.format(self.prefix, key))
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(
+            '{}:{}'.format(self.prefix, key),
+            json.dumps(value, default=str),
+            ex=self.ttl
+        )
+
+    def clear(self):
+        for key in self.client.scan_iter('{}:*'.format(self.prefix)):
+            self.client.delete(key)
+
+
+class ResponseCache():
+    """Caches the response data for single record lookups, keyed by the
+    type of lookup, the record's uuid and any options that change the
+    response. Keys include the data generation, which the loader advances
+    after each run that changes the data, so a new generation makes every
+    earlier response unreachable; these then age out of the cache. The
+    generation is read from the database at most once every
+    API_CACHE_GENERATION_INTERVAL seconds.
+
+    Responses are held in an LRU cache in each process of up to
+    API_CACHE_SIZE responses for API_CACHE_TTL seconds, or in Redis if
+    API_CACHE_REDIS_URL is set. Setting API_CACHE_SIZE to 0 disables caching.
+    """
+    def __init__(self):
+        self.backend = None
+        self.generationInterval = 60
+        self.generation = None
+        self.generationModified = None
+        self.generationChecked = None
+
+    def init_app(self, app):
+        cacheSize = int(os.environ.get('API_CACHE_SIZE', 10000))
+        ttl = int(os.environ.get('API_CACHE_TTL', 86400))
+        redisURL = os.environ.get('API_CACHE_REDIS_URL', None)
+        self.generationInterval = int(
+            os.environ.get('API_CACHE_GENERATION_INTERVAL', 60)
+        )
+
+        if redisURL:
+            self.backend = RedisCache(redisURL, ttl)
+        elif cacheSize > 0:
+            self.backend = LRUCache(cacheSize, ttl)
+        else:
+            self.backend = None
+
+    def currentGeneration(self, session):
+        now = time.monotonic()
+        if (
+            self.generationChecked is None
+            or now - self.generationChecked >= self.generationInterval
+        ):
+            self.generation, self.generationModified = GenerationManager(
+                session
+            ).current()
+            self.generationChecked = now
+        return self.generation
+
+    def validators(self, session):
+        """Return the ETag and Last-Modified time shared by every response,
+        which change with the data generation. The ETag includes the time the
+        generation was set, so that it is never repeated even if the counter
+        is reset by recreating the database. Local modification times are
+        converted to UTC."""
+        generation = self.currentGeneration(session)
+        if self.generationModified is None:
+            return 'gen-{}'.format(generation), None
+
+        etag = 'gen-{}-{}'.format(
+            generation, int(self.generationModified.timestamp() * 1000000)
+        )
+        lastModified = self.generationModified.astimezone(timezone.utc)\
+            .replace(microsecond=0)
+        return etag, lastModified
+
+    def fetch(self, session, lookup, uuid, options, loadResponse):
+        """Return the cached response for a lookup, or load it with
+        loadResponse and cache it. Lookups that raise an error, such as for
+        a uuid that does not exist, are not cached."""
+        if self.backend is None: return loadResponse()
+
+        key = '{}:{}:{}:{}'.format(
+            self.currentGeneration(session), lookup, str(uuid).lower(),
+            ','.join('{}={}'.format(k, v) for k, v in sorted(options.items()))
+        )
+        response = self.backend.get(key)
+        if response is None:
+            response = loadResponse()
+            self.backend.set(key, response)
+        return response
+
+
+cache = ResponseCache()
+
+
+def conditional(view):
+    """Answer conditional GET requests for a view with a 304 if the data
+    generation has not changed since the client's copy, before the view
+    queries ElasticSearch or the database, and add the ETag and
+    Last-Modified headers to successful responses. The ETag is weak, as results
+    with equal scores may be returned in a different order."""
+    @wraps(view)
+    def conditionalView(*args, **kwargs):
+        etag, lastModified = cache.validators(db.session)
+        if not is_resource_modified(
+            request.environ, etag=etag, last_modified=lastModified
+        ):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+
+        if response.status_code in (200, 304):
+            response.set_etag(etag, weak=True)
+            if lastModified is not None: response.last_modified = lastModified
+        return response
+    return conditionalView
@@ -1,9 +1,14 @@
+from uuid import UUID
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import configure_mappers, selectinload
 
+from helpers.records import uuidKey
+from helpers.serialize import entryOptions
 from model.cce import CCE
 from model.errorCCE import ErrorCCE
 from model.registration import Registration
-from model.renewal import Renewal, RENEWAL_REG
+from model.renewal import Renewal
 from model.volume import Volume
 
 
@@ -14,15 +19,58 @@ class QueryManager():
     def __init__(self, session):
         self.session = session
     
-    def registrationQuery(self, uuid):
-        return self.session.query(CCE)\
-                .outerjoin(Registration, RENEWAL_REG, Renewal)\
-                .filter(CCE.uuid == uuid).one()
-    
-    def renewalQuery(self, uuid):
-        return self.session.query(Renewal)\
-            .outerjoin(RENEWAL_REG, Registration, CCE)\
-            .filter(Renewal.uuid == uuid).one()
-    
-    def orphanRenewalQuery(self, uuid):
-        return self.session.query(Renewal).filter(Renewal.uuid == uuid).one()
\ No newline at end of file
+    def hydrateHits(self, hits, xml=False, renewalEntries=False):
+        """Load the database records for a page of search hits, returning
+        (index, record) pairs in the order of the hits. Entries and renewals
+        are each loaded with a single IN query, with their related records
+        eagerly loaded, rather than with a query per hit. Hits that have no
+        matching record in the database are skipped."""
+        entryUUIDs = [h.uuid for h in hits if h.meta.index == 'cce']
+        renewalUUIDs = [h.uuid for h in hits if h.meta.index != 'cce']
+
+        entries = self.hydrateEntries(entryUUIDs, xml=xml)
+        renewals = self.hydrateRenewals(
+            renewalUUIDs, entries=renewalEntries, xml=xml
+        )
+
+        records = []
+        for hit in hits:
+            recMap = entries if hit.meta.index == 'cce' else renewals
+            rec = recMap.get(uuidKey(hit.uuid), None)
+            if rec is None: continue
+            records.append((hit.meta.index, rec))
+        return records
+
+    def hydrateEntries(self, uuids, xml=False):
+        configure_mappers()
+        return self.loadByUUID(CCE, uuids, QueryManager.entryOptions(xml))
+
+    def hydrateRenewals(self, uuids, entries=False, xml=False):
+        configure_mappers()
+        loadOptions = [selectinload(Renewal.claimants)]
+        if entries:
+            loadOptions.append(
+                selectinload(Renewal.registrations)
+                    .selectinload(Registration.cce)
+                    .options(*QueryManager.entryOptions(xml))
+            )
+        return self.loadByUUID(Renewal, uuids, loadOptions)
+
+    def loadByUUID(self, model, uuids, loadOptions):
+        validUUIDs = set(uuidKey(u) for u in uuids)
+        validUUIDs.discard(None)
+        if len(validUUIDs) < 1: return {}
+
+        recQuery = self.session.query(model)\
+            .filter(model.uuid.in_([UUID(u) for u in validUUIDs]))\
+            .order_by(model.id)\
+            .options(*loadOptions)
+
+        records = {}
+        for rec in recQuery.all():
+            records.setdefault(str(rec.uuid), rec)
+        return records
+
+    @staticmethod
+    def entryOptions(xml=False):
+        return entryOptions(xml=xml)
@@ -16,42 +16,42 @@ class Elastic():
         s = Search(using=self.client, index=index)
         return s
 
-    def query_regnum(self, regnum, page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_regnum(self, regnum, page=0, perPage=10, cursor=None):
         search = self.create_search('cce')
         nestedQ = Q('term', registrations__regnum=regnum)
-        nestedSearch = search.query('nested', path='registrations', query=nestedQ)[startPos:endPos]
-        return nestedSearch.execute()
+        nestedSearch = search.query('nested', path='registrations', query=nestedQ)
+        return Elastic.paginate(nestedSearch, page, perPage, cursor).execute()
     
-    def query_rennum(self, rennum, page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_rennum(self, rennum, page=0, perPage=10, cursor=None):
         search = self.create_search('ccr')
-        renewalSearch = search.query('term', rennum=rennum)[startPos:endPos]
-        return renewalSearch.execute()
+        renewalSearch = search.query('term', rennum=rennum)
+        return Elastic.paginate(renewalSearch, page, perPage, cursor).execute()
     
-    def query_fulltext(self, queryText, page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_fulltext(self, queryText, page=0, perPage=10, cursor=None):
         search = self.create_search('cce,ccr')
-        renewalSearch = search.query('query_string', query=queryText)[startPos:endPos]
-        return renewalSearch.execute()
+        renewalSearch = search.query('query_string', query=queryText)
+        return Elastic.paginate(renewalSearch, page, perPage, cursor).execute()
+
+    def query_uuids(self, index, uuids):
+        """Return the documents with any of the given uuids"""
+        search = self.create_search(index)
+        uuidSearch = search.query('terms', uuid=list(uuids))
+        return uuidSearch[0:len(uuids)].execute()
 
     #New Query Types
-    def query_title(self, queryText,page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_title(self, queryText,page=0, perPage=10, cursor=None):
         search = self.create_search('cce,ccr')
-        titleSearch = search.query('match', title=queryText)[startPos:endPos]
-        return titleSearch.execute()
+        titleSearch = search.query('match', title=queryText)
+        return Elastic.paginate(titleSearch, page, perPage, cursor).execute()
 
-    def query_author(self, queryText,page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_author(self, queryText,page=0, perPage=10, cursor=None):
         search = self.create_search('cce,ccr')
-        titleSearch = search.query('match', authors=queryText)[startPos:endPos]
-        return titleSearch.execute()
+        titleSearch = search.query('match', authors=queryText)
+        return Elastic.paginate(titleSearch, page, perPage, cursor).execute()
 
 
     # If query is given for publisher field, don't check renewals?
-    def query_multifields(self, params, page=0, perPage=10):
-        startPos, endPos = Elastic.getFromSize(page, perPage)
+    def query_multifields(self, params, page=0, perPage=10, cursor=None):
         if "publishers" in params:
             search = self.create_search('cce')
             search = search.query('match', publishers=params["publishers"])
@@ -61,10 +61,26 @@ class Elastic():
             search = search.query('match', title=params['title'])
         if "authors" in params:
             search = search.query('match', authors=params['authors'])
-        titleSearch = search[startPos:endPos]
-        return titleSearch.execute()
+        return Elastic.paginate(search, page, perPage, cursor).execute()
+
+
+    @staticmethod
+    def paginate(search, page, perPage, cursor=None):
+        """Select a page of results. Without a cursor this is page number
+        page, fetched with from and size, which gets slower with each page
+        and cannot go past the index's max_result_window. With a cursor the
+        results are sorted by score and then uuid, a stable order, and the
+        page starts after the sort values in the cursor (or at the first
+        result for an empty cursor) with search_after, so every page costs
+        the same to fetch."""
+        if cursor is None:
+            startPos, endPos = Elastic.getFromSize(page, perPage)
+            return search[startPos:endPos]
+
+        search = search.sort('_score', {'uuid': 'asc'})[0:perPage]
+        if len(cursor) > 0: search = search.extra(search_after=cursor)
+        return search
 
-    
     @staticmethod
     def getFromSize(page, perPage):
         startPos = page * perPage
@@ -0,0 +1,29 @@
+from flask import Blueprint, Response, request, stream_with_context
+from werkzeug.exceptions import BadRequest
+
+from api.cache import conditional
+from api.db import db
+from exporter import Exporter
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+
+@export.route('/<recordType>', methods=['GET'])
+@conditional
+def exportQuery(recordType):
+    outFormat = request.args.get('format', 'ndjson')
+    try:
+        exporter = Exporter(db.session, recordType, outFormat)
+    except ValueError as err:
+        raise BadRequest(str(err))
+
+    compress = request.accept_encodings['gzip'] > 0
+    exportResponse = Response(
+        stream_with_context(exporter.chunks(compress=compress)),
+        mimetype=Exporter.contentTypes[outFormat]
+    )
+    exportResponse.headers['Content-Disposition'] = \
+        'attachment; filename={}.{}'.format(recordType, outFormat)
+    exportResponse.vary.add('Accept-Encoding')
+    if compress: exportResponse.content_encoding = 'gzip'
+    return exportResponse
@@ -1,8 +1,8 @@
 from flask import (
     Blueprint, request, session, url_for, redirect, current_app, jsonify
 )
-from sqlalchemy.orm.exc import NoResultFound
 
+from api.cache import conditional
 from api.db import db, QueryManager
 from api.elastic import elastic
 from api.response import MultiResponse
@@ -10,12 +10,15 @@ from api.response import MultiResponse
 search = Blueprint('search', __name__, url_prefix='/search')
 
 @search.route('/multi', methods=['GET'])
+@conditional
 def multiQuery():
     title = request.args.get('title', '')
     authors = request.args.get('authors', '')
     publishers = request.args.get('publishers','')
     sourceReturn = request.args.get('source', False)
+    view = request.args.get('view', 'full')
     page, perPage = MultiResponse.parsePaging(request.args)
+    cursor = MultiResponse.parseCursor(request.args)
     queries = {}
     if title!="*" and title!="":
         queries["title"]=title
@@ -23,203 +26,162 @@ def multiQuery():
         queries["authors"]=authors
     if publishers!="*" and publishers!="":
         queries["publishers"]=publishers
-    matchingDocs = elastic.query_multifields(queries, page=page, perPage=perPage)
+    matchingDocs = elastic.query_multifields(
+        queries, page=page, perPage=perPage, cursor=cursor
+    )
     textResponse = MultiResponse(
         'text',
         matchingDocs.hits.total,
         request.base_url,
         queries,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        if entry.meta.index == 'cce':
-            dbEntry = qManager.registrationQuery(entry.uuid)
-            textResponse.addResult(MultiResponse.parseEntry(
-                dbEntry, 
-                xml=sourceReturn
-            ))
-        else:
-            try:
-                dbRenewal = qManager.renewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
-            except NoResultFound:
-                dbRenewal = qManager.orphanRenewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
+    addHitResults(textResponse, matchingDocs, sourceReturn, view)
 
+    textResponse.setNextCursor(matchingDocs)
     textResponse.createDataBlock()    
     return jsonify(textResponse.createResponse(200))
 
 @search.route('/author', methods=['GET'])
+@conditional
 def authorQuery():
     queryText = request.args.get('query', '')
     sourceReturn = request.args.get('source', False)
+    view = request.args.get('view', 'full')
     page, perPage = MultiResponse.parsePaging(request.args)
-    matchingDocs = elastic.query_author(queryText, page=page, perPage=perPage)
+    cursor = MultiResponse.parseCursor(request.args)
+    matchingDocs = elastic.query_author(
+        queryText, page=page, perPage=perPage, cursor=cursor
+    )
     textResponse = MultiResponse(
         'text',
         matchingDocs.hits.total,
         request.base_url,
         queryText,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        if entry.meta.index == 'cce':
-            dbEntry = qManager.registrationQuery(entry.uuid)
-            textResponse.addResult(MultiResponse.parseEntry(
-                dbEntry, 
-                xml=sourceReturn
-            ))
-        else:
-            try:
-                dbRenewal = qManager.renewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
-            except NoResultFound:
-                dbRenewal = qManager.orphanRenewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
+    addHitResults(textResponse, matchingDocs, sourceReturn, view)
 
+    textResponse.setNextCursor(matchingDocs)
     textResponse.createDataBlock()    
     return jsonify(textResponse.createResponse(200))
 
 @search.route('/title', methods=['GET'])
+@conditional
 def titleQuery():
     queryText = request.args.get('query', '')
     sourceReturn = request.args.get('source', False)
+    view = request.args.get('view', 'full')
     page, perPage = MultiResponse.parsePaging(request.args)
-    matchingDocs = elastic.query_title(queryText, page=page, perPage=perPage)
+    cursor = MultiResponse.parseCursor(request.args)
+    matchingDocs = elastic.query_title(
+        queryText, page=page, perPage=perPage, cursor=cursor
+    )
     textResponse = MultiResponse(
         'text',
         matchingDocs.hits.total,
         request.base_url,
         queryText,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        if entry.meta.index == 'cce':
-            dbEntry = qManager.registrationQuery(entry.uuid)
-            textResponse.addResult(MultiResponse.parseEntry(
-                dbEntry, 
-                xml=sourceReturn
-            ))
-        else:
-            try:
-                dbRenewal = qManager.renewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
-            except NoResultFound:
-                dbRenewal = qManager.orphanRenewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
+    addHitResults(textResponse, matchingDocs, sourceReturn, view)
 
+    textResponse.setNextCursor(matchingDocs)
     textResponse.createDataBlock()    
     return jsonify(textResponse.createResponse(200))
 
 @search.route('/fulltext', methods=['GET'])
+@conditional
 def fullTextQuery():
     queryText = request.args.get('query', '')
     sourceReturn = request.args.get('source', False)
+    view = request.args.get('view', 'full')
     page, perPage = MultiResponse.parsePaging(request.args)
-    matchingDocs = elastic.query_fulltext(queryText, page=page, perPage=perPage)
+    cursor = MultiResponse.parseCursor(request.args)
+    matchingDocs = elastic.query_fulltext(
+        queryText, page=page, perPage=perPage, cursor=cursor
+    )
     textResponse = MultiResponse(
         'text',
         matchingDocs.hits.total,
         request.base_url,
         queryText,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        if entry.meta.index == 'cce':
-            dbEntry = qManager.registrationQuery(entry.uuid)
-            textResponse.addResult(MultiResponse.parseEntry(
-                dbEntry, 
-                xml=sourceReturn
-            ))
-        else:
-            try:
-                dbRenewal = qManager.renewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
-            except NoResultFound:
-                dbRenewal = qManager.orphanRenewalQuery(entry.uuid)
-                textResponse.addResult(MultiResponse.parseRenewal(
-                    dbRenewal,
-                    source=sourceReturn
-                ))
+    addHitResults(textResponse, matchingDocs, sourceReturn, view)
 
+    textResponse.setNextCursor(matchingDocs)
     textResponse.createDataBlock()    
     return jsonify(textResponse.createResponse(200))
 
 
 @search.route('/registration/<regnum>', methods=['GET'])
+@conditional
 def regQuery(regnum):
     page, perPage = MultiResponse.parsePaging(request.args)
+    cursor = MultiResponse.parseCursor(request.args)
     sourceReturn = request.args.get('source', False)
-    matchingDocs = elastic.query_regnum(regnum, page=page, perPage=perPage)
+    view = request.args.get('view', 'full')
+    matchingDocs = elastic.query_regnum(
+        regnum, page=page, perPage=perPage, cursor=cursor
+    )
     regResponse = MultiResponse(
         'number',
         matchingDocs.hits.total,
         request.base_url,
         regnum,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        dbEntry = qManager.registrationQuery(entry.uuid)
-        regResponse.addResult(MultiResponse.parseEntry(
-            dbEntry,
-            xml=sourceReturn
-        ))
+    addHitResults(regResponse, matchingDocs, sourceReturn, view)
 
+    regResponse.setNextCursor(matchingDocs)
     regResponse.createDataBlock()
     return jsonify(regResponse.createResponse(200))
 
 
 @search.route('/renewal/<rennum>', methods=['GET'])
+@conditional
 def renQuery(rennum):
     page, perPage = MultiResponse.parsePaging(request.args)
+    cursor = MultiResponse.parseCursor(request.args)
     sourceReturn = request.args.get('source', False)
-    matchingDocs = elastic.query_rennum(rennum, page=page, perPage=perPage)
+    view = request.args.get('view', 'full')
+    matchingDocs = elastic.query_rennum(
+        rennum, page=page, perPage=perPage, cursor=cursor
+    )
     renResponse = MultiResponse(
         'number',
         matchingDocs.hits.total,
         request.base_url,
         rennum,
         page,
-        perPage
+        perPage,
+        cursor=cursor
     )
-    qManager = QueryManager(db.session)
-    for entry in matchingDocs:
-        dbRenewal = qManager.renewalQuery(entry.uuid)
-        renResponse.extendResults(parseRetRenewal(
-            dbRenewal
-        ))
+    if view == 'lite':
+        renResponse.extendResults(
+            parseLiteRenewals(matchingDocs, bool(sourceReturn))
+        )
+    else:
+        qManager = QueryManager(db.session)
+        for index, dbRenewal in qManager.hydrateHits(
+            matchingDocs, renewalEntries=True
+        ):
+            renResponse.extendResults(parseRetRenewal(
+                dbRenewal
+            ))
 
+    renResponse.setNextCursor(matchingDocs)
     renResponse.createDataBlock()
     return jsonify(renResponse.createResponse(200))
 
@@ -232,3 +194,65 @@ def parseRetRenewal(dbRenewal):
     for reg in dbRenewal.registrations:
         registrations.append(MultiResponse.parseEntry(reg.cce))
     return registrations
+
+
+def parseLiteRenewals(matchingDocs, source=False):
+    """Build the results of a renewal lookup from the index, in the same
+    form as parseRetRenewal: the entries of each renewal's registrations,
+    fetched from the cce index with a single query, or the renewal itself if
+    it is an orphan."""
+    regUUIDs = [
+        [
+            r['cce_uuid'] for r in doc.to_dict().get('registrations', [])
+            if r.get('cce_uuid')
+        ]
+        for doc in matchingDocs
+    ]
+    entryUUIDs = set(u for docUUIDs in regUUIDs for u in docUUIDs)
+
+    entries = {}
+    if len(entryUUIDs) > 0:
+        for entryDoc in elastic.query_uuids('cce', sorted(entryUUIDs)):
+            entries[entryDoc.uuid] = MultiResponse.parseEntryDoc(
+                entryDoc, source=source
+            )
+
+    results = []
+    for renewalDoc, docUUIDs in zip(matchingDocs, regUUIDs):
+        linked = [entries[u] for u in docUUIDs if u in entries]
+        if len(linked) > 0:
+            results.extend(linked)
+        else:
+            results.append(
+                MultiResponse.parseRenewalDoc(renewalDoc, source=source)
+            )
+    return results
+
+
+def addHitResults(response, matchingDocs, sourceReturn, view='full'):
+    if view == 'lite':
+        for entry in matchingDocs:
+            if entry.meta.index == 'cce':
+                response.addResult(MultiResponse.parseEntryDoc(
+                    entry, source=bool(sourceReturn)
+                ))
+            else:
+                response.addResult(MultiResponse.parseRenewalDoc(
+                    entry, source=bool(sourceReturn)
+                ))
+        return
+
+    qManager = QueryManager(db.session)
+    for index, dbRec in qManager.hydrateHits(
+        matchingDocs, xml=bool(sourceReturn)
+    ):
+        if index == 'cce':
+            response.addResult(MultiResponse.parseEntry(
+                dbRec,
+                xml=sourceReturn
+            ))
+        else:
+            response.addResult(MultiResponse.parseRenewal(
+                dbRec,
+                source=sourceReturn
+            ))
@@ -54,6 +54,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -66,6 +74,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -97,6 +111,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -109,6 +131,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -140,6 +168,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -152,6 +188,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -183,6 +225,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -195,6 +245,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -228,6 +284,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -240,6 +304,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -273,6 +343,14 @@ class SwaggerDoc():
                                 "required": False,
                                 "default": False,
                                 "description": "Return source XML/CSV data"
+                            },{
+                                "name": "view",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "default": "full",
+                                "enum": ["full", "lite"],
+                                "description": "Set to lite to return results from the search index only"
                             },{
                                 "name": "page",
                                 "in": "query",
@@ -285,6 +363,12 @@ class SwaggerDoc():
                                 "type": "number",
                                 "required": False,
                                 "default": 10
+                            },{
+                                "name": "cursor",
+                                "in": "query",
+                                "type": "string",
+                                "required": False,
+                                "description": "Page through results with cursors rather than page numbers. Set to * for the first page and follow the next links for later pages"
                             }
                         ],
                         "responses": {
@@ -344,6 +428,34 @@ class SwaggerDoc():
                             }
                         }
                     }
+                },
+                "/export/{recordType}": {
+                    "get": {
+                        "tags": ["Export"],
+                        "summary": "Stream a bulk export of the database",
+                        "description": "Returns a row for every record in a table, or every entry with its registrations and renewals followed by the orphan renewals for linked. Gzipped if the client accepts gzip",
+                        "produces": ["application/x-ndjson", "text/csv"],
+                        "parameters": [{
+                            "name": "recordType",
+                            "in": "path",
+                            "required": True,
+                            "type": "string",
+                            "enum": ["cce", "registration", "renewal_registration", "renewal", "linked"]
+                        },{
+                            "name": "format",
+                            "in": "query",
+                            "type": "string",
+                            "required": False,
+                            "default": "ndjson",
+                            "enum": ["ndjson", "csv"],
+                            "description": "Linked records can only be exported as ndjson"
+                        }],
+                        "responses": {
+                            200: {
+                                "description": "A newline delimited JSON or CSV file"
+                            }
+                        }
+                    }
                 }
             },
             "definitions": {
@@ -1,42 +1,63 @@
 from flask import (
     Blueprint, request, session, url_for, redirect, current_app, jsonify
 )
+from sqlalchemy.orm import selectinload
 
-from api.db import db
+from api.cache import cache, conditional
+from api.db import db, QueryManager
 from api.elastic import elastic
 from api.response import SingleResponse
 from model.cce import CCE
 from model.registration import Registration
-from model.renewal import Renewal, RENEWAL_REG
+from model.renewal import Renewal
 from model.volume import Volume
 
 uuid = Blueprint('uuid', __name__, url_prefix='/')
 
 
 @uuid.route('/registration/<uuid>', methods=['GET'])
+@conditional
 def regQuery(uuid):
-    dbEntry = db.session.query(CCE)\
-        .outerjoin(Registration, RENEWAL_REG, Renewal)\
-        .filter(CCE.uuid == uuid).one()
-
     regRecord = SingleResponse('uuid', request.base_url)
-    regRecord.result = SingleResponse.parseEntry(dbEntry, xml=True)
+    regRecord.result = cache.fetch(
+        db.session, 'registration', uuid, {'xml': True},
+        lambda: loadRegistration(uuid)
+    )
     regRecord.createDataBlock()
     return jsonify(regRecord.createResponse(200))
 
 
 @uuid.route('/renewal/<uuid>', methods=['GET'])
+@conditional
 def renQuery(uuid):
-    dbRenewal = db.session.query(Renewal)\
-        .outerjoin(RENEWAL_REG, Registration, CCE)\
-        .filter(Renewal.uuid == uuid).one()
-
     renRecord = SingleResponse('uuid', request.base_url)
-    renRecord.result = parseRetRenewal(dbRenewal)
+    renRecord.result = cache.fetch(
+        db.session, 'renewal', uuid, {'xml': True},
+        lambda: loadRenewal(uuid)
+    )
     renRecord.createDataBlock()
     return jsonify(renRecord.createResponse(200))
 
 
+def loadRegistration(uuid):
+    dbEntry = db.session.query(CCE)\
+        .options(*QueryManager.entryOptions(xml=True))\
+        .filter(CCE.uuid == uuid).one()
+    return SingleResponse.parseEntry(dbEntry, xml=True)
+
+
+def loadRenewal(uuid):
+    dbRenewal = db.session.query(Renewal)\
+        .options(
+            selectinload(Renewal.claimants),
+            selectinload(Renewal.registrations)
+                .selectinload(Registration.cce)
+                .options(*QueryManager.entryOptions(xml=True))
+        )\
+        .filter(Renewal.uuid == uuid).one()
+    return parseRetRenewal(dbRenewal)
+
+
 def parseRetRenewal(dbRenewal):
     if len(dbRenewal.registrations) == 0:
         return [SingleResponse.parseRenewal(dbRenewal, source=True)]
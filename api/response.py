@@ -1,5 +1,11 @@
+import base64
+import json
 import math
 
+from werkzeug.exceptions import BadRequest
+
+from helpers.serialize import serializeEntry, serializeRenewal
+
 class Response():
     def __init__(self, queryType, endpoint):
         self.type = queryType
@@ -18,64 +24,79 @@ class Response():
                 'data': self.data
             }
 
+    @staticmethod
+    def parseEntry(dbEntry, xml=False):
+        return serializeEntry(dbEntry, xml=xml)
+
+    @staticmethod
+    def parseRenewal(dbRenewal, source=False):
+        return serializeRenewal(dbRenewal, source=source)
+
     @classmethod
-    def parseEntry(cls, dbEntry, xml=False):
-        response = {
-            'uuid': dbEntry.uuid,
-            'title': dbEntry.title,
-            'copies': dbEntry.copies,
-            'description': dbEntry.description,
-            'pub_date': dbEntry.pub_date_text,
-            'copy_date': dbEntry.copy_date_text,
+    def parseEntryDoc(cls, entryDoc, source=False):
+        """Build an entry result from the _source of a cce search hit, in the
+        same form as parseEntry but without querying the database. The entry
+        XML is not indexed, so source only adds the source of its renewals."""
+        entry = entryDoc.to_dict()
+        volume = entry.get('source', {})
+        return {
+            'uuid': entry.get('uuid'),
+            'title': entry.get('title'),
+            'copies': entry.get('copies'),
+            'description': entry.get('description'),
+            'pub_date': entry.get('pub_date_text'),
+            'copy_date': entry.get('copy_date_text'),
             'registrations': [
-                {'number': r.regnum, 'date': r.reg_date_text}
-                for r in dbEntry.registrations
+                {'number': r.get('regnum'), 'date': r.get('regdate_text')}
+                for r in entry.get('registrations', [])
             ],
-            'authors': [ a.name for a in dbEntry.authors ],
-            'publishers': [ p.name for p in dbEntry.publishers ],
+            'authors': entry.get('authors', []),
+            'publishers': entry.get('publishers', []),
             'source': {
-                'url': dbEntry.volume.source,
-                'series': dbEntry.volume.series,
-                'year': dbEntry.volume.year,
-                'part': dbEntry.volume.part,
-                'page': dbEntry.page,
-                'page_position': dbEntry.page_position
-            }
+                'url': volume.get('url'),
+                'series': volume.get('series'),
+                'year': volume.get('year'),
+                'part': volume.get('part'),
+                'page': entry.get('page'),
+                'page_position': entry.get('page_position')
+            },
+            'renewals': [
+                cls.parseRenewalDict(ren, source=source)
+                for ren in entry.get('renewals', [])
+            ]
         }
-        response['renewals'] = [
-            cls.parseRenewal(ren, source=xml)
-            for reg in dbEntry.registrations
-            for ren in reg.renewals
-        ]
-
-        if xml: response['xml'] = dbEntry.xml_sources[0].xml_source
 
-        return response
+    @classmethod
+    def parseRenewalDoc(cls, renewalDoc, source=False):
+        """Build a renewal result from the _source of a ccr search hit"""
+        return cls.parseRenewalDict(renewalDoc.to_dict(), source=source)
 
     @classmethod
-    def parseRenewal(cls, dbRenewal, source=False):
-        renewal = {
+    def parseRenewalDict(cls, renewal, source=False):
+        """Build a renewal result, in the same form as parseRenewal, from a
+        renewal document or a renewal summary in an entry document."""
+        result = {
             'type': 'renewal',
-            'uuid': dbRenewal.uuid,
-            'title': dbRenewal.title,
-            'author': dbRenewal.author,
-            'claimants': [ 
-                {'name': c.name, 'type': c.claimant_type} 
-                for c in dbRenewal.claimants 
+            'uuid': renewal.get('uuid'),
+            'title': renewal.get('title'),
+            'author': renewal.get('authors'),
+            'claimants': [
+                {'name': c.get('name'), 'type': c.get('claim_type')}
+                for c in renewal.get('claimants', [])
             ],
-            'new_matter': dbRenewal.new_matter,
-            'renewal_num': dbRenewal.renewal_num,
-            'renewal_date': dbRenewal.renewal_date_text,
-            'notes': dbRenewal.notes,
-            'volume': dbRenewal.volume,
-            'part': dbRenewal.part,
-            'number': dbRenewal.number,
-            'page': dbRenewal.page
+            'new_matter': renewal.get('new_matter'),
+            'renewal_num': renewal.get('rennum'),
+            'renewal_date': renewal.get('rendate_text'),
+            'notes': renewal.get('notes'),
+            'volume': renewal.get('volume'),
+            'part': renewal.get('part'),
+            'number': renewal.get('number'),
+            'page': renewal.get('page')
         }
 
-        if source: renewal['source'] = dbRenewal.source
+        if source: result['source'] = renewal.get('source')
 
-        return renewal
+        return result
 
 
 class SingleResponse(Response):
@@ -88,12 +109,19 @@ class SingleResponse(Response):
 
 
 class MultiResponse(Response):
-    def __init__(self, queryType, total, endpoint, query, page, perPage):
+    # The default index.max_result_window, past which pages cannot be fetched
+    maxResultWindow = 10000
+
+    def __init__(
+        self, queryType, total, endpoint, query, page, perPage, cursor=None
+    ):
         super().__init__(queryType, endpoint)
         self.total = total
         self.query = query
         self.page = page
         self.perPage = perPage
+        self.cursor = cursor
+        self.nextCursor = None
         self.results = []
     
     def addResult(self, result):
@@ -102,6 +130,14 @@ class MultiResponse(Response):
     def extendResults(self, results):
         self.results.extend(results)
 
+    def setNextCursor(self, matchingDocs):
+        """When paging with a cursor, the next page starts after the sort
+        values of the last hit. A page with fewer hits than perPage is the
+        last page."""
+        hits = matchingDocs.hits
+        if self.cursor is None or len(hits) < self.perPage: return
+        self.nextCursor = MultiResponse.encodeCursor(list(hits[-1].meta.sort))
+
     def createDataBlock(self):
         self.data = {
             'total': self.total,
@@ -122,6 +158,9 @@ class MultiResponse(Response):
             urlRoot = '{}?query={}'.format(self.endpoint, self.query)
         else:
             urlRoot = self.endpoint
+        if '?' not in urlRoot: urlRoot = '{}?'.format(urlRoot)
+
+        if self.cursor is not None: return self.createCursorPaging(urlRoot)
 
         if self.page > 0:
             paging['first'] = '{}&page={}&per_page={}'.format(
@@ -155,7 +194,8 @@ class MultiResponse(Response):
         lastPage = math.ceil(((self.total - self.perPage) / self.perPage))
         if (
             self.page * self.perPage < self.total and 
-            self.total > self.perPage
+            self.total > self.perPage and
+            (lastPage + 1) * self.perPage <= MultiResponse.maxResultWindow
         ):
             paging['last'] = '{}&page={}&per_page={}'.format(
                 urlRoot,
@@ -167,8 +207,49 @@ class MultiResponse(Response):
         
         return paging
     
+    def createCursorPaging(self, urlRoot):
+        """Cursor pages can only be followed forward, so there are no
+        previous or last links."""
+        paging = {
+            'first': '{}&cursor=*&per_page={}'.format(urlRoot, self.perPage),
+            'previous': None,
+            'next': None,
+            'last': None
+        }
+        if self.nextCursor:
+            paging['next'] = '{}&cursor={}&per_page={}'.format(
+                urlRoot,
+                self.nextCursor,
+                self.perPage
+            )
+        return paging
+
     @staticmethod
     def parsePaging(reqArgs):
         perPage = int(reqArgs.get('per_page', 10))
         page = int(reqArgs.get('page', 0))
-        return page, perPage
\ No newline at end of file
+        return page, perPage
+
+    @staticmethod
+    def parseCursor(reqArgs):
+        """Return the sort values to continue from for a cursor request,
+        an empty list to start paging with a cursor (cursor=*) or None for
+        page numbers."""
+        cursor = reqArgs.get('cursor', None)
+        if cursor is None: return None
+        if cursor == '*': return []
+        try:
+            sortValues = json.loads(base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)
+            ))
+        except ValueError:
+            raise BadRequest('Invalid cursor')
+        if not isinstance(sortValues, list):
+            raise BadRequest('Invalid cursor')
+        return sortValues
+
+    @staticmethod
+    def encodeCursor(sortValues):
+        return base64.urlsafe_b64encode(
+            json.dumps(sortValues, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii').rstrip('=')
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""Database setup shared by the benchmarks. The database is read from
+BENCH_DB_URL, which should point at a scratch database as its tables are
+created if missing and emptied by each benchmark, and defaults to an in-memory
+SQLite database.
+"""
+from datetime import date, datetime
+import os
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite import base as sqliteBase
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+from sqlalchemy.orm import configure_mappers, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql import sqltypes
+
+from model.core import Base
+
+
+class CoercingUuid(sqltypes.Uuid):
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+
+        def bindValue(value):
+            if isinstance(value, str): value = uuid.UUID(value)
+            return process(value) if process else value
+        return bindValue
+
+
+class CoercingDate(sqliteBase.DATE):
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+
+        def bindValue(value):
+            if isinstance(value, str): value = date.fromisoformat(value[:10])
+            return process(value) if process else value
+        return bindValue
+
+
+class CoercingDateTime(sqliteBase.DATETIME):
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+
+        def bindValue(value):
+            if isinstance(value, str): value = datetime.fromisoformat(value)
+            return process(value) if process else value
+        return bindValue
+
+
+class CoercingSQLiteDialect(SQLiteDialect_pysqlite):
+    """The loader passes uuids and dates as strings, which psycopg2 accepts
+    but SQLite's type processors do not. This dialect converts them on
+    binding so that the loader can be benchmarked without a Postgres server.
+    It is only used by engines created for the benchmarks, with the
+    sqlite+benchmark:// scheme, and leaves other engines unchanged."""
+    name = 'sqlite'
+    driver = 'benchmark'
+    supports_statement_cache = True
+
+    colspecs = {
+        **SQLiteDialect_pysqlite.colspecs,
+        sqltypes.Uuid: CoercingUuid,
+        sqltypes.Date: CoercingDate,
+        sqltypes.DateTime: CoercingDateTime
+    }
+
+    @classmethod
+    def import_dbapi(cls):
+        return SQLiteDialect_pysqlite.import_dbapi()
+
+
+registry.register(
+    'sqlite.benchmark', 'benchmarks.database', 'CoercingSQLiteDialect'
+)
+
+
+def createSession(dbURL=None):
+    dbURL = dbURL or os.environ.get('BENCH_DB_URL', 'sqlite://')
+    engineOptions = {}
+    if dbURL.startswith('sqlite'):
+        dbURL = 'sqlite+benchmark:' + dbURL.split(':', 1)[1]
+        # The bulk indexing helper reads records from a worker thread
+        engineOptions = {
+            'connect_args': {'check_same_thread': False},
+            'poolclass': StaticPool
+        }
+
+    engine = create_engine(dbURL, **engineOptions)
+    Base.metadata.create_all(engine)
+    configure_mappers()
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def createManager(dbURL=None):
+    """Return a SessionManager for the benchmark database, which can also be
+    passed to CCEReader as the workerManager of a parallel import."""
+    from sessionManager import SessionManager
+
+    manager = SessionManager()
+    manager.session = createSession(dbURL)
+    manager.engine = manager.session.get_bind()
+    return manager
@@ -0,0 +1,106 @@
+"""Compare the per-entry cost of loading entry dates with the original
+strptime based parser and the cached parser in helpers.dates, after checking
+that both give the same results, including for invalid dates.
+
+Run from the repository root with `python -m benchmarks.dates`
+"""
+import argparse
+from datetime import datetime
+import random
+import timeit
+
+from lxml import etree
+
+from builder import CCEFile
+from helpers.dates import normalizeDate
+from helpers.entry import EntryRecord
+
+
+def parseDateOriginal(date, dateFormat):
+    if date is None or dateFormat == '': return None
+
+    try:
+        outDate = datetime.strptime(date, dateFormat)
+        return outDate.strftime('%Y-%m-%d')
+    except ValueError:
+        return parseDateOriginal(date, dateFormat[:-3])
+
+
+def loadDatesOriginal(entry):
+    dates = {}
+    for dType in CCEFile.dateTypes:
+        dates[dType] = [
+            (parseDateOriginal(d.get('date', None), '%Y-%m-%d'), d.text)
+            for d in entry.findall('.//{}'.format(dType))
+            if not ('ignore' in d.attrib and d.get('ignore') == 'yes')
+        ]
+    if len(dates['regDate']) < 1:
+        if len(dates['copyDate']) > 0:
+            dates['regDate'].append(dates['copyDate'][0])
+        elif len(dates['pubDate']) > 0:
+            dates['regDate'].append(dates['pubDate'][0])
+    return dates
+
+
+INVALID_DATES = [
+    '1950-02-30', '1950-13-01', '1950-00-00', '1950-13', '1950-00',
+    '1950-04-31', '0000', 'n.d.', '19500', '1950-1-32'
+]
+
+
+def randomDate():
+    if random.random() < 0.05: return random.choice(INVALID_DATES)
+    year = random.randint(1923, 1977)
+    precision = random.random()
+    if precision < 0.2: return str(year)
+    month = random.randint(1, 12)
+    if precision < 0.4: return '{}-{:02d}'.format(year, month)
+    return '{}-{:02d}-{:02d}'.format(year, month, random.randint(1, 28))
+
+
+def createEntries(count):
+    entries = []
+    for _ in range(count):
+        entry = etree.Element('copyrightEntry')
+        for dType in ['regDate', 'pubDate', 'copyDate']:
+            if random.random() < 0.3 and dType != 'regDate': continue
+            dateEl = etree.SubElement(entry, dType, date=randomDate())
+            dateEl.text = 'date text'
+        entries.append(entry)
+    return entries
+
+
+def main(entryCount, repeat):
+    random.seed(1)
+    entries = createEntries(entryCount)
+    cceFile = CCEFile(None, None, None)
+
+    for entry in entries:
+        if loadDatesOriginal(entry) != cceFile.loadDates(EntryRecord(entry)):
+            raise ValueError('Parsed dates differ for {}'.format(
+                etree.tostring(entry)
+            ))
+
+    original = min(timeit.repeat(
+        lambda: [loadDatesOriginal(e) for e in entries],
+        number=1, repeat=repeat
+    ))
+    normalizeDate.cache_clear()
+    cached = min(timeit.repeat(
+        lambda: [cceFile.loadDates(EntryRecord(e)) for e in entries],
+        number=1, repeat=repeat
+    ))
+
+    print('Entries: {}'.format(entryCount))
+    print('Original: {:.2f}us per entry'.format(original / entryCount * 1e6))
+    print('Cached:   {:.2f}us per entry'.format(cached / entryCount * 1e6))
+    print('Speedup:  {:.1f}x'.format(original / cached))
+    print('Cache:    {}'.format(normalizeDate.cache_info()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark entry date parsing')
+    parser.add_argument('-n', '--entries', type=int, default=50000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.entries, args.repeat)
@@ -0,0 +1,145 @@
+"""Time the building of ElasticSearch documents (ESDoc and ESRen) and of API
+responses (Response.parseEntry) for generated records. A generated volume and
+renewal file are first imported into the benchmark database. Documents are
+built from records loaded in pages as the indexer does, so the document times
+include loading the records; the API responses are built from records that
+are already loaded.
+
+ElasticSearch is replaced with a stub client that accepts every document, so
+the indexing times cover loading, building and serializing the documents and
+the bulk helper, but not the ElasticSearch cluster itself.
+
+The database is set with BENCH_DB_URL (see benchmarks.database). Run from the
+repository root with `python -m benchmarks.documents -e 5000 -r 20000`
+"""
+import argparse
+from datetime import datetime
+import os
+import tempfile
+import time
+import timeit
+from types import SimpleNamespace
+
+from elasticsearch.serializer import JSONSerializer
+
+from benchmarks.database import createSession
+from benchmarks.generators import writeSource
+from benchmarks.loader import timeCCE, timeCCR
+from helpers.sources import LocalSource
+
+os.environ.setdefault('ES_CCE_INDEX', 'cce')
+os.environ.setdefault('ES_CCR_INDEX', 'ccr')
+
+from api.db import QueryManager
+from api.response import Response
+from esIndexer import ESIndexer
+from model.cce import CCE
+
+
+class StubElasticClient():
+    """Accepts bulk requests without sending them anywhere, reporting each
+    document as created. The documents are still serialized with the
+    client's JSON serializer."""
+    def __init__(self):
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+
+    def bulk(self, body, *args, **kwargs):
+        actionCount = body.count('\n') // 2
+        return {
+            'took': 0,
+            'errors': False,
+            'items': [
+                {'index': {'status': 201}} for _ in range(actionCount)
+            ]
+        }
+
+
+class StubIndexer(ESIndexer):
+    def createElasticConnection(self):
+        self.client = StubElasticClient()
+
+    def createIndex(self):
+        pass
+
+
+class SessionHolder():
+    def __init__(self, session):
+        self.session = session
+
+
+def loadRecords(session, entries, renewals, seed):
+    with tempfile.TemporaryDirectory() as sourceDir:
+        writeSource(sourceDir, 1, entries, renewals, seed)
+        source = LocalSource(sourceDir)
+        volumeInfo = source.listDir('xml/1950')[0]
+        volumeInfo['filename'] = volumeInfo['name']
+        renewalInfo = source.listDir('data')[0]
+        renewalInfo['filename'] = renewalInfo['name']
+
+        timeCCE(session, source, volumeInfo, False, 1000)
+        timeCCR(session, source, renewalInfo, 1000)
+
+
+def timeDocuments(indexer, recType, repeat):
+    seconds = min(timeit.repeat(
+        lambda: sum(1 for _ in indexer.process(recType)),
+        number=1, repeat=repeat
+    ))
+    return seconds, sum(1 for _ in indexer.process(recType))
+
+
+def timeIndexing(indexer, recType, repeat):
+    results = []
+    for _ in range(repeat):
+        startTime = time.perf_counter()
+        indexer.indexRecords(recType)
+        results.append(time.perf_counter() - startTime)
+    return min(results)
+
+
+def timeResponses(session, repeat):
+    entries = session.query(CCE)\
+        .order_by(CCE.id)\
+        .options(*QueryManager.entryOptions())\
+        .all()
+    seconds = min(timeit.repeat(
+        lambda: [Response.parseEntry(e) for e in entries],
+        number=1, repeat=repeat
+    ))
+    session.expunge_all()
+    return seconds, len(entries)
+
+
+def report(label, seconds, records):
+    print('{:<16} {:>8} records {:>8.2f}s {:>10.1f} records/s'.format(
+        label, records, seconds, records / seconds
+    ))
+
+
+def main(entries, renewals, repeat, seed):
+    session = createSession()
+    loadRecords(session, entries, renewals, seed)
+
+    indexer = StubIndexer(
+        SessionHolder(session), datetime(1970, 1, 1), threads=1
+    )
+    cceSeconds, cceCount = timeDocuments(indexer, 'cce', repeat)
+    report('ESDoc', cceSeconds, cceCount)
+    ccrSeconds, ccrCount = timeDocuments(indexer, 'ccr', repeat)
+    report('ESRen', ccrSeconds, ccrCount)
+    report('Index cce', timeIndexing(indexer, 'cce', repeat), cceCount)
+    report('Index ccr', timeIndexing(indexer, 'ccr', repeat), ccrCount)
+    report('parseEntry', *timeResponses(session, repeat))
+    session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark building index documents and API responses'
+    )
+    parser.add_argument('-e', '--entries', type=int, default=5000)
+    parser.add_argument('-r', '--renewals', type=int, default=20000)
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args.entries, args.renewals, args.repeat, args.seed)
@@ -0,0 +1,118 @@
+"""Compare the cost of extracting the fields of each entry in a CCE volume
+with the original per-field element lookups and with the single pass
+EntryRecord extractor. Both use the same cached date parser, so the
+difference is the cost of walking the entry.
+
+Run from the repository root with
+`python -m benchmarks.entries path/to/volume.xml`
+"""
+import argparse
+import timeit
+
+from lxml import etree
+
+from builder import CCEFile
+from helpers.dates import normalizeDate
+from helpers.entry import EntryRecord
+
+
+def loadDatesFindall(entry):
+    dates = {}
+    for dType in CCEFile.dateTypes:
+        dates[dType] = [
+            (normalizeDate(d.get('date', None)), d.text)
+            for d in entry.findall('.//{}'.format(dType))
+            if not ('ignore' in d.attrib and d.get('ignore') == 'yes')
+        ]
+    if len(dates['regDate']) < 1:
+        if len(dates['copyDate']) > 0:
+            dates['regDate'].append(dates['copyDate'][0])
+        elif len(dates['pubDate']) > 0:
+            dates['regDate'].append(dates['pubDate'][0])
+    return dates
+
+
+def extractOriginal(entry):
+    authors = [
+        (a.text, False) for a in entry.findall('.//authorName')
+        if len(list(a.itersiblings(tag='role', preceding=True))) > 0
+    ]
+    if len(authors) < 1:
+        try:
+            authors.append((entry.findall('.//authorName')[0].text, False))
+        except IndexError:
+            pass
+    if len(authors) > 0: authors[0] = (authors[0][0], True)
+
+    moreRegnums = []
+    for addtl in entry.findall('.//additionalEntry'):
+        try:
+            moreRegnums.extend(addtl.get('regnum').strip().split(' '))
+        except AttributeError:
+            continue
+
+    return (
+        [t.text for t in entry.findall('.//title') if t.text is not None],
+        authors,
+        CCEFile.fetchText(entry, 'copies'),
+        CCEFile.fetchText(entry, 'desc'),
+        len(entry.findall('newMatterClaimed')) > 0,
+        [(c.text, c.get('claimant', None)) for c in entry.findall('.//pubName')],
+        [l.text for l in entry.findall('lccn')],
+        loadDatesFindall(entry),
+        moreRegnums
+    )
+
+
+def extractRecord(cceFile, entry):
+    record = EntryRecord(entry)
+    return (
+        [t for t in record.titles if t is not None],
+        cceFile.createAuthorList(record),
+        record.copies,
+        record.description,
+        record.newMatter,
+        record.publishers,
+        record.lccns,
+        cceFile.loadDates(record),
+        record.additionalRegnums
+    )
+
+
+def main(volumePath, repeat):
+    entries = list(etree.parse(volumePath).getroot().iter('copyrightEntry'))
+    cceFile = CCEFile(None, None, None)
+
+    for entry in entries:
+        if extractOriginal(entry) != extractRecord(cceFile, entry):
+            raise ValueError('Extracted fields differ for {}'.format(
+                entry.get('id')
+            ))
+
+    original = min(timeit.repeat(
+        lambda: [extractOriginal(e) for e in entries],
+        number=1, repeat=repeat
+    ))
+    singlePass = min(timeit.repeat(
+        lambda: [extractRecord(cceFile, e) for e in entries],
+        number=1, repeat=repeat
+    ))
+
+    print('Entries:     {}'.format(len(entries)))
+    print('Original:    {:.2f}us per entry'.format(
+        original / len(entries) * 1e6
+    ))
+    print('Single pass: {:.2f}us per entry'.format(
+        singlePass / len(entries) * 1e6
+    ))
+    print('Speedup:     {:.1f}x'.format(original / singlePass))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark entry field extraction over a CCE volume'
+    )
+    parser.add_argument('volume', help='Path to a CCE XML volume')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.volume, args.repeat)
@@ -0,0 +1,278 @@
+"""Generate synthetic CCE volumes and CCR renewal files for benchmarking.
+
+The output is deterministic for a given seed and follows the structure of
+the source repositories, so a generated directory can be used as
+CCE_SOURCE_PATH and CCR_SOURCE_PATH for a full local run of main.py.
+
+Run from the repository root with
+`python -m benchmarks.generators OUTPUT_DIR -v 2 -e 5000 -r 20000`
+"""
+import argparse
+import csv
+from io import StringIO
+import os
+import random
+import uuid
+
+from lxml import etree
+
+from helpers.regnums import expandRegnums, parseRegnum
+
+SURNAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis',
+    'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Martin', 'Jackson',
+    'Thompson', 'White', 'Harris', 'Clark', 'Lewis', 'Robinson', 'Walker'
+]
+WORDS = [
+    'the', 'story', 'of', 'a', 'history', 'american', 'life', 'new', 'world',
+    'guide', 'to', 'modern', 'science', 'songs', 'and', 'poems', 'river',
+    'house', 'war', 'love', 'city', 'country', 'art', 'people', 'manual'
+]
+PUBLISHERS = [
+    'Macmillan Co.', 'Harper & Brothers', 'Doubleday & Co.', 'Random House',
+    'Houghton Mifflin Co.', 'Charles Scribner\'s Sons', 'Alfred A. Knopf',
+    'Little, Brown & Co.', 'Viking Press', 'Simon & Schuster'
+]
+MONTHS = [
+    'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+    'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'
+]
+REGNUM_PREFIXES = ['A', 'A', 'A', 'A', 'AA', 'AF', 'B', 'DP', 'DU', 'K']
+RENEWAL_FIELDS = [
+    'entry_id', 'volume', 'part', 'number', 'page', 'author', 'title', 'oreg',
+    'odat', 'id', 'rdat', 'claimants', 'new_matter', 'see_also_ren',
+    'see_also_reg', 'notes', 'full_text'
+]
+
+
+class SourceGenerator():
+    """Generates volumes and renewals from a single seeded random source.
+    The registrations of every generated entry are recorded so that most
+    generated renewals refer to a registration that exists, as in the real
+    data, while the rest are left as orphans."""
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.registrations = []
+        self.nextRegnum = 1000
+        self.nextRenewal = 1000
+
+    def uuid(self):
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def words(self, low, high):
+        return ' '.join(
+            self.random.choice(WORDS)
+            for _ in range(self.random.randint(low, high))
+        ).capitalize()
+
+    def name(self):
+        return '{}, {}.'.format(
+            self.random.choice(SURNAMES),
+            chr(self.random.randint(65, 90))
+        )
+
+    def date(self, year):
+        month = self.random.randint(1, 12)
+        day = self.random.randint(1, 28)
+        precision = self.random.random()
+        if precision < 0.05:
+            return str(year), str(year)
+        elif precision < 0.15:
+            return '{}-{:02d}'.format(year, month), '{}{}'.format(
+                MONTHS[month - 1], str(year)[2:]
+            )
+        return '{}-{:02d}-{:02d}'.format(year, month, day), '{}{}{}'.format(
+            day, MONTHS[month - 1], str(year)[2:]
+        )
+
+    def regnum(self):
+        prefix = self.random.choice(REGNUM_PREFIXES)
+        self.nextRegnum += self.random.randint(1, 20)
+        return prefix, self.nextRegnum
+
+    def volumeXML(self, entryCount, year=1950, part=1):
+        """Return the XML of a volume with about entryCount entries, spread
+        over pages and including entry groups, regnum ranges and additional
+        entries."""
+        root = etree.Element('copyrightEntries')
+        self.addHeader(root, year, part)
+
+        pageNum = 0
+        created = 0
+        while created < entryCount:
+            if created % 12 == 0:
+                pageNum += 1
+                etree.SubElement(root, 'page', pgnum=str(pageNum))
+
+            if self.random.random() < 0.05:
+                group = etree.SubElement(root, 'entryGroup')
+                etree.SubElement(group, 'title').text = self.words(2, 6)
+                etree.SubElement(group, 'authorName').text = self.name()
+                groupSize = self.random.randint(2, 4)
+                for _ in range(min(groupSize, entryCount - created)):
+                    self.addEntry(group, year)
+                    created += 1
+            else:
+                self.addEntry(root, year)
+                created += 1
+
+        return etree.tostring(root, encoding='utf-8', xml_declaration=True)
+
+    def addHeader(self, root, year, part):
+        header = etree.SubElement(root, 'header')
+        etree.SubElement(
+            header, 'source', url='https://example.org/{}/{}'.format(year, part)
+        )
+        etree.SubElement(header, 'status').text = 'generated'
+        cite = etree.SubElement(header, 'cite')
+        etree.SubElement(cite, 'series', label='3')
+        etree.SubElement(cite, 'volume').text = str(year - 1946)
+        etree.SubElement(cite, 'year').text = str(year)
+        division = etree.SubElement(cite, 'division')
+        etree.SubElement(division, 'part').text = str(part)
+        etree.SubElement(division, 'number').text = '1'
+
+    def addEntry(self, parent, year):
+        prefix, start = self.regnum()
+        regDate, regDateText = self.date(year)
+        regnum = '{}{}'.format(prefix, start)
+        if self.random.random() < 0.02:
+            end = start + self.random.randint(2, 12)
+            regnum = '{}-{}{}'.format(regnum, prefix, end)
+            self.nextRegnum = end
+        registered = list(expandRegnums([parseRegnum(regnum)]))
+
+        entry = etree.SubElement(
+            parent, 'copyrightEntry', id=self.uuid(), regnum=regnum
+        )
+
+        author = etree.SubElement(entry, 'author')
+        if self.random.random() < 0.1:
+            etree.SubElement(author, 'role').text = 'ed.'
+        for _ in range(self.random.choice([1, 1, 1, 2, 3])):
+            etree.SubElement(author, 'authorName').text = self.name()
+
+        etree.SubElement(entry, 'title').text = self.words(2, 10)
+        if self.random.random() < 0.2:
+            etree.SubElement(entry, 'title').text = self.words(1, 4)
+
+        publisher = etree.SubElement(entry, 'publisher')
+        pubName = etree.SubElement(publisher, 'pubName')
+        pubName.text = self.random.choice(PUBLISHERS)
+        if self.random.random() < 0.6: pubName.set('claimant', 'yes')
+
+        if self.random.random() < 0.5:
+            etree.SubElement(entry, 'desc').text = '{} p.'.format(
+                self.random.randint(20, 600)
+            )
+        if self.random.random() < 0.3:
+            etree.SubElement(entry, 'copies').text = '2 copies'
+        if self.random.random() < 0.2:
+            etree.SubElement(entry, 'lccn').text = '{}-{}'.format(
+                str(year)[2:], self.random.randint(1000, 99999)
+            )
+        if self.random.random() < 0.05:
+            etree.SubElement(entry, 'newMatterClaimed').text = 'new matter'
+
+        pubDate, pubDateText = self.date(year)
+        etree.SubElement(entry, 'pubDate', date=pubDate).text = pubDateText
+        etree.SubElement(entry, 'regDate', date=regDate).text = regDateText
+
+        if self.random.random() < 0.03:
+            addPrefix, addNum = self.regnum()
+            additional = '{}{}'.format(addPrefix, addNum)
+            addEntry = etree.SubElement(
+                entry, 'additionalEntry', regnum=additional
+            )
+            etree.SubElement(addEntry, 'authorName').text = self.name()
+            registered.append(additional)
+
+        regDateValue = regDate if len(regDate) == 10 else None
+        self.registrations.extend((r, regDateValue) for r in registered)
+
+    def renewalTSV(self, rowCount, year=1977, matchRate=0.7):
+        """Return a renewal TSV with rowCount rows. About matchRate of the
+        rows renew a registration from a generated volume."""
+        tsvFile = StringIO()
+        writer = csv.DictWriter(
+            tsvFile, RENEWAL_FIELDS, delimiter='\t', lineterminator='\n'
+        )
+        writer.writeheader()
+        for _ in range(rowCount):
+            writer.writerow(self.renewalRow(year, matchRate))
+        return tsvFile.getvalue()
+
+    def renewalRow(self, year, matchRate):
+        dated = [r for r in self.registrations[-1000:] if r[1]]
+        if len(dated) > 0 and self.random.random() < matchRate:
+            oreg, odat = self.random.choice(dated)
+        else:
+            prefix, num = self.regnum()
+            oreg = '{}{}'.format(prefix, num)
+            odat = self.date(year - 28)[0]
+            if len(odat) != 10: odat = '{}-01-01'.format(year - 28)
+
+        self.nextRenewal += 1
+        author = self.name()
+        claimants = '||'.join(
+            '{}|{}'.format(self.name(), self.random.choice(['A', 'PWH', 'W']))
+            for _ in range(self.random.choice([1, 1, 2]))
+        )
+        title = self.words(2, 10)
+        rdat = self.date(year)[0]
+        if len(rdat) != 10: rdat = '{}-06-01'.format(year)
+
+        return {
+            'entry_id': self.uuid(),
+            'volume': '',
+            'part': '',
+            'number': '',
+            'page': '',
+            'author': author,
+            'title': title,
+            'oreg': oreg,
+            'odat': odat,
+            'id': 'R{}'.format(self.nextRenewal),
+            'rdat': rdat,
+            'claimants': claimants,
+            'new_matter': 'new matter' if self.random.random() < 0.05 else '',
+            'see_also_ren': '',
+            'see_also_reg': '',
+            'notes': '',
+            'full_text': '{} {} {} {}'.format(author, title, oreg, rdat)
+        }
+
+
+def writeSource(outputDir, volumes, entries, renewals, seed=0):
+    """Write generated volumes to xml/YEAR/ and a renewal file to data/,
+    matching the layout of the source repositories."""
+    generator = SourceGenerator(seed)
+    for i in range(volumes):
+        year = 1950 + (i // 4)
+        yearDir = os.path.join(outputDir, 'xml', str(year))
+        os.makedirs(yearDir, exist_ok=True)
+        volumePath = os.path.join(yearDir, '{}-v{:02d}.xml'.format(year, i))
+        with open(volumePath, 'wb') as volumeFile:
+            volumeFile.write(generator.volumeXML(entries, year, i % 4 + 1))
+
+    dataDir = os.path.join(outputDir, 'data')
+    os.makedirs(dataDir, exist_ok=True)
+    with open(os.path.join(dataDir, '1977-from-db.tsv'), 'w') as tsvFile:
+        tsvFile.write(generator.renewalTSV(renewals, 1977))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic CCE volumes and CCR renewals'
+    )
+    parser.add_argument('output', help='Directory to write the source files to')
+    parser.add_argument('-v', '--volumes', type=int, default=2)
+    parser.add_argument('-e', '--entries', type=int, default=5000,
+        help='Number of entries per volume'
+    )
+    parser.add_argument('-r', '--renewals', type=int, default=20000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+    writeSource(
+        args.output, args.volumes, args.entries, args.renewals, args.seed
+    )
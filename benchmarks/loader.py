@@ -0,0 +1,117 @@
+"""Time the import of a generated CCE volume, with both CCEFile.readXML and
+CCEFile.streamXML, and of a generated CCR renewal file with
+CCRFile.readRows, committing each batch as main.py does. Each run imports
+into an empty database so that every record is inserted.
+
+The database is set with BENCH_DB_URL (see benchmarks.database). Run from the
+repository root with `python -m benchmarks.loader -e 5000 -r 20000`
+"""
+import argparse
+import tempfile
+import time
+
+from sqlalchemy import delete
+
+from benchmarks.database import createSession
+from benchmarks.generators import writeSource
+from builder import CCEFile
+from helpers.sources import LocalSource
+from model.core import Base
+from renBuilder import CCRFile
+
+
+def clearTables(session):
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(delete(table))
+    session.commit()
+
+
+def clearRenewals(session):
+    for table in reversed(Base.metadata.sorted_tables):
+        if 'renewal' in table.name or 'claimant' in table.name:
+            session.execute(delete(table))
+    session.commit()
+
+
+def commitBatch(recFile):
+    recFile.session.commit()
+    recFile.clearBatch()
+
+
+def timeCCE(session, source, fileInfo, stream, batchSize):
+    clearTables(session)
+    cceFile = CCEFile(
+        source, fileInfo, session, batchSize=batchSize, onBatch=commitBatch
+    )
+
+    startTime = time.perf_counter()
+    if stream:
+        cceFile.streamXML()
+    else:
+        cceFile.loadFileXML()
+        cceFile.readXML()
+    session.commit()
+    return time.perf_counter() - startTime, cceFile.counts
+
+
+def timeCCR(session, source, fileInfo, batchSize):
+    ccrFile = CCRFile(
+        source, fileInfo, session, batchSize=batchSize, onBatch=commitBatch
+    )
+
+    startTime = time.perf_counter()
+    ccrFile.loadFileTSV()
+    ccrFile.readRows()
+    session.commit()
+    return time.perf_counter() - startTime, ccrFile.counts
+
+
+def report(label, results):
+    seconds, counts = min(results, key=lambda r: r[0])
+    records = sum(counts.values())
+    print('{:<12} {:>8} records {:>8.2f}s {:>10.1f} records/s  {}'.format(
+        label, records, seconds, records / seconds, counts
+    ))
+
+
+def main(entries, renewals, batchSize, repeat, seed):
+    session = createSession()
+    with tempfile.TemporaryDirectory() as sourceDir:
+        writeSource(sourceDir, 1, entries, renewals, seed)
+        source = LocalSource(sourceDir)
+        volumeInfo = source.listDir('xml/1950')[0]
+        volumeInfo['filename'] = volumeInfo['name']
+        renewalInfo = source.listDir('data')[0]
+        renewalInfo['filename'] = renewalInfo['name']
+
+        report('readXML', [
+            timeCCE(session, source, volumeInfo, False, batchSize)
+            for _ in range(repeat)
+        ])
+        report('streamXML', [
+            timeCCE(session, source, volumeInfo, True, batchSize)
+            for _ in range(repeat)
+        ])
+
+        # Renewals are matched against the entries loaded by the last run
+        ccrResults = []
+        for _ in range(repeat):
+            ccrResults.append(timeCCR(session, source, renewalInfo, batchSize))
+            clearRenewals(session)
+        report('readRows', ccrResults)
+    session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the CCE and CCR import of generated files'
+    )
+    parser.add_argument('-e', '--entries', type=int, default=5000)
+    parser.add_argument('-r', '--renewals', type=int, default=20000)
+    parser.add_argument('-b', '--batch-size', type=int, default=1000)
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(
+        args.entries, args.renewals, args.batch_size, args.repeat, args.seed
+    )
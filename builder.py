@@ -1,73 +1,277 @@
-import base64
-from datetime import datetime
-from github import Github
+import hashlib
 import lccnorm
 from lxml import etree
+import multiprocessing
 import os
 import re
-import traceback
 import sys
+import time
+from uuid import UUID
 
-import io
+sys.stdout.reconfigure(encoding = 'utf-8')
 
-sys.stdout = io.TextIOWrapper(sys.stdout.detach(), encoding = 'utf-8')
+sys.stderr.reconfigure(encoding = 'utf-8')
 
-sys.stderr = io.TextIOWrapper(sys.stderr.detach(), encoding = 'utf-8')
+from sqlalchemy.orm import selectinload
 
 from model.cce import CCE
 from model.errorCCE import ErrorCCE
 from model.volume import Volume
 
+from copyWriter import CopyWriter
+from helpers.changes import ChangeSet, PendingChanges
+from helpers.entry import EntryRecord
 from helpers.errors import DataError
+from helpers.logger import configureLogging, createLogger, ProgressLogger
+from helpers.manifest import ManifestManager
+from helpers.metrics import metrics
+from helpers.records import RecordFile, uuidKey
+from helpers.regnums import (
+    countRegnums,
+    expandRegnums,
+    parseRegnum,
+    regnumCategory
+)
+from helpers.sources import createSource
+
+logger = createLogger(__name__)
 
 class CCEReader():
-    def __init__(self, manager=None):
-        self.git = Github(os.environ['ACCESS_TOKEN'])
-        self.repo = self.git.get_repo(os.environ['CCE_REPO'])
+    def __init__(
+        self, manager=None, source=None, stream=False, bulk=False, workers=1,
+        ignoreManifest=False, changes=None, batchSize=None,
+        workerManager=None
+    ):
+        self.source = source if source else createSource(
+            'CCE_REPO', 'CCE_SOURCE_PATH'
+        )
         self.dbManager = manager
+        self.stream = stream
+        self.writer = CopyWriter(manager.session) if bulk else None
+        self.workers = workers
+        self.workerManager = workerManager or createWorkerManager
+        self.batchSize = int(
+            batchSize or os.environ.get('IMPORT_BATCH_SIZE', 1000)
+        )
+        self.changes = changes if changes is not None else ChangeSet()
+        self.manifest = ManifestManager(manager.session, ignore=ignoreManifest)
+        self.pending = PendingChanges(manager.session)
         self.cceYears = {}
 
     def loadYears(self, selectedYear):
-        for year in self.repo.get_contents('/xml'):
-            if not re.match(r'^19[0-9]{2}$', year.name): continue
-            if selectedYear is not None and year.name != selectedYear: continue
-            yearInfo = {'path': year.path, 'yearFiles': []}
-            self.cceYears[year.name] = yearInfo
+        for year in self.source.listDir('xml'):
+            if not re.match(r'^19[0-9]{2}$', year['name']): continue
+            if selectedYear is not None and year['name'] != selectedYear: continue
+            yearInfo = {'path': year['path'], 'yearFiles': []}
+            self.cceYears[year['name']] = yearInfo
     
     def loadYearFiles(self, year, loadFromTime):
         yearInfo = self.cceYears[year]
-        for yearFile in self.repo.get_contents(yearInfo['path']):
-            if 'alto' in yearFile.name or 'TOC' in yearFile.name: continue
-            fileCommit = self.repo.get_commits(path=yearFile.path)[0]
-            commitDate = fileCommit.commit.committer.date
-            if loadFromTime is not None and commitDate < loadFromTime: continue
+        changedFiles = self.source.changedPaths(yearInfo['path'], loadFromTime)
+        completedFiles = self.manifest.completedShas(yearInfo['path'])
+        for yearFile in self.source.listDir(yearInfo['path']):
+            if 'alto' in yearFile['name'] or 'TOC' in yearFile['name']: continue
+            if changedFiles is not None and yearFile['path'] not in changedFiles:
+                continue
+            if self.manifest.isComplete(yearFile, completedFiles): continue
             self.cceYears[year]['yearFiles'].append({
-                'filename': yearFile.name,
-                'path': yearFile.path,
-                'sha': yearFile.sha
+                'filename': yearFile['name'],
+                'path': yearFile['path'],
+                'sha': yearFile['sha']
             })
     
     def getYearFiles(self, loadFromTime):
         for year in self.cceYears.keys():
-            print('Loading files for {}'.format(year))
-            self.loadYearFiles(year, loadFromTime)
+            logger.info('Loading files for %s', year)
+            with metrics.timer('cce.list'):
+                self.loadYearFiles(year, loadFromTime)
     
     def importYearData(self):
+        if self.workers > 1: return self.importParallel()
         for year in self.cceYears.keys(): self.importYear(year)
+
+    def importParallel(self):
+        """Import the year files across a pool of worker processes. Each
+        worker has its own database session, created by workerManager, and
+        commits each file in batches, exactly as a sequential import does.
+
+        Entries are matched to existing records within each worker, so the
+        workers first read the UUIDs in each file and files that share a UUID
+        are grouped together. Each group is imported by a single worker in
+        file order, so a repeated UUID is inserted once and then updated, as
+        it would be by a sequential import. Volumes are matched by file path
+        and so are never shared between groups. Results are collected in the
+        order of the first file of each group, and any failure stops the run.
+        """
+        yearFiles = [
+            yearFile
+            for year in self.cceYears.keys()
+            for yearFile in self.cceYears[year]['yearFiles']
+        ]
+
+        spawnContext = multiprocessing.get_context('spawn')
+        with spawnContext.Pool(
+            self.workers,
+            initializer=initImportWorker,
+            initargs=(
+                self.workerManager, self.source, self.stream,
+                self.writer is not None, self.batchSize
+            )
+        ) as pool:
+            with metrics.timer('cce.scan'):
+                fileEntries = pool.map(scanFileWorker, yearFiles)
+            fileGroups = CCEReader.groupFiles(yearFiles, fileEntries)
+            logger.info(
+                'Importing %d files in %d groups', len(yearFiles),
+                len(fileGroups)
+            )
+
+            for groupResults in pool.imap(importGroupWorker, fileGroups):
+                for filename, fileChanges, fileMetrics in groupResults:
+                    logger.info('Completed import of %s', filename)
+                    self.changes.merge(fileChanges)
+                    metrics.merge(fileMetrics)
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def groupFiles(yearFiles, fileEntries):
+        """Group the files that contain entries with the same UUID, given
+        the UUIDs of the entries in each file. Each UUID is claimed by the
+        first file it appears in and any later file containing it joins that
+        file's group. Groups are returned in the order of their first file,
+        each with its files in their original order."""
+        groupIDs = list(range(len(yearFiles)))
+
+        def findGroup(pos):
+            while groupIDs[pos] != pos: pos = groupIDs[pos]
+            return pos
+
+        claims = {}
+        for pos, entryKeys in enumerate(fileEntries):
+            for entryKey in entryKeys:
+                owner = claims.setdefault(entryKey, pos)
+                if owner == pos: continue
+                first, second = sorted((findGroup(owner), findGroup(pos)))
+                groupIDs[second] = first
+
+        fileGroups = {}
+        for pos, yearFile in enumerate(yearFiles):
+            fileGroups.setdefault(findGroup(pos), []).append(yearFile)
+        return list(fileGroups.values())
     
     def importYear(self, year):
         yearFiles = self.cceYears[year]['yearFiles']
         for yearFile in yearFiles: self.importFile(yearFile)
     
     def importFile(self, yearFile):
-        print('Importing data from {}'.format(yearFile['filename']))
-        cceFile = CCEFile(self.repo, yearFile, self.dbManager.session)
-        cceFile.loadFileXML()
-        cceFile.readXML()
-        self.dbManager.commitChanges()
+        """Import a year file in batches of batchSize elements, each of which
+        is committed along with the position reached in the file. If an
+        earlier import of the file was interrupted the elements it committed
+        are not imported again, though their entries are still reindexed."""
+        logger.info('Importing data from %s', yearFile['filename'])
+        if self.writer:
+            cceFile = CCEBulkFile(
+                self.source, yearFile, self.dbManager.session, self.writer,
+                batchSize=self.batchSize, onBatch=self.commitBatch
+            )
+        else:
+            cceFile = CCEFile(
+                self.source, yearFile, self.dbManager.session,
+                batchSize=self.batchSize, onBatch=self.commitBatch
+            )
+
+        self.manifest.startFile(yearFile)
+        cceFile.resumeFrom(*self.manifest.resumeState(yearFile))
+        if cceFile.resumePosition > 0:
+            logger.info(
+                'Resuming %s after element %d',
+                yearFile['filename'], cceFile.resumePosition
+            )
+
+        try:
+            if self.stream:
+                cceFile.streamXML()
+            else:
+                cceFile.loadFileXML()
+                cceFile.readXML()
+
+            self.manifest.completeFile(
+                yearFile, cceFile.counts, cceFile.position
+            )
+            self.dbManager.commitChanges()
+        except Exception as err:
+            self.dbManager.rollbackChanges()
+            self.manifest.failFile(
+                yearFile, err, *cceFile.committedState
+            )
+            raise err
+
+        cceFile.progress.finish(**cceFile.counts)
+        for count, value in cceFile.counts.items():
+            metrics.increment('cce.{}'.format(count), value)
+
+    def commitBatch(self, cceFile):
+        """Write and commit a batch of entries. The ids of the changed entries
+        are collected before the session is cleared and are saved as pending
+        until they have been indexed."""
+        with metrics.timer('cce.flush'):
+            if self.writer: self.writer.flush()
+            self.dbManager.session.flush()
+        self.changes.addEntries(cceFile.changedIDs())
+        self.pending.save(self.changes)
+        self.manifest.recordProgress(
+            cceFile.cceFile, cceFile.counts, cceFile.position
+        )
+        with metrics.timer('cce.commit'):
+            self.dbManager.commitChanges()
+        cceFile.clearBatch()
 
 
-class CCEFile():
+workerReader = None
+
+
+def createWorkerManager():
+    """Connect a worker process to the database configured in the
+    environment, as the parent process is."""
+    from sessionManager import SessionManager
+
+    manager = SessionManager()
+    manager.generateEngine()
+    manager.createSession(autoflush=False)
+    return manager
+
+
+def initImportWorker(createManager, source, stream, bulk, batchSize):
+    """Set up the database session and reader used by a worker process in
+    a parallel import. The source is passed pickled from the parent, which
+    reopens its connection or file in the worker."""
+    global workerReader
+
+    configureLogging()
+    workerReader = CCEReader(
+        createManager(), source=source, stream=stream, bulk=bulk,
+        batchSize=batchSize
+    )
+
+
+def scanFileWorker(yearFile):
+    return CCEFile(workerReader.source, yearFile, None).entryKeys()
+
+
+def importGroupWorker(yearFiles):
+    groupResults = []
+    for yearFile in yearFiles:
+        workerReader.changes = ChangeSet()
+        metrics.reset()
+        workerReader.importFile(yearFile)
+        groupResults.append(
+            (yearFile['filename'], workerReader.changes, metrics.snapshot())
+        )
+    return groupResults
+
+
+class CCEFile(RecordFile):
     tagOptions = {
         'header': 'skipElement',
         'page': 'parsePage',
@@ -78,45 +282,160 @@ class CCEFile():
 
     dateTypes = ['regDate', 'copyDate', 'pubDate', 'affDate']
 
-    def __init__(self, repo, cceFile, session):
-        self.repo = repo
+    def __init__(self, source, cceFile, session, batchSize=1000, onBatch=None):
+        self.source = source
         self.cceFile = cceFile
         self.session = session
+        self.batchSize = batchSize
+        self.onBatch = onBatch
 
-        self.xmlString = None
         self.root = None
         self.fileHeader = None
         self.currentPage = 0
         self.pagePos = 0
 
+        self.entryMap = {}
+        self.position = 0
+        self.counts = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+        self.changedKeys = []
+
+        self.resumePosition = 0
+        self.committedState = (dict(self.counts), 0)
+        self.progress = ProgressLogger(
+            logger, cceFile['filename'] if cceFile else 'CCE'
+        )
+
     def loadFileXML(self):
-        yearBlob = self.repo.get_git_blob(self.cceFile['sha'])
-        self.xmlString = base64.b64decode(yearBlob.content)
-        self.root = etree.fromstring(self.xmlString)
+        with self.source.openFile(self.cceFile) as xmlFile:
+            with metrics.timer('cce.parse'):
+                self.root = etree.parse(xmlFile).getroot()
     
     def readXML(self):
         self.loadHeader()
+        self.processBatches(self.root)
+
+    def streamXML(self):
+        """Parse the file incrementally with iterparse rather than building
+        the full tree. Top-level elements are handled in batches as they are
+        read and are then cleared, along with their preceding siblings, so
+        that memory use does not grow with the size of the volume.
+        """
+        with self.source.openFile(self.cceFile) as xmlFile:
+            self.processBatches(self.iterElements(xmlFile), clear=True)
+
+    def entryKeys(self):
+        """Return the UUIDs of the entries in the file, without building the
+        entries or reading the rest of the file into memory."""
+        keys = set()
+        with self.source.openFile(self.cceFile) as xmlFile:
+            for _, entry in etree.iterparse(xmlFile, tag='copyrightEntry'):
+                keys.add(uuidKey(entry.get('id')))
+                entry.clear(keep_tail=True)
+        keys.discard(None)
+        return keys
+
+    def iterElements(self, xmlFile):
+        xmlEvents = etree.iterparse(xmlFile, events=('start', 'end'))
+        _, root = next(xmlEvents)
+
+        for event, child in xmlEvents:
+            if event != 'end' or child.getparent() is not root: continue
+            if child.tag == 'header': self.loadHeader(child)
+            yield child
+
+    def processBatches(self, elements, clear=False):
+        """Group the top-level elements into batches. When streaming, the
+        time spent waiting for the next element is the time spent parsing."""
+        batch = []
+        elements = iter(elements)
+        while True:
+            readStart = time.perf_counter()
+            child = next(elements, None)
+            if clear:
+                metrics.addTime('cce.parse', time.perf_counter() - readStart)
+            if child is None: break
+
+            batch.append(child)
+            if len(batch) >= self.batchSize:
+                self.processBatch(batch, clear)
+                batch = []
+        if len(batch) > 0: self.processBatch(batch, clear)
+
+    def processBatch(self, batch, clear=False):
+        """Prefetch the existing records for a batch of top-level elements,
+        process each element and hand the batch to onBatch to be committed."""
+        entryIDs = [
+            e.get('id') for child in batch for e in child.iter('copyrightEntry')
+        ]
+        with metrics.timer('cce.prefetch'):
+            self.prefetchEntries(entryIDs)
+        for child in batch: self.processElement(child)
+
+        if self.onBatch: self.onBatch(self)
+        self.progress.batch(len(entryIDs), position=self.position)
+
+        if clear:
+            for child in batch: child.clear(keep_tail=True)
+            root = batch[-1].getparent()
+            while batch[-1].getprevious() is not None: del root[0]
+
+    def clearBatch(self):
+        """Remove the committed batch from the session, keeping only the
+        volume, so that the session does not grow with the size of the file."""
+        self.session.expunge_all()
+        if self.fileHeader is not None: self.session.add(self.fileHeader)
+        self.entryMap = {}
+        self.changedKeys = []
+        self.committedState = (dict(self.counts), self.position)
+
+    def prefetchEntries(self, uuids):
+        self.entryMap.update(self.prefetchRecords(CCE, uuids, [
+            selectinload(CCE.registrations),
+            selectinload(CCE.lccns),
+            selectinload(CCE.authors),
+            selectinload(CCE.publishers),
+            selectinload(CCE.xml_sources)
+        ]))
+
+    def processElement(self, child):
+        childOp = getattr(self, CCEFile.tagOptions[child.tag])
+        self.pagePos += 1
+        self.position += 1
+        if self.position <= self.resumePosition:
+            return self.skipResumed(child)
 
-        for child in self.root:
-            childOp = getattr(self, CCEFile.tagOptions[child.tag])
-            self.pagePos += 1
-            try:
-                childOp(child)
-            except DataError as err:
-                print('Caught error')
-                self.createErrorEntry(
-                    getattr(err, 'uuid', child.get('id')),
-                    getattr(err, 'regnum', None),
-                    getattr(err, 'entry', child),
-                    getattr(err, 'message', None)
-                )
-            except Exception as err:
-                print('ERROR', err)
-                print(traceback.print_exc())
-                raise err
+        try:
+            childOp(child)
+        except DataError as err:
+            logger.warning(
+                'Unable to load entry %s on page %s: %s',
+                getattr(err, 'uuid', child.get('id')),
+                self.currentPage,
+                getattr(err, 'message', None)
+            )
+            self.createErrorEntry(
+                getattr(err, 'uuid', child.get('id')),
+                getattr(err, 'regnum', None),
+                getattr(err, 'entry', child),
+                getattr(err, 'message', None)
+            )
+        except Exception as err:
+            logger.exception(
+                'Failed to process %s at element %d', child.tag, self.position
+            )
+            raise err
+
+    def skipResumed(self, child):
+        """Track the page positions of an element that was committed by an
+        earlier import of this file, and mark its entries to be reindexed."""
+        for el in child.iter('page', 'copyrightEntry'):
+            if el.tag == 'page':
+                self.parsePage(el)
+            elif self.matchUUID(el.get('id')) is not None:
+                self.changedKeys.append(uuidKey(el.get('id')))
 
     def skipElement(self, el):
-        print('Skipping element {}'.format(el.tag))
+        logger.debug('Skipping element %s', el.tag)
 
     def parsePage(self, page):
         self.currentPage = page.get('pgnum')
@@ -126,51 +445,78 @@ class CCEFile():
         uuid = entry.get('id')
         
         if 'regnum' not in entry.attrib:
-            print('Entry Missing REGNUM')
             raise DataError(
                 'missing_regnum',
                 uuid=uuid,
                 entry=entry
             )
-        
-        regnums = self.loadRegnums(entry)
-        
-        entryDates = self.loadDates(entry)
+
+        with metrics.timer('cce.hash'):
+            contentHash = self.entryHash(entry, shared)
+        existingRec = self.matchUUID(uuid)
+        if existingRec and existingRec.content_hash == contentHash:
+            self.counts['skipped'] += 1
+            return
+
+        with metrics.timer('cce.extract'):
+            record = EntryRecord(entry)
+            regnums = self.loadRegnums(record)
+            regCount = countRegnums(regnums)
+            entryDates = self.loadDates(record)
         regDates = entryDates['regDate']
-        if(len(regnums) != len(regDates)):
-            if len(regDates) == 1 and len(regnums) > 0:
-                regDates = [regDates[0]] * len(regnums)
+        if(regCount != len(regDates)):
+            if len(regDates) == 1 and regCount > 0:
+                regDates = [regDates[0]] * regCount
             else:
                 raise DataError(
                     'regnum_date_mismatch',
                     uuid=uuid,
-                    regnum='; '.join(regnums),
+                    regnum='; '.join(expandRegnums(regnums)),
                     entry=entry
                 )
         
-        regs = self.createRegistrations(regnums, regDates)
-        existingRec = self.matchUUID(uuid)
-        if existingRec:
-            self.updateEntry(existingRec, entryDates, entry, shared, regs)
-        else:
-            self.createEntry(uuid, entryDates, entry, shared, regs)
+        with metrics.timer('cce.build'):
+            regs = self.createRegistrations(regnums, regDates)
+            if existingRec:
+                self.updateEntry(
+                    existingRec, entryDates, record, shared, regs, contentHash
+                )
+                self.counts['updated'] += 1
+            else:
+                self.createEntry(
+                    uuid, entryDates, record, shared, regs, contentHash
+                )
+                self.counts['inserted'] += 1
+        self.changedKeys.append(uuidKey(uuid))
+
+    def changedIDs(self):
+        """Return the ids of the entries inserted or updated from this file.
+        These are only available once the session has been flushed."""
+        return [self.entryMap[k].id for k in self.changedKeys]
+
+    def entryHash(self, entry, shared):
+        """Hash the canonicalized XML of an entry, along with any elements
+        shared with it in a group and its position in the volume. Entries
+        whose hash matches the stored record are unchanged and are skipped."""
+        entryHash = hashlib.sha256()
+        for el in [entry] + list(shared):
+            entryHash.update(etree.tostring(el, method='c14n'))
+        entryHash.update('{}|{}'.format(self.currentPage, self.pagePos).encode())
+        return entryHash.hexdigest()
 
     def matchUUID(self, uuid):
-        return self.session.query(CCE).filter(CCE.uuid == uuid).one_or_none()
-
-    def createEntry(self, uuid, dates, entry, shared, registrations):
-        titles = self.createTitleList(entry, shared)
-        authors = self.createAuthorList(entry, shared)
-        copies = CCEFile.fetchText(entry, 'copies')
-        description = CCEFile.fetchText(entry, 'desc')
-        newMatter = len(entry.findall('newMatterClaimed')) > 0
-
-        publishers = [
-            (c.text, c.get('claimant', None)) 
-            for c in entry.findall('.//pubName')
-        ]
-
-        lccn = [ lccnorm.normalize(l.text) for l in entry.findall('lccn') ]
+        return self.entryMap.get(uuidKey(uuid), None)
+
+    def createEntry(
+        self, uuid, dates, record, shared, registrations, contentHash=None
+    ):
+        titles = self.createTitleList(record, shared)
+        authors = self.createAuthorList(record, shared)
+        copies = record.copies
+        description = record.description
+        newMatter = record.newMatter
+        publishers = record.publishers
+        lccn = [ lccnorm.normalize(l) for l in record.lccns ]
 
         cceRec = CCE(
             uuid=uuid,
@@ -185,26 +531,31 @@ class CCEFile():
             aff_date=CCEFile.fetchDateValue(dates['affDate'], text=False),
             aff_date_text=CCEFile.fetchDateValue(dates['affDate'], text=True),
             copy_date=CCEFile.fetchDateValue(dates['copyDate'], text=False),
-            copy_date_text=CCEFile.fetchDateValue(dates['copyDate'], text=True)
+            copy_date_text=CCEFile.fetchDateValue(dates['copyDate'], text=True),
+            content_hash=contentHash
         )
         cceRec.addRelationships(
             self.fileHeader,
-            entry,
+            record.element,
             authors=authors,
             publishers=publishers,
             lccn=lccn,
             registrations=registrations
         )
         self.session.add(cceRec)
-        print('INSERT', cceRec)
-
-    def updateEntry(self, rec, dates, entry, shared, registrations):
-        rec.title = self.createTitleList(entry, shared)
-        rec.copies = CCEFile.fetchText(entry, 'copies')
-        rec.description = CCEFile.fetchText(entry, 'desc')
-        rec.new_matter = len(entry.findall('newMatterClaimed')) > 0
+        self.entryMap[uuidKey(uuid)] = cceRec
+        logger.debug('Inserted entry %s', uuid)
+
+    def updateEntry(
+        self, rec, dates, record, shared, registrations, contentHash=None
+    ):
+        rec.title = self.createTitleList(record, shared)
+        rec.copies = record.copies
+        rec.description = record.description
+        rec.new_matter = record.newMatter
         rec.page = self.currentPage
         rec.page_position = self.pagePos
+        rec.content_hash = contentHash
 
         rec.pub_date = CCEFile.fetchDateValue(dates['pubDate'], text=False)
         rec.pub_date_text = CCEFile.fetchDateValue(dates['pubDate'], text=True)
@@ -213,88 +564,49 @@ class CCEFile():
         rec.copy_date = CCEFile.fetchDateValue(dates['copyDate'], text=False)
         rec.copy_date_text = CCEFile.fetchDateValue(dates['copyDate'], text=True)
 
-        authors = self.createAuthorList(entry, shared)
-        publishers = [
-            (c.text, c.get('claimant', None)) 
-            for c in entry.findall('.//pubName')
-        ]
-        lccn = [ lccnorm.normalize(l.text) for l in entry.findall('lccn') ]
+        authors = self.createAuthorList(record, shared)
+        publishers = record.publishers
+        lccn = [ lccnorm.normalize(l) for l in record.lccns ]
 
         rec.updateRelationships(
-            entry,
+            record.element,
             authors=authors,
             publishers=publishers,
             lccn=lccn,
             registrations=registrations
         )
-        print('UPDATE', rec)
+        logger.debug('Updated entry %s', rec.uuid)
 
     def createRegistrations(self, regnums, regdates):
-        registrations = []
-        for x in range(len(regnums)):
-            try:
-                regCat = re.match(r'([A-Z]+)', regnums[x][0]).group(1)
-            except AttributeError:
-                regCat ='Unknown'
-            registrations.append({
-                'regnum': regnums[x], 
-                'category': regCat,
-                'regDate': regdates[x][0],
-                'regDateText': regdates[x][1]
-            })
-        return registrations
-
-    def loadRegnums(self, entry):
-        rawRegnums = entry.get('regnum').strip()
-        regnums = rawRegnums.split(' ')
-        regnums.extend(self.loadAddtlEntries(entry))
-        outNums = []
-        for num in regnums:
-            parsedNum = self.parseRegNum(num)
-            if type(parsedNum) is str: outNums.append(parsedNum)
-            else: outNums.extend(parsedNum)
-        return outNums
-    
-    def loadAddtlEntries(self, entry):
-        moreRegnums = []
-        for addtl in entry.findall('.//additionalEntry'):
-            try:
-                addtlRegnum = addtl.get('regnum').strip()
-                moreRegnums.extend(addtlRegnum.split(' '))
-            except AttributeError:
-                continue
-        return moreRegnums
+        return [
+            {
+                'regnum': regnum,
+                'category': regnumCategory(regnum),
+                'regDate': regDate[0],
+                'regDateText': regDate[1]
+            }
+            for regnum, regDate in zip(expandRegnums(regnums), regdates)
+        ]
+
+    def loadRegnums(self, record):
+        """Return the registration numbers of an entry and its additional
+        entries, with any ranges kept as RegnumRange objects."""
+        regnums = record.regnum.strip().split(' ')
+        regnums.extend(record.additionalRegnums)
+        return [self.parseRegNum(num) for num in regnums]
     
     def parseRegNum(self, num):
         try:
-            if (
-                re.search(r'[0-9]+\-[A-Z0-9]+', num)
-                and num[2] != '0'
-                and num[:2] != 'B5'
-            ):
-                regnumRange = num.split('-')
-                regRangePrefix = re.match(r'([A-Z]+)', regnumRange[0]).group(1)
-                regRangeStart = int(regnumRange[0].replace(regRangePrefix, ''))
-                regRangeEnd = int(regnumRange[1].replace(regRangePrefix, ''))
-                if regRangeEnd - regRangeStart < 1000:
-                    return [ 
-                        '{}{}'.format(regRangePrefix, str(i))
-                        for i in range(regRangeStart, regRangeEnd)
-                    ]
-        except (ValueError, AttributeError) as err:
-            print('RANGE ERROR', self.currentPage, self.pagePos)
-            raise DataError('regnum_range_parsing_error')
-        
-        return num
-
-    def loadDates(self, entry):
-        dates = {}
-        for dType in CCEFile.dateTypes:
-            dates[dType] = [
-                (CCEFile.parseDate(d.get('date', None), '%Y-%m-%d'), d.text)
-                for d in entry.findall('.//{}'.format(dType))
-                if not ('ignore' in d.attrib and d.get('ignore') == 'yes')
-            ]
+            return parseRegnum(num)
+        except DataError as err:
+            logger.debug(
+                'Unable to parse regnum range %s on page %s, position %d',
+                num, self.currentPage, self.pagePos
+            )
+            raise err
+
+    def loadDates(self, record):
+        dates = record.dates
         if len(dates['regDate']) < 1:
             if len(dates['copyDate']) > 0:
                 dates['regDate'].append(dates['copyDate'][0])
@@ -303,23 +615,13 @@ class CCEFile():
         
         return dates
 
-    @staticmethod
-    def parseDate(date, dateFormat):
-        if date is None or dateFormat == '': return None
-
-        try:
-            outDate = datetime.strptime(date, dateFormat)
-            return outDate.strftime('%Y-%m-%d')
-        except ValueError:
-            return CCEFile.parseDate(date, dateFormat[:-3])
-
-    def createTitleList(self, entry, shared):
+    def createTitleList(self, record, shared):
         return '; '.join([
-            t.text 
-            for t in entry.findall('.//title') + [
-                t for t in shared if t.tag == 'title'
+            t
+            for t in record.titles + [
+                t.text for t in shared if t.tag == 'title'
             ]
-            if t.text is not None
+            if t is not None
         ])
 
     def createErrorEntry(self, uuid, regnum, entry, reason):
@@ -333,6 +635,7 @@ class CCEFile():
         errorCCE.volume = self.fileHeader
         errorCCE.addXML(entry)
         self.session.add(errorCCE)
+        self.counts['errors'] += 1
 
     def parseGroup(self, group):
         entries = []
@@ -349,16 +652,12 @@ class CCEFile():
                 err.uuid = entry.get('id')
                 raise err
         
-    def createAuthorList(self, rec, shared=[]):
+    def createAuthorList(self, record, shared=[]):
         authors = [
-            (a.text, False) for a in rec.findall('.//authorName')
-            if len(list(a.itersiblings(tag='role', preceding=True))) > 0
+            (name, False) for name, hasRole in record.authors if hasRole
         ]
-        if len(authors) < 1:
-            try:
-                authors.append((rec.findall('.//authorName')[0].text, False))
-            except IndexError:
-                pass
+        if len(authors) < 1 and len(record.authors) > 0:
+            authors.append((record.authors[0][0], False))
         
         authors.extend([
             (a.text, False) for a in shared if a.tag == 'authorName'
@@ -371,8 +670,8 @@ class CCEFile():
         
         return authors
     
-    def loadHeader(self):
-        header = self.root.find('.//header')
+    def loadHeader(self, header=None):
+        if header is None: header = self.root.find('.//header')
 
         startNum = endNum = None
         if header.find('cite/division/numbers') is not None:
@@ -392,25 +691,27 @@ class CCEFile():
             'part': CCEFile.fetchText(header, 'cite/division/part'),
             'group': CCEFile.fetchText(header, 'cite/division/group'),
             'material': CCEFile.fetchText(header, 'cite/division/material'),
-            'numbers': {
-                'start': startNum,
-                'end': endNum
-            }  
+            'start_number': startNum,
+            'end_number': endNum
         }
-        
-        self.fileHeader = Volume(
-            source=headerDict['source'],
-            status=headerDict['status'],
-            series=headerDict['series'],
-            volume=headerDict['volume'],
-            year=headerDict['year'],
-            part=headerDict['part'],
-            group=headerDict['group'],
-            material=headerDict['material'],
-            start_number=headerDict['numbers']['start'],
-            end_number=headerDict['numbers']['end']
-        )
-        self.session.add(self.fileHeader)
+
+        self.fileHeader = self.matchVolume()
+        if self.fileHeader is None:
+            self.fileHeader = Volume(
+                path=self.cceFile['path'] if self.cceFile else None
+            )
+            self.session.add(self.fileHeader)
+        for field, value in headerDict.items():
+            setattr(self.fileHeader, field, value)
+
+    def matchVolume(self):
+        """Return the volume created by an earlier import of this file, so
+        that resuming or re-importing a file does not create another."""
+        if self.cceFile is None: return None
+        return self.session.query(Volume)\
+            .filter(Volume.path == self.cceFile['path'])\
+            .order_by(Volume.id.desc())\
+            .first()
 
     @staticmethod
     def fetchText(parent, tag):
@@ -421,3 +722,87 @@ class CCEFile():
     def fetchDateValue(date, text=False):
         x = 1 if text else 0
         return date[0][x] if len(date) > 0 else None
+
+
+class CCEBulkFile(CCEFile):
+    """A CCEFile for loading into an empty database. Rather than building
+    ORM objects each entry is written as plain rows to a CopyWriter, which
+    inserts them with COPY. Only volumes and error entries go through the
+    session, so that their ids are available to the copied rows.
+    """
+    def __init__(
+        self, source, cceFile, session, writer, batchSize=1000, onBatch=None
+    ):
+        super().__init__(source, cceFile, session, batchSize, onBatch)
+        self.writer = writer
+
+    def prefetchEntries(self, uuids):
+        pass
+
+    def changedIDs(self):
+        return [self.writer.entryIDs[k] for k in self.changedKeys]
+
+    def loadHeader(self, header=None):
+        super().loadHeader(header)
+        self.session.flush()
+
+    def matchUUID(self, uuid):
+        entryKey = uuidKey(uuid)
+        if entryKey not in self.writer.entryIDs: return None
+
+        self.writer.flush()
+        return self.session.query(CCE)\
+            .filter(CCE.uuid == UUID(entryKey))\
+            .order_by(CCE.id)\
+            .first()
+
+    def createEntry(
+        self, uuid, dates, record, shared, registrations, contentHash=None
+    ):
+        cceID = self.writer.nextID('cce')
+        xmlID = self.writer.nextID('xml')
+        self.writer.entryIDs[uuidKey(uuid)] = cceID
+
+        self.writer.addRow('cce', (
+            cceID,
+            uuid,
+            self.currentPage,
+            self.pagePos,
+            self.createTitleList(record, shared),
+            record.copies,
+            record.description,
+            record.newMatter,
+            CCEFile.fetchDateValue(dates['pubDate'], text=False),
+            CCEFile.fetchDateValue(dates['pubDate'], text=True),
+            CCEFile.fetchDateValue(dates['copyDate'], text=False),
+            CCEFile.fetchDateValue(dates['copyDate'], text=True),
+            CCEFile.fetchDateValue(dates['affDate'], text=False),
+            CCEFile.fetchDateValue(dates['affDate'], text=True),
+            self.fileHeader.id,
+            contentHash
+        ))
+
+        for name, primary in self.createAuthorList(record, shared):
+            if name is None: continue
+            self.writer.addRow('author', (name, primary, cceID))
+
+        for name, claimant in record.publishers:
+            if name is None: continue
+            self.writer.addRow('publisher', (name, claimant == 'yes', cceID))
+
+        for lccn in record.lccns:
+            self.writer.addRow('lccn', (lccnorm.normalize(lccn), cceID))
+
+        for reg in registrations:
+            self.writer.addRow('registration', (
+                reg['regnum'],
+                reg['category'],
+                reg['regDate'],
+                reg['regDateText'],
+                cceID
+            ))
+
+        self.writer.addRow('xml', (
+            xmlID, etree.tostring(record.element, encoding='utf-8').decode()
+        ))
+        self.writer.addRow('entry_xml', (cceID, xmlID))
@@ -0,0 +1,94 @@
+from datetime import datetime
+from io import StringIO
+
+
+class CopyWriter():
+    """Buffers plain row tuples and writes them to PostgreSQL with
+    COPY FROM STDIN. This bypasses the ORM entirely and is intended for
+    loading records into an empty database. Primary keys for tables that are
+    referenced by other rows are drawn from the table's sequence in blocks
+    so that foreign keys can be set before anything is written.
+    """
+    tables = [
+        ('cce', [
+            'id', 'uuid', 'page', 'page_position', 'title', 'copies',
+            'description', 'new_matter', 'pub_date', 'pub_date_text',
+            'copy_date', 'copy_date_text', 'aff_date', 'aff_date_text',
+            'volume_id', 'content_hash'
+        ], True),
+        ('xml', ['id', 'xml_source'], True),
+        ('author', ['name', 'primary', 'cce_id'], True),
+        ('publisher', ['name', 'claimant', 'cce_id'], True),
+        ('lccn', ['lccn', 'cce_id'], True),
+        ('registration', [
+            'regnum', 'category', 'reg_date', 'reg_date_text', 'cce_id'
+        ], True),
+        ('entry_xml', ['cce_id', 'xml_id'], False)
+    ]
+
+    def __init__(self, session, batchSize=50000, idBlockSize=10000):
+        self.session = session
+        self.batchSize = batchSize
+        self.idBlockSize = idBlockSize
+        self.timestamp = datetime.now()
+
+        self.rows = {table[0]: [] for table in CopyWriter.tables}
+        self.rowCount = 0
+        self.ids = {}
+        self.entryIDs = {}
+
+    def nextID(self, table):
+        """Return the next primary key for the table, reserving a new block
+        of values from its sequence when the current block is used up."""
+        if len(self.ids.get(table, [])) < 1:
+            cursor = self.session.connection().connection.cursor()
+            cursor.execute(
+                'SELECT nextval(%s) FROM generate_series(1, %s)',
+                ('{}_id_seq'.format(table), self.idBlockSize)
+            )
+            self.ids[table] = [r[0] for r in reversed(cursor.fetchall())]
+            cursor.close()
+        return self.ids[table].pop()
+
+    def addRow(self, table, row):
+        self.rows[table].append(row)
+        self.rowCount += 1
+        if self.rowCount >= self.batchSize: self.flush()
+
+    def flush(self):
+        if self.rowCount < 1: return
+        cursor = self.session.connection().connection.cursor()
+        for table, columns, timestamps in CopyWriter.tables:
+            tableRows = self.rows[table]
+            if len(tableRows) < 1: continue
+            if timestamps: columns = columns + ['date_created', 'date_modified']
+
+            copyBuffer = StringIO()
+            for row in tableRows:
+                if timestamps: row = row + (self.timestamp, self.timestamp)
+                copyBuffer.write('\t'.join(
+                    CopyWriter.formatValue(v) for v in row
+                ))
+                copyBuffer.write('\n')
+            copyBuffer.seek(0)
+
+            cursor.copy_expert(
+                'COPY {} ({}) FROM STDIN'.format(
+                    table, ', '.join('"{}"'.format(c) for c in columns)
+                ),
+                copyBuffer
+            )
+            self.rows[table] = []
+        cursor.close()
+        self.rowCount = 0
+
+    @staticmethod
+    def formatValue(value):
+        if value is None: return '\\N'
+        if value is True: return 't'
+        if value is False: return 'f'
+        return str(value)\
+            .replace('\\', '\\\\')\
+            .replace('\t', '\\t')\
+            .replace('\n', '\\n')\
+            .replace('\r', '\\r')
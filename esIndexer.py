@@ -1,6 +1,12 @@
 import os
 from datetime import datetime
-from elasticsearch.helpers import bulk, BulkIndexError, streaming_bulk
+import time
+from elasticsearch.helpers import (
+    bulk,
+    BulkIndexError,
+    streaming_bulk,
+    parallel_bulk
+)
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import (
     ConnectionError,
@@ -11,28 +17,51 @@ from elasticsearch_dsl import connections
 from elasticsearch_dsl.wrappers import Range
 
 from sqlalchemy import or_
-from sqlalchemy.orm import configure_mappers, raiseload
+from sqlalchemy.orm import configure_mappers, raiseload, selectinload
 from sqlalchemy.dialects import postgresql
 
 from model.cce import CCE as dbCCE
-from model.renewal import Renewal as dbRenewal
+from model.renewal import Renewal as dbRenewal, RENEWAL_REG
 from model.registration import Registration as dbRegistration
+from helpers.logger import createLogger, ProgressLogger
+from helpers.metrics import metrics
 from model.elastic import (
     CCE,
     Registration,
     Renewal,
-    Claimant
+    Claimant,
+    VolumeSource,
+    RenewalSummary
 )
 
+logger = createLogger(__name__)
+
 
 class ESIndexer():
-    def __init__(self, manager, loadFromTime):
+    pageSize = 1000
+
+    def __init__(
+        self, manager, loadFromTime, threads=None, chunkSize=None,
+        maxChunkBytes=None, changes=None
+    ):
         self.cce_index = os.environ['ES_CCE_INDEX']
         self.ccr_index = os.environ['ES_CCR_INDEX']
         self.client = None
         self.session = manager.session
+        self.changes = changes
+        self.fullRebuild = loadFromTime is None and changes is None
         self.loadFromTime = loadFromTime if loadFromTime else datetime.strptime('1970-01-01', '%Y-%m-%d')
 
+        self.threads = threads if threads else int(
+            os.environ.get('ES_BULK_THREADS', 4)
+        )
+        self.chunkSize = chunkSize if chunkSize else int(
+            os.environ.get('ES_BULK_CHUNK_SIZE', 500)
+        )
+        self.maxChunkBytes = maxChunkBytes if maxChunkBytes else int(
+            os.environ.get('ES_BULK_MAX_BYTES', 104857600)
+        )
+
         self.createElasticConnection()
         self.createIndex()
 
@@ -48,63 +77,207 @@ class ESIndexer():
                 timeout=timeout
             )
         except ConnectionError as err:
-            print('Failed to connect to ElasticSearch instance')
+            logger.error('Failed to connect to ElasticSearch instance')
             raise err
         connections.connections._conns['default'] = self.client
 
     def createIndex(self):
-        if self.client.indices.exists(index=self.cce_index) is False:
-            CCE.init()
-        if self.client.indices.exists(index=self.ccr_index) is False:
-            Renewal.init()
+        # init also adds any new fields to the mapping of an existing index
+        CCE.init()
+        Renewal.init()
     
     def indexRecords(self, recType='cce'):
         """Process the current batch of updating records. This utilizes the
-        elasticsearch-py bulk helper to import records in chunks of the
-        provided size. If a record in the batch errors that is reported and
-        logged but it does not prevent the other records in the batch from
-        being imported.
+        elasticsearch-py parallel bulk helper to import records in chunks of
+        the configured size across several threads. If a record in the batch
+        errors that is reported and logged but it does not prevent the other
+        records in the batch from being imported. For full rebuilds index
+        refreshes and replicas are disabled until indexing has finished.
         """
+        index = self.cce_index if recType == 'cce' else self.ccr_index
+        if self.fullRebuild: prevSettings = self.disableRefresh(index)
+
         success, failure = 0, 0
         errors = []
+        progress = ProgressLogger(logger, 'Indexing {}'.format(recType))
+        startTime = time.perf_counter()
         try:
-            for status, work in streaming_bulk(self.client, self.process(recType)):
-                print(status, work)
+            for status, work in parallel_bulk(
+                self.client,
+                self.process(recType),
+                thread_count=self.threads,
+                chunk_size=self.chunkSize,
+                max_chunk_bytes=self.maxChunkBytes
+            ):
                 if not status:
+                    logger.warning('Failed to index document: %s', work)
                     errors.append(work)
                     failure += 1
                 else:
                     success += 1
-            
-            print('Success {} | Failure: {}'.format(success, failure))
+                progress.update(failures=failure)
+
+            progress.finish(success=success, failures=failure)
+            metrics.increment('es.{}.indexed'.format(recType), success)
+            metrics.increment('es.{}.failed'.format(recType), failure)
         except BulkIndexError as err:
-            print('One or more records in the chunk failed to import')
+            logger.error('One or more records in the chunk failed to import')
             raise err
+        finally:
+            if self.fullRebuild: self.restoreRefresh(index, prevSettings)
+            metrics.addTime(
+                'es.{}.index'.format(recType), time.perf_counter() - startTime
+            )
+
+    def disableRefresh(self, index):
+        indexSettings = self.client.indices.get_settings(
+            index=index, flat_settings=True
+        )
+        prevSettings = list(indexSettings.values())[0]['settings']
+        self.client.indices.put_settings(index=index, body={
+            'index.refresh_interval': '-1',
+            'index.number_of_replicas': 0
+        })
+        return prevSettings
+
+    def restoreRefresh(self, index, prevSettings):
+        self.client.indices.put_settings(index=index, body={
+            'index.refresh_interval': prevSettings.get(
+                'index.refresh_interval', None
+            ),
+            'index.number_of_replicas': prevSettings.get(
+                'index.number_of_replicas', 1
+            )
+        })
+        self.client.indices.refresh(index=index)
 
     def process(self, recType):
+        """Yield the bulk actions for the records to index. These are
+        generated while earlier chunks are being sent, so the es.*.build and
+        es.*.load times overlap with the es.*.index time."""
+        buildStage = 'es.{}.build'.format(recType)
         if recType == 'cce':
             for cce in self.retrieveEntries():
-                esEntry = ESDoc(cce)
-                esEntry.indexEntry()
-                yield esEntry.entry.to_dict(True)
+                with metrics.timer(buildStage):
+                    esEntry = ESDoc(cce)
+                    esEntry.indexEntry()
+                    action = esEntry.entry.to_dict(True)
+                yield action
         elif recType == 'ccr':
             for ccr in self.retrieveRenewals():
-                esRen = ESRen(ccr)
-                esRen.indexRen()
-                if esRen.renewal.rennum == '': continue
-                yield esRen.renewal.to_dict(True)
+                with metrics.timer(buildStage):
+                    esRen = ESRen(ccr)
+                    esRen.indexRen()
+                    if esRen.renewal.rennum == '': continue
+                    action = esRen.renewal.to_dict(True)
+                yield action
+
+    def expandChanges(self):
+        """Add to the change set the records whose documents include data
+        from a changed record. Entry documents include summaries of their
+        renewals and renewal documents include their registrations, so
+        each side of a changed link must be reindexed."""
+        entryIDs = set(self.changes.entryIDs)
+        renewalIDs = set(self.changes.renewalIDs)
+        linkQuery = self.session.query(
+                RENEWAL_REG.c.renewal_id, dbRegistration.cce_id
+            )\
+            .join(
+                dbRegistration,
+                dbRegistration.id == RENEWAL_REG.c.registration_id
+            )
+
+        for recIDs, column in [
+            (sorted(renewalIDs), RENEWAL_REG.c.renewal_id),
+            (sorted(entryIDs), dbRegistration.cce_id)
+        ]:
+            for i in range(0, len(recIDs), ESIndexer.pageSize):
+                batchQuery = linkQuery.filter(
+                    column.in_(recIDs[i:i + ESIndexer.pageSize])
+                )
+                for renewalID, cceID in batchQuery.all():
+                    self.changes.addEntries([cceID])
+                    self.changes.addRenewals([renewalID])
+
+    def deleteRecords(self):
+        """Remove renewal documents whose renewal number is no longer used
+        by the renewal, as renewal documents are keyed by that number."""
+        deleteActions = [
+            {
+                '_op_type': 'delete',
+                '_index': self.ccr_index,
+                '_type': 'doc',
+                '_id': renewalNum
+            }
+            for renewalNum in self.changes.deletedRenewals
+        ]
+        deleted = 0
+        for status, work in streaming_bulk(
+            self.client, deleteActions, raise_on_error=False
+        ):
+            if status: deleted += 1
+            elif work['delete'].get('status', None) != 404:
+                logger.warning('Failed to delete document: %s', work)
+        logger.info('Deleted %d renewal documents', deleted)
 
     def retrieveEntries(self):
-        retQuery = self.session.query(dbCCE)\
-            .filter(dbCCE.date_modified > self.loadFromTime)
-        for cce in retQuery.all():
-            yield cce
+        return self.retrieveRecords(dbCCE, [
+            selectinload(dbCCE.authors),
+            selectinload(dbCCE.publishers),
+            selectinload(dbCCE.lccns),
+            selectinload(dbCCE.volume),
+            selectinload(dbCCE.registrations)
+                .selectinload(dbRegistration.renewals)
+                .selectinload(dbRenewal.claimants)
+        ], self.changes.entryIDs if self.changes is not None else None,
+        stage='es.cce.load')
     
     def retrieveRenewals(self):
-        renQuery = self.session.query(dbRenewal)\
-            .filter(dbRenewal.date_modified > self.loadFromTime)
-        for ccr in renQuery.all():
-            yield ccr
+        return self.retrieveRecords(dbRenewal, [
+            selectinload(dbRenewal.claimants),
+            selectinload(dbRenewal.registrations)
+                .selectinload(dbRegistration.cce)
+        ], self.changes.renewalIDs if self.changes is not None else None,
+        stage='es.ccr.load')
+
+    def retrieveRecords(
+        self, model, loadOptions, recIDs=None, stage='es.load'
+    ):
+        """Yield the records modified since loadFromTime, or the records with
+        the given ids, in pages ordered by id. Each page is fetched with a
+        keyset condition on the last id seen (or the next slice of ids) and its
+        child collections are loaded with one query each. Once a page has been
+        yielded it is removed from the session so that memory use does not
+        grow with the number of records being indexed.
+        """
+        if recIDs is not None: recIDs = sorted(recIDs)
+
+        lastID = 0
+        pagePos = 0
+        while True:
+            recQuery = self.session.query(model)
+            if recIDs is None:
+                recQuery = recQuery\
+                    .filter(model.date_modified > self.loadFromTime)\
+                    .filter(model.id > lastID)
+            else:
+                pageIDs = recIDs[pagePos:pagePos + ESIndexer.pageSize]
+                if len(pageIDs) < 1: break
+                recQuery = recQuery.filter(model.id.in_(pageIDs))
+                pagePos += ESIndexer.pageSize
+
+            with metrics.timer(stage):
+                recPage = recQuery\
+                    .order_by(model.id)\
+                    .options(*loadOptions)\
+                    .limit(ESIndexer.pageSize)\
+                    .all()
+            if len(recPage) < 1 and recIDs is None: break
+
+            for rec in recPage: yield rec
+
+            if len(recPage) > 0: lastID = recPage[-1].id
+            self.session.expunge_all()
 
 
 class ESDoc():
@@ -115,7 +288,7 @@ class ESDoc():
         self.initEntry()
     
     def initEntry(self):
-        print('Creating ES record for {}'.format(self.dbRec))
+        logger.debug('Creating ES record for entry %s', self.dbRec.uuid)
 
         self.entry = CCE(meta={'id': self.dbRec.uuid})
 
@@ -125,10 +298,54 @@ class ESDoc():
         self.entry.authors = [ a.name for a in self.dbRec.authors ]
         self.entry.publishers = [ p.name for p in self.dbRec.publishers ]
         self.entry.lccns = [ l.lccn for l in self.dbRec.lccns ]
+        self.entry.copies = self.dbRec.copies
+        self.entry.description = self.dbRec.description
+        self.entry.pub_date = self.dbRec.pub_date
+        self.entry.pub_date_text = self.dbRec.pub_date_text
+        self.entry.copy_date = self.dbRec.copy_date
+        self.entry.copy_date_text = self.dbRec.copy_date_text
+        self.entry.page = self.dbRec.page
+        self.entry.page_position = self.dbRec.page_position
         self.entry.registrations = [
-            Registration(regnum=r.regnum, regdate=r.reg_date)
+            Registration(
+                regnum=r.regnum,
+                regdate=r.reg_date,
+                regdate_text=r.reg_date_text
+            )
             for r in self.dbRec.registrations
         ]
+        self.entry.source = VolumeSource(
+            url=self.dbRec.volume.source,
+            series=self.dbRec.volume.series,
+            year=self.dbRec.volume.year,
+            part=self.dbRec.volume.part
+        ) if self.dbRec.volume else None
+        self.entry.renewals = [
+            ESDoc.renewalSummary(ren)
+            for reg in self.dbRec.registrations
+            for ren in reg.renewals
+        ]
+
+    @staticmethod
+    def renewalSummary(ren):
+        return RenewalSummary(
+            uuid=ren.uuid,
+            rennum=ren.renewal_num,
+            rendate_text=ren.renewal_date_text,
+            title=ren.title,
+            authors=ren.author,
+            new_matter=ren.new_matter,
+            notes=ren.notes,
+            volume=ren.volume,
+            part=ren.part,
+            number=ren.number,
+            page=ren.page,
+            source=ren.source,
+            claimants=[
+                Claimant(name=c.name, claim_type=c.claimant_type)
+                for c in ren.claimants
+            ]
+        )
 
 
 class ESRen():
@@ -139,7 +356,7 @@ class ESRen():
         self.initRenewal()
     
     def initRenewal(self):
-        print('Creating ES record for {}'.format(self.dbRen))
+        logger.debug('Creating ES record for renewal %s', self.dbRen.uuid)
 
         self.renewal = Renewal(meta={'id': self.dbRen.renewal_num})
 
@@ -149,7 +366,24 @@ class ESRen():
         self.renewal.rendate = self.dbRen.renewal_date
         self.renewal.title = self.dbRen.title
         self.renewal.authors = self.dbRen.author
+        self.renewal.rendate_text = self.dbRen.renewal_date_text
+        self.renewal.new_matter = self.dbRen.new_matter
+        self.renewal.notes = self.dbRen.notes
+        self.renewal.volume = self.dbRen.volume
+        self.renewal.part = self.dbRen.part
+        self.renewal.number = self.dbRen.number
+        self.renewal.page = self.dbRen.page
+        self.renewal.source = self.dbRen.source
         self.renewal.claimants = [
             Claimant(name=c.name, claim_type=c.claimant_type)
             for c in self.dbRen.claimants
         ]
+        self.renewal.registrations = [
+            Registration(
+                regnum=r.regnum,
+                regdate=r.reg_date,
+                regdate_text=r.reg_date_text,
+                cce_uuid=r.cce.uuid if r.cce else None
+            )
+            for r in self.dbRen.registrations
+        ]
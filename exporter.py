@@ -0,0 +1,172 @@
+import csv
+from io import StringIO
+import json
+import os
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import configure_mappers, selectinload
+
+from helpers.logger import createLogger, ProgressLogger
+from helpers.metrics import metrics
+from helpers.serialize import entryOptions, serializeEntry, serializeRenewal
+from model.cce import CCE
+from model.registration import Registration
+from model.renewal import Renewal, RENEWAL_REG
+
+logger = createLogger(__name__)
+
+
+class Exporter():
+    """Streams the contents of the database as newline delimited JSON or
+    CSV, optionally gzipped, for publishing as bulk dumps. Each table is
+    exported as one row per record, read through a server-side cursor
+    EXPORT_BUFFER rows at a time. The linked export is JSON only and
+    contains each entry in the form returned by the API, with its
+    registrations and renewals, followed by every renewal that is not linked
+    to a registration; these are read in pages that are removed from the
+    session once written. In either case memory use does not grow with the
+    size of the database.
+    """
+    tables = {
+        'cce': CCE.__table__,
+        'registration': Registration.__table__,
+        'renewal_registration': RENEWAL_REG,
+        'renewal': Renewal.__table__
+    }
+    recordTypes = list(tables.keys()) + ['linked']
+    formats = ['ndjson', 'csv']
+    contentTypes = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    pageSize = 1000
+    chunkSize = 65536
+
+    def __init__(self, session, recordType, outFormat='ndjson', buffer=None):
+        if recordType not in Exporter.recordTypes:
+            raise ValueError('Unknown record type {}'.format(recordType))
+        if outFormat not in Exporter.formats:
+            raise ValueError('Unknown format {}'.format(outFormat))
+        if recordType == 'linked' and outFormat != 'ndjson':
+            raise ValueError('Linked records can only be exported as ndjson')
+
+        self.session = session
+        self.recordType = recordType
+        self.format = outFormat
+        self.buffer = int(buffer or os.environ.get('EXPORT_BUFFER', 1000))
+        self.progress = ProgressLogger(
+            logger, 'Exporting {}'.format(recordType)
+        )
+
+    def records(self):
+        if self.recordType == 'linked': return self.linkedRecords()
+        return self.tableRows(Exporter.tables[self.recordType])
+
+    def tableRows(self, table):
+        rowQuery = select(table)\
+            .order_by(*table.primary_key.columns)\
+            .execution_options(
+                stream_results=True, max_row_buffer=self.buffer
+            )
+        for row in self.session.execute(rowQuery):
+            yield dict(row._mapping)
+
+    def linkedRecords(self):
+        configure_mappers()
+        for entry in self.pagedRecords(
+            self.session.query(CCE), CCE, entryOptions()
+        ):
+            record = serializeEntry(entry)
+            record['type'] = 'registration'
+            yield record
+
+        orphanQuery = self.session.query(Renewal)\
+            .filter(~Renewal.registrations.any())
+        for renewal in self.pagedRecords(
+            orphanQuery, Renewal, [selectinload(Renewal.claimants)]
+        ):
+            yield serializeRenewal(renewal)
+
+    def pagedRecords(self, recQuery, model, loadOptions):
+        """Yield records in pages ordered by id, fetching each page with a
+        keyset condition on the last id seen and clearing it from the
+        session once it has been written, as the indexer does."""
+        lastID = 0
+        while True:
+            recPage = recQuery\
+                .filter(model.id > lastID)\
+                .order_by(model.id)\
+                .options(*loadOptions)\
+                .limit(Exporter.pageSize)\
+                .all()
+            if len(recPage) < 1: break
+
+            for rec in recPage: yield rec
+
+            lastID = recPage[-1].id
+            self.session.expunge_all()
+
+    def lines(self):
+        """Yield the export as text, a line per record (after a header
+        line for CSV)."""
+        if self.format == 'csv':
+            return self.csvLines()
+        return self.jsonLines()
+
+    def jsonLines(self):
+        for record in self.records():
+            yield json.dumps(record, default=str) + '\n'
+            self.progress.update()
+
+    def csvLines(self):
+        table = Exporter.tables[self.recordType]
+        lineBuffer = StringIO()
+        writer = csv.writer(lineBuffer)
+        writer.writerow([c.name for c in table.columns])
+
+        for record in self.records():
+            writer.writerow([record[c.name] for c in table.columns])
+            yield lineBuffer.getvalue()
+            lineBuffer.seek(0)
+            lineBuffer.truncate()
+            self.progress.update()
+        if lineBuffer.tell() > 0: yield lineBuffer.getvalue()
+
+    def chunks(self, compress=False):
+        """Yield the export as encoded chunks of about chunkSize bytes,
+        gzipped as they are produced if compress is set."""
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        chunk = []
+        chunkLength = 0
+        with metrics.timer('export.{}'.format(self.recordType)):
+            for line in self.lines():
+                encoded = line.encode('utf-8')
+                chunk.append(encoded)
+                chunkLength += len(encoded)
+                if chunkLength < Exporter.chunkSize: continue
+
+                data = b''.join(chunk)
+                chunk = []
+                chunkLength = 0
+                if compressor: data = compressor.compress(data)
+                if data: yield data
+
+            data = b''.join(chunk)
+            if compressor:
+                data = compressor.compress(data) + compressor.flush()
+            if data: yield data
+        self.progress.finish()
+        metrics.increment(
+            'export.{}'.format(self.recordType), self.progress.count
+        )
+
+    def writeFile(self, path, compress=None):
+        """Write the export to a file, gzipped if compress is set or, by
+        default, if the path ends with .gz. The file is replaced once
+        complete."""
+        if compress is None: compress = path.endswith('.gz')
+        tmpPath = '{}.tmp'.format(path)
+        with open(tmpPath, 'wb') as exportFile:
+            for data in self.chunks(compress=compress):
+                exportFile.write(data)
+        os.replace(tmpPath, path)
+        logger.info('Wrote %s export to %s', self.recordType, path)
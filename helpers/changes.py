@@ -0,0 +1,79 @@
+from model.pendingIndex import PendingIndex
+
+
+class ChangeSet():
+    """Collects the ids of the entries and renewals that were inserted or
+    updated during a run, and the ElasticSearch ids of renewal documents that
+    no longer exist, so that only those records need to be reindexed."""
+    def __init__(self):
+        self.entryIDs = set()
+        self.renewalIDs = set()
+        self.deletedRenewals = set()
+
+    def addEntries(self, entryIDs):
+        self.entryIDs.update(i for i in entryIDs if i is not None)
+
+    def addRenewals(self, renewalIDs):
+        self.renewalIDs.update(i for i in renewalIDs if i is not None)
+
+    def deleteRenewal(self, renewalNum):
+        if renewalNum: self.deletedRenewals.add(renewalNum)
+
+    def merge(self, other):
+        self.entryIDs.update(other.entryIDs)
+        self.renewalIDs.update(other.renewalIDs)
+        self.deletedRenewals.update(other.deletedRenewals)
+
+    def __len__(self):
+        return len(self.entryIDs) + len(self.renewalIDs)\
+            + len(self.deletedRenewals)
+
+
+class PendingChanges():
+    """Persists a ChangeSet in the pending_index table so that changes
+    committed by an import are not lost if the run stops before they have
+    been indexed. The ids changed by each batch are saved in the same
+    transaction as the batch and the manifest, the pending changes of an
+    earlier run are added to the ChangeSet of the next run, and they are
+    cleared once indexing has succeeded."""
+    recordTypes = {
+        'cce': ('entryIDs', int),
+        'ccr': ('renewalIDs', int),
+        'deleted': ('deletedRenewals', str)
+    }
+
+    def __init__(self, session):
+        self.session = session
+        self.saved = {recType: set() for recType in PendingChanges.recordTypes}
+
+    def save(self, changes):
+        """Add the changes not yet saved to the current transaction."""
+        newRows = []
+        for recType, (attr, _) in PendingChanges.recordTypes.items():
+            newKeys = getattr(changes, attr) - self.saved[recType]
+            newRows.extend(
+                {'record_type': recType, 'record_key': str(key)}
+                for key in newKeys
+            )
+            self.saved[recType].update(newKeys)
+        if len(newRows) > 0:
+            self.session.execute(PendingIndex.__table__.insert(), newRows)
+
+    def load(self, changes):
+        """Add the changes left pending by earlier runs to a ChangeSet and
+        return the number loaded."""
+        pendingQuery = self.session.query(
+            PendingIndex.record_type, PendingIndex.record_key
+        )
+        loaded = 0
+        for recType, key in pendingQuery.all():
+            attr, keyType = PendingChanges.recordTypes[recType]
+            getattr(changes, attr).add(keyType(key))
+            self.saved[recType].add(keyType(key))
+            loaded += 1
+        return loaded
+
+    def clear(self):
+        self.session.query(PendingIndex).delete()
+        self.session.commit()
+        for savedKeys in self.saved.values(): savedKeys.clear()
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from functools import lru_cache
+import re
+
+DATE_CACHE_SIZE = 32768
+
+datePattern = re.compile(r'^([0-9]{4})(?:-([0-9]{1,2})(?:-([0-9]{1,2}))?)?$')
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def normalizeDate(dateText):
+    """Normalize a full or partial ISO date (YYYY, YYYY-MM or YYYY-MM-DD) to
+    a YYYY-MM-DD string, filling in the first month and day where they are
+    missing. Returns None for values that are not valid dates, including
+    dates with an invalid month or day such as 1950-02-30.
+    """
+    if dateText is None: return None
+
+    dateMatch = datePattern.match(dateText)
+    if not dateMatch: return parseDateFormats(dateText, '%Y-%m-%d')
+
+    year, month, day = (int(d) if d else 1 for d in dateMatch.groups())
+    try:
+        return date(year, month, day).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parseFullDate(dateText):
+    """Parse a complete YYYY-MM-DD date, returning None for anything else"""
+    if dateText is None: return None
+
+    dateMatch = datePattern.match(dateText)
+    try:
+        if dateMatch and dateMatch.group(3):
+            return date(*(int(d) for d in dateMatch.groups()))
+        return datetime.strptime(dateText, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def parseDateFormats(dateText, dateFormat):
+    """Parse a date with strptime, retrying with the day and then the month
+    removed from the format. Used for values the fast path does not match."""
+    if dateFormat == '': return None
+
+    try:
+        return datetime.strptime(dateText, dateFormat).strftime('%Y-%m-%d')
+    except ValueError:
+        return parseDateFormats(dateText, dateFormat[:-3])
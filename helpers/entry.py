@@ -0,0 +1,74 @@
+from lxml import etree
+
+from helpers.dates import normalizeDate
+
+DATE_TYPES = ('regDate', 'copyDate', 'pubDate', 'affDate')
+
+
+class EntryRecord():
+    """The fields of a copyrightEntry element that are loaded into the
+    database, extracted with a single walk over the entry's subtree.
+
+    Nested elements (titles, authors, publishers, dates and additional
+    entries) are collected at any depth and lccns, copies, descriptions and
+    new matter claims only from the entry's direct children, matching the
+    element lookups this replaces.
+    """
+    __slots__ = (
+        'element', 'uuid', 'regnum', 'titles', 'authors', 'publishers',
+        'lccns', 'copies', 'description', 'newMatter', 'dates',
+        'additionalRegnums'
+    )
+
+    def __init__(self, element):
+        self.element = element
+        self.uuid = element.get('id')
+        self.regnum = element.get('regnum')
+        self.titles = []
+        self.authors = []
+        self.publishers = []
+        self.lccns = []
+        self.copies = None
+        self.description = None
+        self.newMatter = False
+        self.dates = {dType: [] for dType in DATE_TYPES}
+        self.additionalRegnums = []
+
+        self.extract()
+
+    def extract(self):
+        element = self.element
+        roleParents = set()
+        copies = description = None
+        for el in element.iter(tag=etree.Element):
+            tag = el.tag
+            if tag == 'title':
+                self.titles.append(el.text)
+            elif tag == 'role':
+                roleParents.add(el.getparent())
+            elif tag == 'authorName':
+                self.authors.append((el.text, el.getparent() in roleParents))
+            elif tag == 'pubName':
+                self.publishers.append((el.text, el.get('claimant', None)))
+            elif tag in self.dates:
+                if el.get('ignore') == 'yes': continue
+                self.dates[tag].append(
+                    (normalizeDate(el.get('date', None)), el.text)
+                )
+            elif tag == 'additionalEntry':
+                addtlRegnum = el.get('regnum')
+                if addtlRegnum is None: continue
+                self.additionalRegnums.extend(addtlRegnum.strip().split(' '))
+            elif el.getparent() is not element:
+                continue
+            elif tag == 'lccn':
+                self.lccns.append(el.text)
+            elif tag == 'newMatterClaimed':
+                self.newMatter = True
+            elif tag == 'copies' and copies is None:
+                copies = el
+            elif tag == 'desc' and description is None:
+                description = el
+
+        self.copies = copies.text if copies is not None else None
+        self.description = description.text if description is not None else None
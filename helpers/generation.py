@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from model.dataGeneration import DataGeneration
+
+
+class GenerationManager():
+    """Reads and advances the data generation, a counter stored in a single
+    row of the data_generation table that the loader increments after each
+    run that changes the data. Anything derived from the data, such as
+    cached API responses, is valid for as long as the generation is
+    unchanged."""
+    def __init__(self, session):
+        self.session = session
+
+    def getRecord(self, lock=False):
+        genQuery = self.session.query(DataGeneration)
+        if lock: genQuery = genQuery.with_for_update()
+        return genQuery.order_by(DataGeneration.id).first()
+
+    def current(self):
+        """Return the current generation and the time it was set."""
+        genRec = self.getRecord()
+        if genRec is None: return 0, None
+        return genRec.generation, genRec.date_modified
+
+    def advance(self):
+        genRec = self.getRecord(lock=True)
+        if genRec is None:
+            genRec = DataGeneration(generation=0)
+            self.session.add(genRec)
+        genRec.generation += 1
+        genRec.date_modified = datetime.now()
+        self.session.commit()
+        return genRec.generation
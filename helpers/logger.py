@@ -0,0 +1,146 @@
+from datetime import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats each record as a single line JSON object. Any values passed
+    in a record's fields extra are included as top-level keys."""
+    def format(self, record):
+        logRec = {
+            'time': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        logRec.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            logRec['exception'] = self.formatException(record.exc_info)
+        return json.dumps(logRec, default=str)
+
+
+def configureLogging(level=None, jsonFormat=None):
+    """Set up the root logger from LOG_LEVEL (INFO by default) and
+    LOG_FORMAT, which is either text or json. This is called by main.py and
+    by each worker process of a parallel import."""
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    if jsonFormat is None:
+        jsonFormat = os.environ.get('LOG_FORMAT', 'text').lower() == 'json'
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        JSONFormatter() if jsonFormat else logging.Formatter(TEXT_FORMAT)
+    )
+
+    rootLogger = logging.getLogger()
+    rootLogger.handlers = [handler]
+    rootLogger.setLevel(level.upper())
+
+    # Per-request logging from the ElasticSearch client is very verbose
+    logging.getLogger('elasticsearch').setLevel(logging.WARNING)
+
+
+def createLogger(name):
+    return logging.getLogger(name)
+
+
+class ProgressLogger():
+    """Counts the records processed by a long running step and logs the
+    total, rate and memory use of the process at most once every
+    LOG_PROGRESS_INTERVAL seconds (30 by default), along with a final
+    summary. Steps that work in batches log each batch instead. This
+    replaces logging a line for every record."""
+    def __init__(self, logger, label, interval=None):
+        self.logger = logger
+        self.label = label
+        self.interval = float(
+            interval if interval is not None
+            else os.environ.get('LOG_PROGRESS_INTERVAL', 30)
+        )
+        self.count = 0
+        self.batches = 0
+        self.startTime = self.lastLog = self.batchStart = time.monotonic()
+
+    def update(self, count=1, **fields):
+        self.count += count
+        if time.monotonic() - self.lastLog >= self.interval:
+            self.log(logging.INFO, **fields)
+
+    def batch(self, count, **fields):
+        """Log the number of records in a batch, the time since the previous
+        batch, the throughput and the current and peak memory use of the
+        process."""
+        self.count += count
+        self.batches += 1
+        self.lastLog = time.monotonic()
+        elapsed = self.lastLog - self.batchStart
+        self.batchStart = self.lastLog
+        fields.update({
+            'label': self.label,
+            'batch': self.batches,
+            'records': count,
+            'seconds': round(elapsed, 3),
+            'rate': round(count / elapsed, 1) if elapsed > 0 else 0,
+            'rssMB': round(ProgressLogger.currentRSS() / 1048576, 1),
+            'peakRssMB': round(ProgressLogger.peakRSS() / 1048576, 1)
+        })
+        self.logger.info(
+            '%s batch %d: %d records in %.2fs (%.1f/s), RSS %.1fMB, '
+            'peak %.1fMB%s',
+            self.label, self.batches, count, elapsed, fields['rate'],
+            fields['rssMB'], fields['peakRssMB'],
+            ''.join(
+                ' {}={}'.format(k, v) for k, v in fields.items()
+                if k not in (
+                    'label', 'batch', 'records', 'seconds', 'rate', 'rssMB',
+                    'peakRssMB'
+                )
+            ),
+            extra={'fields': fields}
+        )
+
+    def finish(self, **fields):
+        self.log(logging.INFO, **fields)
+
+    def log(self, level, **fields):
+        self.lastLog = time.monotonic()
+        elapsed = self.lastLog - self.startTime
+        fields.update({
+            'label': self.label,
+            'records': self.count,
+            'seconds': round(elapsed, 2),
+            'rate': round(self.count / elapsed, 1) if elapsed > 0 else 0,
+            'rssMB': round(ProgressLogger.currentRSS() / 1048576, 1)
+        })
+        self.logger.log(
+            level,
+            '%s: %d records in %.1fs (%.1f/s), RSS %.1fMB%s',
+            self.label, self.count, elapsed, fields['rate'], fields['rssMB'],
+            ''.join(
+                ' {}={}'.format(k, v) for k, v in fields.items()
+                if k not in ('label', 'records', 'seconds', 'rate', 'rssMB')
+            ),
+            extra={'fields': fields}
+        )
+
+    @staticmethod
+    def currentRSS():
+        """Return the resident set size of the process in bytes. This is read
+        from /proc where available and otherwise falls back to the peak RSS
+        reported by getrusage."""
+        try:
+            with open('/proc/self/statm', 'r') as statm:
+                return int(statm.read().split()[1]) * resource.getpagesize()
+        except (OSError, IndexError, ValueError):
+            return ProgressLogger.peakRSS()
+
+    @staticmethod
+    def peakRSS():
+        """Return the peak resident set size of the process in bytes"""
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from model.importManifest import ImportManifest
+
+
+class ManifestManager():
+    """Records the outcome of importing each source file in the
+    import_manifest table, keyed by the file's path and blob sha. A file
+    that was completely imported at its current sha is skipped on later
+    runs, so that an interrupted run resumes with the files it had not
+    finished and an incremental run loads exactly the files that changed.
+    """
+    def __init__(self, session, ignore=False):
+        self.session = session
+        self.ignore = ignore
+        self.startTime = None
+
+    def getRecord(self, path):
+        return self.session.query(ImportManifest)\
+            .filter(ImportManifest.path == path)\
+            .one_or_none()
+
+    def completedShas(self, pathPrefix):
+        """Return the sha of every completely imported file under a path,
+        with a single query."""
+        if self.ignore: return {}
+        return dict(
+            self.session.query(ImportManifest.path, ImportManifest.sha)
+                .filter(ImportManifest.path.startswith(pathPrefix))
+                .filter(ImportManifest.status == 'complete')
+                .all()
+        )
+
+    def isComplete(self, fileInfo, completed):
+        return completed.get(fileInfo['path'], None) == fileInfo['sha']
+
+    def startFile(self, fileInfo):
+        self.startTime = datetime.now()
+
+    def resumeState(self, fileInfo):
+        """Return the position and counts reached by an earlier import of a
+        file that was interrupted after committing part of it, if the file
+        has not changed since. Otherwise the import starts from the top."""
+        if self.ignore: return 0, {}
+
+        manifestRec = self.getRecord(fileInfo['path'])
+        if (
+            manifestRec is None
+            or manifestRec.sha != fileInfo['sha']
+            or manifestRec.status == 'complete'
+            or not manifestRec.last_position
+        ):
+            return 0, {}
+
+        return manifestRec.last_position, {
+            count: getattr(manifestRec, count) or 0
+            for count in ['inserted', 'updated', 'skipped', 'errors']
+        }
+
+    def recordProgress(self, fileInfo, counts, position):
+        """Record the position reached in a partially imported file, in the
+        same transaction as the batch of records that was read up to it."""
+        self.updateRecord(fileInfo, 'partial', counts, position)
+
+    def completeFile(self, fileInfo, counts, position):
+        """Add the completed file to the manifest in the current session, so
+        that it is committed in the same transaction as the file's records."""
+        self.updateRecord(fileInfo, 'complete', counts, position)
+
+    def failFile(self, fileInfo, err, counts={}, position=None):
+        """Record a failed file, with the counts and position of the last
+        batch that was committed. This should be called after the current
+        batch has been rolled back and is committed on its own."""
+        self.updateRecord(
+            fileInfo, 'failed', counts, position, message=str(err)
+        )
+        self.session.commit()
+
+    def updateRecord(
+        self, fileInfo, status, counts={}, position=None, message=None
+    ):
+        manifestRec = self.getRecord(fileInfo['path'])
+        if manifestRec is None:
+            manifestRec = ImportManifest(path=fileInfo['path'])
+            self.session.add(manifestRec)
+
+        manifestRec.sha = fileInfo['sha']
+        manifestRec.status = status
+        manifestRec.inserted = counts.get('inserted', 0)
+        manifestRec.updated = counts.get('updated', 0)
+        manifestRec.skipped = counts.get('skipped', 0)
+        manifestRec.errors = counts.get('errors', 0)
+        manifestRec.last_position = position
+        manifestRec.message = message
+        if self.startTime:
+            manifestRec.duration = (
+                datetime.now() - self.startTime
+            ).total_seconds()
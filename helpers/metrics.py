@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+import json
+import os
+import time
+
+
+class Metrics():
+    """Collects the total time spent in, and number of calls to, each stage
+    of a run along with counters for the records processed. Stages are named
+    with a prefix for the part of the loader they belong to, such as
+    cce.parse or es.bulk. A single instance, metrics, is shared by the
+    loader; parallel import workers send theirs back to be merged.
+    """
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    @contextmanager
+    def timer(self, stage):
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTime(stage, time.perf_counter() - startTime)
+
+    def addTime(self, stage, seconds, calls=1):
+        stageTimer = self.timers.setdefault(stage, [0, 0.0])
+        stageTimer[0] += calls
+        stageTimer[1] += seconds
+
+    def increment(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {}
+
+    def snapshot(self):
+        return {
+            'timers': {
+                stage: {'calls': calls, 'seconds': seconds}
+                for stage, (calls, seconds) in self.timers.items()
+            },
+            'counters': dict(self.counters)
+        }
+
+    def merge(self, snapshot):
+        for stage, stageTimer in snapshot['timers'].items():
+            self.addTime(stage, stageTimer['seconds'], stageTimer['calls'])
+        for counter, value in snapshot['counters'].items():
+            self.increment(counter, value)
+
+    def summaryTable(self):
+        """Return the stage timings, slowest first, and the counters as a
+        plain text table."""
+        rows = [('Stage', 'Calls', 'Seconds', 'Avg ms')]
+        for stage, (calls, seconds) in sorted(
+            self.timers.items(), key=lambda t: t[1][1], reverse=True
+        ):
+            rows.append((
+                stage,
+                str(calls),
+                '{:.2f}'.format(seconds),
+                '{:.3f}'.format(seconds / calls * 1000 if calls else 0)
+            ))
+        if len(self.counters) > 0:
+            rows.append(('Counter', 'Count', '', ''))
+            rows.extend(
+                (counter, str(value), '', '')
+                for counter, value in sorted(self.counters.items())
+            )
+
+        widths = [max(len(row[i]) for row in rows) for i in range(4)]
+        return '\n'.join(
+            '  '.join(
+                col.ljust(widths[i]) if i == 0 else col.rjust(widths[i])
+                for i, col in enumerate(row)
+            )
+            for row in rows
+        )
+
+    def writeReport(self, path):
+        """Write the metrics to a file, in the Prometheus text format (for
+        the node_exporter textfile collector) if the file ends with .prom and
+        as JSON otherwise. The file is replaced atomically."""
+        if path.endswith('.prom'):
+            report = self.prometheusReport()
+        else:
+            report = json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+        tmpPath = '{}.tmp'.format(path)
+        with open(tmpPath, 'w') as reportFile:
+            reportFile.write(report)
+        os.replace(tmpPath, path)
+
+    def prometheusReport(self):
+        lines = [
+            '# HELP bardo_stage_seconds Time spent in each stage of the last run',
+            '# TYPE bardo_stage_seconds gauge'
+        ]
+        lines.extend(
+            'bardo_stage_seconds{{stage="{}"}} {:.6f}'.format(stage, seconds)
+            for stage, (_, seconds) in sorted(self.timers.items())
+        )
+        lines.extend([
+            '# HELP bardo_stage_calls Number of calls to each stage in the last run',
+            '# TYPE bardo_stage_calls gauge'
+        ])
+        lines.extend(
+            'bardo_stage_calls{{stage="{}"}} {}'.format(stage, calls)
+            for stage, (calls, _) in sorted(self.timers.items())
+        )
+        lines.extend([
+            '# HELP bardo_records Number of records processed in the last run',
+            '# TYPE bardo_records gauge'
+        ])
+        lines.extend(
+            'bardo_records{{counter="{}"}} {}'.format(counter, value)
+            for counter, value in sorted(self.counters.items())
+        )
+        lines.extend([
+            '# HELP bardo_run_timestamp_seconds Time the last run finished',
+            '# TYPE bardo_run_timestamp_seconds gauge',
+            'bardo_run_timestamp_seconds {:.0f}'.format(time.time())
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,46 @@
+from uuid import UUID
+
+from sqlalchemy.orm import configure_mappers
+
+
+def uuidKey(uuid):
+    """Return the canonical string form of a uuid, used to match records to
+    source entries and search hits, or None if it is not a valid uuid."""
+    try:
+        return str(UUID(str(uuid)))
+    except (TypeError, ValueError):
+        return None
+
+
+class RecordFile():
+    """The batching state shared by the CCE and CCR file readers: resuming
+    after the position reached by an earlier import and prefetching the
+    existing records for a batch. Subclasses set session, counts and
+    resumePosition."""
+    prefetchBatchSize = 5000
+
+    def resumeFrom(self, position, counts):
+        self.resumePosition = position
+        self.counts.update(counts)
+        self.committedState = (dict(self.counts), position)
+
+    def prefetchRecords(self, model, uuids, loadOptions):
+        """Load all existing records with the given uuids up front, in
+        batches of IN queries with their child collections, so that matching
+        a source entry to an existing record does not require a query. The
+        records are returned keyed by uuidKey."""
+        configure_mappers()
+        validUUIDs = set(uuidKey(u) for u in uuids)
+        validUUIDs.discard(None)
+        validUUIDs = list(validUUIDs)
+
+        records = {}
+        batchSize = self.prefetchBatchSize
+        for i in range(0, len(validUUIDs), batchSize):
+            recQuery = self.session.query(model)\
+                .filter(model.uuid.in_([
+                    UUID(u) for u in validUUIDs[i:i + batchSize]
+                ]))\
+                .options(*loadOptions)
+            for rec in recQuery.all(): records[str(rec.uuid)] = rec
+        return records
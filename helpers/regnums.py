@@ -0,0 +1,84 @@
+import re
+
+from helpers.errors import DataError
+
+MAX_RANGE_SIZE = 1000
+
+rangePattern = re.compile(r'[0-9]+\-[A-Z0-9]+')
+prefixPattern = re.compile(r'[A-Z]+')
+spacePattern = re.compile(r'\s+')
+
+
+class RegnumRange():
+    """A range of registration numbers sharing a prefix, such as A1000-A1010.
+    The individual numbers are only generated when the range is iterated.
+    As in the original parser the end of the range is not included."""
+    __slots__ = ('prefix', 'start', 'end')
+
+    def __init__(self, prefix, start, end):
+        self.prefix = prefix
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return max(self.end - self.start, 0)
+
+    def __iter__(self):
+        for num in range(self.start, self.end):
+            yield '{}{}'.format(self.prefix, num)
+
+    def __repr__(self):
+        return '<RegnumRange({}{}-{})>'.format(self.prefix, self.start, self.end)
+
+
+def parseRegnum(num):
+    """Parse a single registration number from an entry. Ranges of fewer
+    than MAX_RANGE_SIZE numbers are returned as a RegnumRange, anything else
+    is returned as the original string."""
+    try:
+        if (
+            rangePattern.search(num)
+            and num[2] != '0'
+            and num[:2] != 'B5'
+        ):
+            regnumRange = num.split('-')
+            regRangePrefix = prefixPattern.match(regnumRange[0]).group(0)
+            regRangeStart = int(regnumRange[0].replace(regRangePrefix, ''))
+            regRangeEnd = int(regnumRange[1].replace(regRangePrefix, ''))
+            if regRangeEnd - regRangeStart < MAX_RANGE_SIZE:
+                return RegnumRange(regRangePrefix, regRangeStart, regRangeEnd)
+    except (ValueError, AttributeError):
+        raise DataError('regnum_range_parsing_error', regnum=num)
+
+    return num
+
+
+def countRegnums(parsedNums):
+    return sum(
+        len(num) if isinstance(num, RegnumRange) else 1 for num in parsedNums
+    )
+
+
+def expandRegnums(parsedNums):
+    """Yield each individual registration number from a list of parsed
+    numbers and ranges."""
+    for num in parsedNums:
+        if isinstance(num, RegnumRange):
+            yield from num
+        else:
+            yield num
+
+
+def regnumCategory(regnum):
+    """Return the category of a registration number, which is taken from its
+    first letter."""
+    if prefixPattern.match(regnum[:1]): return regnum[0]
+    return 'Unknown'
+
+
+def normalizeRegnum(regnum):
+    """Return the canonical form of a single registration number, used to
+    match renewals to the registration numbers parsed from entries. Entry
+    numbers are split on whitespace, so any whitespace is removed."""
+    if regnum is None: return None
+    return spacePattern.sub('', regnum)
@@ -0,0 +1,81 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from model.cce import CCE
+from model.registration import Registration
+from model.renewal import Renewal
+
+
+def entryOptions(xml=False):
+    """Return the loader options that load everything serializeEntry reads
+    from an entry, with a query per collection."""
+    loadOptions = [
+        joinedload(CCE.volume),
+        selectinload(CCE.authors),
+        selectinload(CCE.publishers),
+        selectinload(CCE.registrations)
+            .selectinload(Registration.renewals)
+            .selectinload(Renewal.claimants)
+    ]
+    if xml: loadOptions.append(selectinload(CCE.xml_sources))
+    return loadOptions
+
+
+def serializeEntry(dbEntry, xml=False):
+    """Return an entry with its registrations and renewals in the form used
+    by the API and the linked export."""
+    response = {
+        'uuid': dbEntry.uuid,
+        'title': dbEntry.title,
+        'copies': dbEntry.copies,
+        'description': dbEntry.description,
+        'pub_date': dbEntry.pub_date_text,
+        'copy_date': dbEntry.copy_date_text,
+        'registrations': [
+            {'number': r.regnum, 'date': r.reg_date_text}
+            for r in dbEntry.registrations
+        ],
+        'authors': [ a.name for a in dbEntry.authors ],
+        'publishers': [ p.name for p in dbEntry.publishers ],
+        'source': {
+            'url': dbEntry.volume.source,
+            'series': dbEntry.volume.series,
+            'year': dbEntry.volume.year,
+            'part': dbEntry.volume.part,
+            'page': dbEntry.page,
+            'page_position': dbEntry.page_position
+        }
+    }
+    response['renewals'] = [
+        serializeRenewal(ren, source=xml)
+        for reg in dbEntry.registrations
+        for ren in reg.renewals
+    ]
+
+    if xml: response['xml'] = dbEntry.xml_sources[0].xml_source
+
+    return response
+
+
+def serializeRenewal(dbRenewal, source=False):
+    renewal = {
+        'type': 'renewal',
+        'uuid': dbRenewal.uuid,
+        'title': dbRenewal.title,
+        'author': dbRenewal.author,
+        'claimants': [
+            {'name': c.name, 'type': c.claimant_type}
+            for c in dbRenewal.claimants
+        ],
+        'new_matter': dbRenewal.new_matter,
+        'renewal_num': dbRenewal.renewal_num,
+        'renewal_date': dbRenewal.renewal_date_text,
+        'notes': dbRenewal.notes,
+        'volume': dbRenewal.volume,
+        'part': dbRenewal.part,
+        'number': dbRenewal.number,
+        'page': dbRenewal.page
+    }
+
+    if source: renewal['source'] = dbRenewal.source
+
+    return renewal
@@ -0,0 +1,200 @@
+import base64
+from datetime import datetime, timezone
+from github import Github
+import hashlib
+from io import BytesIO
+import os
+import subprocess
+import tarfile
+
+from helpers.metrics import metrics
+
+
+class GitHubSource():
+    """Reads source files through the GitHub API. This is the original
+    behavior of the loader and requires an ACCESS_TOKEN."""
+    def __init__(self, repoName):
+        self.repoName = repoName
+        self.git = Github(os.environ['ACCESS_TOKEN'])
+        self.repo = self.git.get_repo(repoName)
+
+    def __getstate__(self):
+        return {'repoName': self.repoName}
+
+    def __setstate__(self, state):
+        self.__init__(state['repoName'])
+
+    def listDir(self, path):
+        with metrics.timer('source.list'):
+            return [
+                {
+                    'name': content.name,
+                    'path': content.path,
+                    'sha': content.sha,
+                    'isDir': content.type == 'dir'
+                }
+                for content in self.repo.get_contents('/{}'.format(path))
+            ]
+
+    def changedPaths(self, path, loadFromTime):
+        if loadFromTime is None: return None
+        changed = set()
+        with metrics.timer('source.list'):
+            for commit in self.repo.get_commits(
+                path=path, since=utcTime(loadFromTime)
+            ):
+                changed.update(f.filename for f in commit.files)
+        return changed
+
+    def openFile(self, fileInfo):
+        with metrics.timer('source.fetch'):
+            fileBlob = self.repo.get_git_blob(fileInfo['sha'])
+        with metrics.timer('source.decode'):
+            return BytesIO(base64.b64decode(fileBlob.content))
+
+
+class LocalSource():
+    """Reads source files from a local clone or a plain copy of a source
+    repository. Where a git checkout is available changed files are found
+    with a single `git log` call, otherwise file modification times are used.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.isGit = os.path.exists(os.path.join(self.root, '.git'))
+        self.blobShas = None
+
+    def listDir(self, path):
+        dirPath = os.path.join(self.root, path)
+        if self.isGit and self.blobShas is None: self.loadBlobShas()
+
+        contents = []
+        for name in sorted(os.listdir(dirPath)):
+            relPath = '/'.join([path.strip('/'), name])
+            fullPath = os.path.join(dirPath, name)
+            isDir = os.path.isdir(fullPath)
+            contents.append({
+                'name': name,
+                'path': relPath,
+                'sha': None if isDir else self.getSha(relPath, fullPath),
+                'isDir': isDir
+            })
+        return contents
+
+    def loadBlobShas(self):
+        lsTree = self.runGit('ls-tree', '-r', 'HEAD')
+        self.blobShas = {}
+        for line in lsTree.splitlines():
+            meta, path = line.split('\t', 1)
+            self.blobShas[path] = meta.split(' ')[2]
+
+    def getSha(self, relPath, fullPath):
+        if self.isGit and relPath in self.blobShas:
+            return self.blobShas[relPath]
+        with open(fullPath, 'rb') as localFile:
+            return LocalSource.blobSha(localFile.read())
+
+    def changedPaths(self, path, loadFromTime):
+        if loadFromTime is None: return None
+        loadFromTime = utcTime(loadFromTime)
+        if self.isGit:
+            gitLog = self.runGit(
+                'log', '--name-only', '--pretty=format:',
+                '--since={}'.format(loadFromTime.isoformat()),
+                '--', path
+            )
+            return set(l for l in gitLog.splitlines() if l.strip() != '')
+
+        changed = set()
+        dirPath = os.path.join(self.root, path)
+        for name in os.listdir(dirPath):
+            modTime = datetime.fromtimestamp(
+                os.path.getmtime(os.path.join(dirPath, name)), timezone.utc
+            )
+            if modTime >= loadFromTime:
+                changed.add('/'.join([path.strip('/'), name]))
+        return changed
+
+    def openFile(self, fileInfo):
+        return open(os.path.join(self.root, fileInfo['path']), 'rb')
+
+    def runGit(self, *args):
+        return subprocess.run(
+            ['git', '-C', self.root] + list(args),
+            stdout=subprocess.PIPE,
+            check=True
+        ).stdout.decode('utf-8')
+
+    @staticmethod
+    def blobSha(content):
+        blobHash = hashlib.sha1('blob {}\0'.format(len(content)).encode())
+        blobHash.update(content)
+        return blobHash.hexdigest()
+
+
+class TarballSource():
+    """Reads source files from a tarball of a source repository, such as the
+    archive downloaded from GitHub. A single top-level directory in the
+    archive is treated as the repository root."""
+    def __init__(self, tarPath):
+        self.tarPath = tarPath
+        self.tar = tarfile.open(tarPath, 'r:*')
+        self.members = {}
+
+        names = self.tar.getnames()
+        roots = set(n.split('/', 1)[0] for n in names)
+        prefix = '{}/'.format(roots.pop()) if len(roots) == 1 else ''
+        for member in self.tar.getmembers():
+            if not member.name.startswith(prefix): continue
+            self.members[member.name[len(prefix):]] = member
+
+    def __getstate__(self):
+        return {'tarPath': self.tarPath}
+
+    def __setstate__(self, state):
+        self.__init__(state['tarPath'])
+
+    def listDir(self, path):
+        dirPath = '{}/'.format(path.strip('/'))
+        contents = []
+        for relPath in sorted(self.members.keys()):
+            if not relPath.startswith(dirPath): continue
+            name = relPath[len(dirPath):]
+            if name == '' or '/' in name: continue
+            member = self.members[relPath]
+            contents.append({
+                'name': name,
+                'path': relPath,
+                'sha': None if member.isdir() else LocalSource.blobSha(
+                    self.tar.extractfile(member).read()
+                ),
+                'isDir': member.isdir()
+            })
+        return contents
+
+    def changedPaths(self, path, loadFromTime):
+        """Archives set the modification time of every file to that of the
+        commit they were made from, so these are not compared. Every file is
+        listed and unchanged files are skipped by comparing their content
+        hash with the manifest."""
+        return None
+
+    def openFile(self, fileInfo):
+        return self.tar.extractfile(self.members[fileInfo['path']])
+
+
+def utcTime(loadFromTime):
+    """Return a time as a timezone-aware UTC datetime, as the GitHub API
+    expects. Naive times are taken to be local time."""
+    return loadFromTime.astimezone(timezone.utc)
+
+
+def createSource(repoVar, pathVar):
+    """Return the source backend for a repository. If the path variable is
+    set to a local directory or tarball that is read directly, otherwise the
+    repository named in the repo variable is read from GitHub."""
+    sourcePath = os.environ.get(pathVar, None)
+    if not sourcePath:
+        return GitHubSource(os.environ[repoVar])
+    elif os.path.isdir(sourcePath):
+        return LocalSource(sourcePath)
+    return TarballSource(sourcePath)
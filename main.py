@@ -1,46 +1,115 @@
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import yaml
 
 
-def main(secondsAgo=None, year=None, exclude=None, reinit=False):
+def main(
+    secondsAgo=None, year=None, exclude=None, reinit=False, stream=False,
+    workers=1, relink=False, indexThreads=None, indexChunk=None,
+    ignoreManifest=False, fullIndex=False, batchSize=None, metricsFile=None
+):
     manager = SessionManager()
     manager.generateEngine()
     manager.initializeDatabase(reinit)
-    manager.createSession()
+    manager.createSession(autoflush=False)
 
     loadFromTime = None
     startTime = datetime.now()
     if secondsAgo is not None:
-        loadFromTime = startTime - timedelta(seconds=secondsAgo)
+        loadFromTime = datetime.now(timezone.utc)\
+            - timedelta(seconds=secondsAgo)
+    changes = ChangeSet()
+    pending = PendingChanges(manager.session)
+    pendingCount = pending.load(changes)
+    if pendingCount > 0:
+        logger.info('Reindexing %d changes left by an earlier run', pendingCount)
     if exclude != 'cce':
-        loadCCE(manager, loadFromTime, year)
+        loadCCE(
+            manager, loadFromTime, year, stream, reinit, workers,
+            ignoreManifest, changes, batchSize
+        )
     if exclude != 'ccr':
-        loadCCR(manager, loadFromTime, year)
-    indexUpdates(manager, loadFromTime)
+        loadCCR(
+            manager, loadFromTime, year, ignoreManifest, changes, batchSize
+        )
+    if relink:
+        with metrics.timer('ccr.relink'):
+            relinkOrphans(manager, changes)
+    indexUpdates(
+        manager, None if reinit or fullIndex else changes, indexThreads,
+        indexChunk
+    )
+    pending.clear()
+    if reinit or fullIndex or len(changes) > 0:
+        generation = GenerationManager(manager.session).advance()
+        logger.info('Advanced data generation to %d', generation)
     
     manager.closeConnection()
+
+    metrics.addTime('run', (datetime.now() - startTime).total_seconds())
+    reportMetrics(metricsFile)
     
 
-def loadCCE(manager, loadFromTime, selectedYear):
-    cceReader = CCEReader(manager)
+def loadCCE(
+    manager, loadFromTime, selectedYear, stream, freshLoad, workers,
+    ignoreManifest, changes, batchSize
+):
+    cceReader = CCEReader(
+        manager, stream=stream, bulk=freshLoad, workers=workers,
+        ignoreManifest=ignoreManifest, changes=changes, batchSize=batchSize
+    )
     cceReader.loadYears(selectedYear)
     cceReader.getYearFiles(loadFromTime)
     cceReader.importYearData()
             
 
-def loadCCR(manager, loadFromTime, selectedYear):
-    ccrReader = CCRReader(manager)
+def loadCCR(
+    manager, loadFromTime, selectedYear, ignoreManifest, changes, batchSize
+):
+    ccrReader = CCRReader(
+        manager, ignoreManifest=ignoreManifest, changes=changes,
+        batchSize=batchSize
+    )
     ccrReader.loadYears(selectedYear, loadFromTime)
     ccrReader.importYears()
 
-def indexUpdates(manager, loadFromTime):
-    esIndexer = ESIndexer(manager, None)
+def relinkOrphans(manager, changes):
+    ccrReader = CCRReader(manager, changes=changes)
+    ccrReader.relinkOrphans()
+
+def indexUpdates(manager, changes, threads, chunkSize):
+    esIndexer = ESIndexer(
+        manager, None, threads=threads, chunkSize=chunkSize, changes=changes
+    )
+    if changes is not None:
+        with metrics.timer('es.expand'):
+            esIndexer.expandChanges()
+        with metrics.timer('es.delete'):
+            esIndexer.deleteRecords()
     esIndexer.indexRecords(recType='cce')
     esIndexer.indexRecords(recType='ccr')
 
 
+def runExport(recordType, outFormat, output, compress):
+    manager = SessionManager()
+    manager.generateEngine()
+    manager.createSession()
+
+    exporter = Exporter(manager.session, recordType, outFormat)
+    exporter.writeFile(output, compress=compress)
+
+    manager.closeConnection()
+
+
+def reportMetrics(metricsFile):
+    logger.info('Run summary\n%s', metrics.summaryTable())
+    metricsFile = metricsFile or os.environ.get('METRICS_FILE', None)
+    if metricsFile:
+        metrics.writeReport(metricsFile)
+        logger.info('Wrote metrics to %s', metricsFile)
+
+
 def parseArgs():
     parser = argparse.ArgumentParser(
         description='Load CCE XML and CCR TSV into PostgresQL'
@@ -55,7 +124,60 @@ def parseArgs():
         choices=['cce', 'ccr'],
         help='Specify to exclude either entries or renewals from this run'
     )
+    parser.add_argument('-s', '--stream', action='store_true',
+        help='Parse CCE files incrementally to limit memory use'
+    )
+    parser.add_argument('-w', '--workers', type=int, default=1,
+        help='Number of processes to import CCE files with'
+    )
+    parser.add_argument('-r', '--relink', action='store_true',
+        help='Attempt to match all orphan renewals to registrations'
+    )
+    parser.add_argument('-b', '--batch-size', type=int, required=False,
+        help='Number of records to import between each commit'
+    )
+    parser.add_argument('--index-threads', type=int, required=False,
+        help='Number of threads to send bulk indexing requests with'
+    )
+    parser.add_argument('--index-chunk', type=int, required=False,
+        help='Number of documents per bulk indexing request'
+    )
+    parser.add_argument('--ignore-manifest', action='store_true',
+        help='Import source files even if they were already imported at their current version'
+    )
+    parser.add_argument('--full-index', action='store_true',
+        help='Reindex all records rather than only those changed by this run'
+    )
+    parser.add_argument('--log-level', type=str, required=False,
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        help='Minimum level of messages to log. Defaults to LOG_LEVEL or INFO'
+    )
+    parser.add_argument('--log-json', action='store_true',
+        help='Log messages as JSON objects rather than text'
+    )
+    parser.add_argument('--metrics-file', type=str, required=False,
+        help='File to write stage timings to, in the Prometheus text format if it ends with .prom and as JSON otherwise'
+    )
     parser.add_argument('--REINITIALIZE', action='store_true')
+
+    commands = parser.add_subparsers(dest='command')
+    exportParser = commands.add_parser('export',
+        help='Export the database as NDJSON or CSV rather than loading data'
+    )
+    exportParser.add_argument('record_type',
+        choices=['cce', 'registration', 'renewal_registration', 'renewal', 'linked'],
+        help='Table to export a row per record of, or linked for each entry with its registrations and renewals followed by the orphan renewals'
+    )
+    exportParser.add_argument('-o', '--output', type=str, required=True,
+        help='File to write the export to, gzipped if it ends with .gz'
+    )
+    exportParser.add_argument('-f', '--format', type=str, default='ndjson',
+        choices=['ndjson', 'csv'],
+        help='Output format. Linked records can only be exported as ndjson'
+    )
+    exportParser.add_argument('-z', '--gzip', action='store_true',
+        default=None, help='Gzip the export regardless of the file name'
+    )
     return parser.parse_args()
 
 
@@ -65,25 +187,55 @@ def loadConfig():
         for section in config:
             sectionDict = config[section]
             for key, value in sectionDict.items():
-                os.environ[key] = value
+                if value is None: continue
+                os.environ[key] = str(value)
 
 
 if __name__ == '__main__':
     args = parseArgs()
     try:
         loadConfig()
+        configLoaded = True
     except FileNotFoundError:
-        print("Unable to set environment variables")
-        pass
+        configLoaded = False
+
+    # Set in the environment so that worker processes use the same settings
+    if args.log_level: os.environ['LOG_LEVEL'] = args.log_level
+    if args.log_json: os.environ['LOG_FORMAT'] = 'json'
 
     from sessionManager import SessionManager
     from builder import CCEReader, CCEFile
     from renBuilder import CCRReader, CCRFile
     from esIndexer import ESIndexer
+    from exporter import Exporter
+    from helpers.changes import ChangeSet, PendingChanges
+    from helpers.generation import GenerationManager
+    from helpers.logger import configureLogging, createLogger
+    from helpers.metrics import metrics
 
-    main(
-        secondsAgo=args.time,
-        year=args.year,
-        exclude=args.exclude,
-        reinit=args.REINITIALIZE
-    )
+    # builder sets the encoding of sys.stdout on import, so this must follow
+    # the imports
+    configureLogging()
+    logger = createLogger(__name__)
+    if not configLoaded:
+        logger.warning('Unable to set environment variables')
+
+    if args.command == 'export':
+        runExport(args.record_type, args.format, args.output, args.gzip)
+        reportMetrics(args.metrics_file)
+    else:
+        main(
+            secondsAgo=args.time,
+            year=args.year,
+            exclude=args.exclude,
+            reinit=args.REINITIALIZE,
+            stream=args.stream,
+            workers=args.workers,
+            relink=args.relink,
+            indexThreads=args.index_threads,
+            indexChunk=args.index_chunk,
+            ignoreManifest=args.ignore_manifest,
+            fullIndex=args.full_index,
+            batchSize=args.batch_size,
+            metricsFile=args.metrics_file
+        )
@@ -15,6 +15,7 @@ from sqlalchemy.orm import relationship, backref
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm.exc import NoResultFound
 
+from helpers.logger import createLogger
 from model.core import Base, Core
 
 from model.xml import XML
@@ -23,6 +24,7 @@ from model.publisher import Publisher
 from model.lccn import LCCN
 from model.registration import Registration
 
+logger = createLogger(__name__)
 
 class CCE(Core, Base):
     __tablename__ = 'cce'
@@ -40,6 +42,7 @@ class CCE(Core, Base):
     copy_date_text = Column(Unicode)
     aff_date = Column(Date)
     aff_date_text = Column(Unicode)
+    content_hash = Column(Unicode)
 
     volume_id = Column(Integer, ForeignKey('volume.id'))
 
@@ -69,14 +72,14 @@ class CCE(Core, Base):
     def addAuthor(self, authors):
         for auth in authors:
             if auth[0] is None:
-                print('No author name! for {}'.format(self.uuid))
+                logger.debug('No author name for %s', self.uuid)
                 continue
             self.authors.append(Author(name=auth[0], primary=auth[1]))
     
     def addPublisher(self, publishers):
         for pub in publishers:
             if pub[0] is None:
-                print('No publisher name! for {}'.format(self.uuid))
+                logger.debug('No publisher name for %s', self.uuid)
                 continue
             claimant = True if pub[1] == 'yes' else False
             self.publishers.append(Publisher(name=pub[0], claimant=claimant))
@@ -0,0 +1,15 @@
+from sqlalchemy import (
+    Column,
+    Integer
+)
+
+from model.core import Base, Core
+
+
+class DataGeneration(Core, Base):
+    __tablename__ = 'data_generation'
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<DataGeneration(generation={}, modified={})>'.format(self.generation, self.date_modified)
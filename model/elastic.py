@@ -6,8 +6,11 @@ from elasticsearch_dsl import (
     Keyword,
     Text,
     Date,
+    Integer,
+    Boolean,
     InnerDoc,
-    Nested
+    Nested,
+    Object
 )
 
 
@@ -29,6 +32,8 @@ class BaseInner(InnerDoc):
 class Registration(BaseInner):
     regnum = Keyword()
     regdate = Date()
+    regdate_text = Keyword(index=False)
+    cce_uuid = Keyword(index=False)
 
 
 class Claimant(BaseInner):
@@ -36,14 +41,46 @@ class Claimant(BaseInner):
     claim_type = Keyword()
 
 
+class VolumeSource(BaseInner):
+    url = Keyword(index=False)
+    series = Keyword(index=False)
+    year = Integer(index=False)
+    part = Keyword(index=False)
+
+
+class RenewalSummary(BaseInner):
+    uuid = Keyword(index=False)
+    rennum = Keyword(index=False)
+    rendate_text = Keyword(index=False)
+    title = Text(index=False)
+    authors = Text(index=False)
+    new_matter = Text(index=False)
+    notes = Text(index=False)
+    volume = Integer(index=False)
+    part = Keyword(index=False)
+    number = Integer(index=False)
+    page = Integer(index=False)
+    source = Text(index=False)
+    claimants = Object(Claimant)
+
+
 class Renewal(BaseDoc):
     uuid = Keyword(store=True)
     rennum = Keyword()
     rendate = Date()
     title = Text(fields={'keyword': Keyword()})
     authors = Text()
+    rendate_text = Keyword(index=False)
+    new_matter = Text(index=False)
+    notes = Text(index=False)
+    volume = Integer(index=False)
+    part = Keyword(index=False)
+    number = Integer(index=False)
+    page = Integer(index=False)
+    source = Text(index=False)
 
     claimants = Nested(Claimant)
+    registrations = Object(Registration)
     class Index:
         name = os.environ['ES_CCR_INDEX']
 
@@ -54,7 +91,17 @@ class CCE(BaseDoc):
     authors = Text(multi=True)
     publishers = Text(multi=True)
     lccns = Keyword(multi=True)
+    copies = Text(index=False)
+    description = Text(index=False)
+    pub_date = Date()
+    pub_date_text = Keyword(index=False)
+    copy_date = Date()
+    copy_date_text = Keyword(index=False)
+    page = Integer(index=False)
+    page_position = Integer(index=False)
     registrations = Nested(Registration)
+    source = Object(VolumeSource)
+    renewals = Object(RenewalSummary)
 
     class Index:
         name = os.environ['ES_CCE_INDEX']
@@ -0,0 +1,26 @@
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    Unicode
+)
+
+from model.core import Base, Core
+
+
+class ImportManifest(Core, Base):
+    __tablename__ = 'import_manifest'
+    id = Column(Integer, primary_key=True)
+    path = Column(Unicode, unique=True, nullable=False, index=True)
+    sha = Column(Unicode)
+    status = Column(Unicode)
+    inserted = Column(Integer)
+    updated = Column(Integer)
+    skipped = Column(Integer)
+    errors = Column(Integer)
+    duration = Column(Float)
+    last_position = Column(Integer)
+    message = Column(Unicode)
+
+    def __repr__(self):
+        return '<ImportManifest(path={}, sha={}, status={})>'.format(self.path, self.sha, self.status)
@@ -0,0 +1,17 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    Unicode
+)
+
+from model.core import Base, Core
+
+
+class PendingIndex(Core, Base):
+    __tablename__ = 'pending_index'
+    id = Column(Integer, primary_key=True)
+    record_type = Column(Unicode, nullable=False, index=True)
+    record_key = Column(Unicode, nullable=False)
+
+    def __repr__(self):
+        return '<PendingIndex(type={}, key={})>'.format(self.record_type, self.record_key)
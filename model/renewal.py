@@ -47,6 +47,7 @@ class Renewal(Core, Base):
     notes = Column(Unicode)
     source = Column(Unicode)
     orphan = Column(Boolean, default=False)
+    content_hash = Column(Unicode)
 
     registrations = relationship(
         'Registration',
@@ -19,6 +19,7 @@ from model.core import Base, Core
 class Volume(Core, Base):
     __tablename__ = 'volume'
     id = Column(Integer, primary_key=True)
+    path = Column(Unicode)
     source = Column(Unicode)
     status = Column(Unicode)
     series = Column(Unicode)
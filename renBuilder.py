@@ -1,36 +1,64 @@
-import base64
 import csv
-from datetime import datetime
-from github import Github
-from io import StringIO
+import hashlib
+from io import TextIOWrapper
+import json
 import os
 import re
+import time
 
-from sqlalchemy.orm.exc import MultipleResultsFound
+from sqlalchemy.orm import selectinload
 
-from model.renewal import Renewal
+from model.renewal import Renewal, RENEWAL_REG
 from model.registration import Registration
 
+from helpers.changes import ChangeSet, PendingChanges
+from helpers.dates import parseFullDate
+from helpers.logger import createLogger, ProgressLogger
+from helpers.manifest import ManifestManager
+from helpers.metrics import metrics
+from helpers.records import RecordFile, uuidKey
+from helpers.regnums import normalizeRegnum
+from helpers.sources import createSource
+
+logger = createLogger(__name__)
+
 class CCRReader():
-    def __init__(self, manager):
-        self.git = Github(os.environ['ACCESS_TOKEN'])
-        self.repo = self.git.get_repo(os.environ['CCR_REPO'])
+    def __init__(
+        self, manager, source=None, ignoreManifest=False, changes=None,
+        batchSize=None
+    ):
+        # Created when files are listed, as relinking does not read them
+        self.source = source
         self.ccrYears = {}
         self.dbManager = manager
+        self.regIndex = RegistrationIndex(manager.session)
+        self.manifest = ManifestManager(manager.session, ignore=ignoreManifest)
+        self.changes = changes if changes is not None else ChangeSet()
+        self.pending = PendingChanges(manager.session)
+        self.batchSize = int(
+            batchSize or os.environ.get('IMPORT_BATCH_SIZE', 1000)
+        )
 
     def loadYears(self, selectedYear, loadFromTime):
-        for year in self.repo.get_contents('/data'):
-            yearMatch = re.match(r'^([0-9]{4}).*\.tsv$', year.name)
+        if self.source is None:
+            self.source = createSource('CCR_REPO', 'CCR_SOURCE_PATH')
+        with metrics.timer('ccr.list'):
+            changedFiles = self.source.changedPaths('data', loadFromTime)
+            completedFiles = self.manifest.completedShas('data')
+            yearFiles = self.source.listDir('data')
+
+        for year in yearFiles:
+            yearMatch = re.match(r'^([0-9]{4}).*\.tsv$', year['name'])
             if not yearMatch: continue
             fileYear = yearMatch.group(1)
             if selectedYear is not None and selectedYear != fileYear: continue
-            fileCommit = self.repo.get_commits(path=year.path)[0]
-            commitDate = fileCommit.commit.committer.date
-            if loadFromTime is not None and commitDate < loadFromTime: continue
+            if changedFiles is not None and year['path'] not in changedFiles:
+                continue
+            if self.manifest.isComplete(year, completedFiles): continue
             yearInfo = {
-                'path': year.path,
-                'filename': year.name,
-                'sha': year.sha
+                'path': year['path'],
+                'filename': year['name'],
+                'sha': year['sha']
             }
             self.ccrYears[fileYear] = yearInfo
     
@@ -39,47 +67,251 @@ class CCRReader():
     
     def importYear(self, year):
         yearInfo = self.ccrYears[year]
-        print('Loading Year {}'.format(year))
-        cceFile = CCRFile(self.repo, yearInfo, self.dbManager.session)
-        cceFile.loadFileTSV()
-        cceFile.readRows()
-        self.dbManager.commitChanges()
+        logger.info('Loading renewals for %s', year)
+        cceFile = CCRFile(
+            self.source, yearInfo, self.dbManager.session, self.regIndex,
+            batchSize=self.batchSize, onBatch=self.commitBatch
+        )
+        self.manifest.startFile(yearInfo)
+        cceFile.resumeFrom(*self.manifest.resumeState(yearInfo))
+        if cceFile.resumePosition > 0:
+            logger.info(
+                'Resuming %s after row %d',
+                yearInfo['filename'], cceFile.resumePosition
+            )
+
+        try:
+            cceFile.loadFileTSV()
+            cceFile.readRows()
+            self.manifest.completeFile(
+                yearInfo, cceFile.counts, cceFile.position
+            )
+            self.dbManager.commitChanges()
+        except Exception as err:
+            self.dbManager.rollbackChanges()
+            self.manifest.failFile(yearInfo, err, *cceFile.committedState)
+            raise err
+
+        cceFile.progress.finish(**cceFile.counts)
+        for count, value in cceFile.counts.items():
+            metrics.increment('ccr.{}'.format(count), value)
+
+    def commitBatch(self, ccrFile):
+        """Commit a batch of renewals along with the position reached in the
+        file, recording the changed renewals before the session is cleared."""
+        self.recordChanges(ccrFile)
+        self.manifest.recordProgress(
+            ccrFile.ccrFile, ccrFile.counts, ccrFile.position
+        )
+        with metrics.timer('ccr.commit'):
+            self.dbManager.commitChanges()
+        ccrFile.clearBatch()
+
+    def relinkOrphans(self):
+        """Attempt to match all renewals currently flagged as orphans to a
+        registration, using the original registration data stored on each
+        renewal rather than re-reading the source files, so this does not
+        need a source to be configured. Orphans are read in pages of
+        batchSize ordered by id, and the links found for each page are
+        committed before the next is read, as a file is imported in batches."""
+        logger.info('Relinking orphan renewals')
+        ccrFile = CCRFile(None, None, self.dbManager.session, self.regIndex)
+        lastID = 0
+        while True:
+            with metrics.timer('ccr.prefetch'):
+                orphans = self.dbManager.session.query(Renewal)\
+                    .filter(Renewal.orphan == True)\
+                    .filter(Renewal.id > lastID)\
+                    .order_by(Renewal.id)\
+                    .options(selectinload(Renewal.registrations))\
+                    .limit(self.batchSize)\
+                    .all()
+            if len(orphans) < 1: break
+            lastID = orphans[-1].id
 
+            for orphan in orphans:
+                regnum, origDate = (orphan.reg_data or '|').rsplit('|', 1)
+                ccrFile.queueRegistrationMatch(orphan, regnum, origDate)
+            with metrics.timer('ccr.link'):
+                ccrFile.linkRegistrations()
+            self.recordChanges(ccrFile)
+            with metrics.timer('ccr.commit'):
+                self.dbManager.commitChanges()
+            ccrFile.clearBatch()
+            ccrFile.progress.batch(len(orphans))
+        ccrFile.progress.finish()
 
-class CCRFile():
-    def __init__(self, repo, ccrFile, session):
-        self.repo = repo
+    def recordChanges(self, ccrFile):
+        with metrics.timer('ccr.flush'):
+            self.dbManager.session.flush()
+        self.changes.addRenewals(r.id for r in ccrFile.changedRecords)
+        for renewalNum in ccrFile.removedRenewalNums:
+            self.changes.deleteRenewal(renewalNum)
+        self.pending.save(self.changes)
+
+
+class RegistrationIndex():
+    """An in-memory index of registration ids by registration number and
+    date, used to link renewals to registrations without a query per renewal.
+    Registrations are loaded on demand for the registration numbers that are
+    needed, and each number is only loaded once."""
+    batchSize = 5000
+
+    def __init__(self, session):
+        self.session = session
+        self.registrations = {}
+        self.loadedRegnums = set()
+
+    def load(self, regnums):
+        newRegnums = list(set(regnums) - self.loadedRegnums)
+        for i in range(0, len(newRegnums), RegistrationIndex.batchSize):
+            regBatch = newRegnums[i:i + RegistrationIndex.batchSize]
+            regQuery = self.session.query(
+                    Registration.id, Registration.regnum, Registration.reg_date
+                )\
+                .filter(Registration.regnum.in_(regBatch))\
+                .order_by(Registration.id)
+            for regID, regnum, regDate in regQuery.all():
+                self.registrations.setdefault((regnum, regDate), []).append(regID)
+            self.loadedRegnums.update(regBatch)
+
+    def lookup(self, regnum, regDate):
+        return self.registrations.get((regnum, regDate), [])
+
+
+class CCRFile(RecordFile):
+    def __init__(
+        self, source, ccrFile, session, regIndex=None, batchSize=1000,
+        onBatch=None
+    ):
+        self.source = source
         self.ccrFile = ccrFile
         self.session = session
+        self.batchSize = batchSize
+        self.onBatch = onBatch
+        self.regIndex = regIndex if regIndex else RegistrationIndex(session)
 
         self.rows = []
+        self.renewalMap = {}
+        self.pendingMatches = {}
+        self.position = 0
+        self.counts = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+        self.changedRecords = []
+        self.removedRenewalNums = []
+
+        self.resumePosition = 0
+        self.committedState = (dict(self.counts), 0)
+        self.progress = ProgressLogger(
+            logger, ccrFile['filename'] if ccrFile else 'CCR'
+        )
 
     def loadFileTSV(self):
-        yearBlob = self.repo.get_git_blob(self.ccrFile['sha'])
-        tsvString = base64.b64decode(yearBlob.content).decode('utf-8')
-        tsvFile = StringIO(tsvString)
+        tsvFile = TextIOWrapper(
+            self.source.openFile(self.ccrFile), encoding='utf-8', newline=''
+        )
         self.rows = csv.DictReader(tsvFile, delimiter='\t', quotechar='"')
     
-    def readRows(self):        
-        for row in self.rows: self.parseRow(row)
+    def readRows(self):
+        """Group the rows into batches, timing the reading of each row."""
+        batch = []
+        rows = iter(self.rows)
+        while True:
+            readStart = time.perf_counter()
+            row = next(rows, None)
+            metrics.addTime('ccr.read', time.perf_counter() - readStart)
+            if row is None: break
+
+            batch.append(row)
+            if len(batch) >= self.batchSize:
+                self.processBatch(batch)
+                batch = []
+        if len(batch) > 0: self.processBatch(batch)
+
+    def processBatch(self, batch):
+        """Prefetch the existing renewals for a batch of rows, parse them and
+        link them to their registrations, and hand the batch to onBatch to be
+        committed."""
+        with metrics.timer('ccr.prefetch'):
+            self.prefetchRenewals([r['entry_id'] for r in batch])
+        with metrics.timer('ccr.parse'):
+            for row in batch: self.parseRow(row)
+        with metrics.timer('ccr.link'):
+            self.linkRegistrations()
+
+        if self.onBatch: self.onBatch(self)
+        self.progress.batch(len(batch), position=self.position)
+
+    def clearBatch(self):
+        """Remove the committed batch from the session so that the session
+        does not grow with the size of the file."""
+        self.session.expunge_all()
+        self.renewalMap = {}
+        self.changedRecords = []
+        self.removedRenewalNums = []
+        self.committedState = (dict(self.counts), self.position)
+
+    def prefetchRenewals(self, uuids):
+        self.renewalMap.update(self.prefetchRecords(Renewal, uuids, [
+            selectinload(Renewal.registrations),
+            selectinload(Renewal.claimants)
+        ]))
 
     def parseRow(self, row):
+        self.position += 1
+        if self.position <= self.resumePosition:
+            # Committed by an earlier import of this file, reindex only
+            rec = self.matchRenewal(row['entry_id'])
+            if rec is not None: self.changedRecords.append(rec)
+            return
 
+        if uuidKey(row['entry_id']) is None:
+            # Renewals are matched and stored by uuid, so these cannot be
+            # told apart from each other
+            logger.warning(
+                'Skipping renewal %s with invalid entry_id %s',
+                row['id'], row['entry_id']
+            )
+            self.counts['errors'] += 1
+            return
+
+        contentHash = CCRFile.rowHash(row)
         rec = self.matchRenewal(row['entry_id'])
-        if rec: self.updateRenewal(rec, row)
-        else: self.createRenewal(row)
+        if rec and rec.content_hash == contentHash:
+            # Unchanged orphans may match registrations loaded since
+            if rec.orphan:
+                self.queueRegistrationMatch(rec, row['oreg'], row['odat'])
+            self.counts['skipped'] += 1
+        elif rec:
+            if rec.renewal_num != row['id']:
+                self.removedRenewalNums.append(rec.renewal_num)
+            self.updateRenewal(rec, row, contentHash)
+            self.counts['updated'] += 1
+            self.changedRecords.append(rec)
+        else:
+            self.createRenewal(row, contentHash)
+            self.counts['inserted'] += 1
+            self.changedRecords.append(self.matchRenewal(row['entry_id']))
 
-    def createRenewal(self, row):
+    @staticmethod
+    def rowHash(row):
+        """Hash a TSV row with its values stripped and its keys sorted, so
+        that unchanged rows can be skipped on re-import."""
+        normRow = {
+            str(k): v.strip() if isinstance(v, str) else v
+            for k, v in row.items()
+        }
+        return hashlib.sha256(
+            json.dumps(normRow, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def createRenewal(self, row, contentHash=None):
         title = CCRFile.cascadeFieldNameLoad('title', 'titl', row=row)
         renewalDateText = CCRFile.cascadeFieldNameLoad('rdat', 'dreg', row=row)
         source = CCRFile.cascadeFieldNameLoad('source', 'full_text', row=row)
         author = CCRFile.cascadeFieldNameLoad('author', 'auth', row=row)
         notes = CCRFile.cascadeFieldNameLoad('notes', 'note', row=row)
 
-        try:
-            renDate = datetime.strptime(renewalDateText, '%Y-%m-%d')
-        except ValueError:
-            renDate = None
+        renDate = parseFullDate(renewalDateText)
 
         renRec = Renewal(
             uuid=row['entry_id'],
@@ -93,7 +325,8 @@ class CCRFile():
             see_also_regs=row['see_also_reg'],
             see_also_rens=row['see_also_ren'],
             notes=notes,
-            source=source
+            source=source,
+            content_hash=contentHash
         )
 
         for numField in ['volume', 'part', 'number', 'page']:
@@ -103,14 +336,16 @@ class CCRFile():
                 row[numField] if row[numField] != '' else None
             )
 
-        self.matchRegistrations(renRec, row['oreg'], row['odat'])
+        self.queueRegistrationMatch(renRec, row['oreg'], row['odat'])
         renRec.addClaimants(row['claimants'])
 
         self.session.add(renRec)
-        print('INSERT', renRec)
+        self.renewalMap[uuidKey(row['entry_id'])] = renRec
+        logger.debug('Inserted renewal %s', row['entry_id'])
 
-    def updateRenewal(self, rec, row):
+    def updateRenewal(self, rec, row, contentHash=None):
         rec.uuid = row['entry_id']
+        rec.content_hash = contentHash
         rec.title = CCRFile.cascadeFieldNameLoad('title', 'titl', row=row)
         rec.source = CCRFile.cascadeFieldNameLoad('source', 'full_text', row=row)
         rec.author = CCRFile.cascadeFieldNameLoad('author', 'auth', row=row)
@@ -124,10 +359,7 @@ class CCRFile():
             rec.see_also_rens = row['see_also_ren']
 
         rec.renewal_date_text = CCRFile.cascadeFieldNameLoad('rdat', 'dreg', row=row)
-        try:
-            rec.renewal_date = datetime.strptime(rec.renewal_date_text, '%Y-%m-%d')
-        except ValueError:
-            rec.renewal_date = None
+        rec.renewal_date = parseFullDate(rec.renewal_date_text)
 
         for numField in ['volume', 'part', 'number', 'page']:
             setattr(
@@ -136,50 +368,70 @@ class CCRFile():
                 row[numField] if row[numField] != '' else None
             )
 
-        self.matchRegistrations(rec, row['oreg'], row['odat'])
+        self.queueRegistrationMatch(rec, row['oreg'], row['odat'])
         rec.updateClaimants(row['claimants'])
 
-        print('UPDATE', rec)
+        logger.debug('Updated renewal %s', row['entry_id'])
 
     def matchRenewal(self, uuid):
-        return self.session.query(Renewal).filter(Renewal.uuid == uuid).one_or_none()
+        return self.renewalMap.get(uuidKey(uuid), None)
 
-    def matchRegistrations(self, renRec, regnum, origDate):
-        if regnum is None or regnum.strip() == '': return
-        try:
-            checkDate = datetime.strptime(origDate, '%Y-%m-%d')
-        except ValueError:
-            checkDate = None
-        regnumQuery = self.session.query(Registration)\
-                .filter(Registration.regnum == regnum)\
-                .filter(Registration.reg_date == checkDate)
-        try:
-            origReg = regnumQuery.one_or_none()
-        except MultipleResultsFound:
-            origRegs = regnumQuery.all()
-
-            if len(origRegs) < 1:
-                origReg = None
-                seeAlsoRegs = regnumQuery.all()
-                renRec.see_also_regs = '{}|{}'.format(
-                    renRec.see_also_regs,
-                    '|'.join([ r.regnum for r in seeAlsoRegs ])
-                )
-            else:
-                origReg = origRegs[0]
-                if len(origRegs) > 1:
-                    renRec.see_also_regs = '{}|{}'.format(
-                        renRec.see_also_regs,
-                        '|'.join([ r.regnum for r in origRegs[1:] ])
-                    )
-
-        if origReg:
-            renRec.registrations.append(origReg)
+    def queueRegistrationMatch(self, renRec, regnum, origDate):
+        """Record a renewal's original registration to be linked once all rows
+        in the batch have been read. Registrations already linked to the
+        renewal are noted so that links are not duplicated, and a renewal that
+        is read more than once in a batch is only matched with its last row,
+        as a new renewal has no links to check against yet."""
+        regnum = normalizeRegnum(regnum)
+        if regnum is None or regnum == '': return
+        existingIDs = set(
+            r.id for r in renRec.registrations
+        ) if renRec.id is not None else set()
+        self.pendingMatches[id(renRec)] = (
+            renRec, regnum, origDate, existingIDs
+        )
+
+    def linkRegistrations(self):
+        """Match all queued renewals against the registration index and write
+        the new renewal_registration rows in a single batch."""
+        if len(self.pendingMatches) < 1: return
+        self.regIndex.load(set(m[1] for m in self.pendingMatches.values()))
+        self.session.flush()
+
+        newLinks = []
+        for match in self.pendingMatches.values():
+            matchLinks = self.matchRegistrations(*match)
+            if len(matchLinks) > 0: self.changedRecords.append(match[0])
+            newLinks.extend(matchLinks)
+        if len(newLinks) > 0: self.session.execute(RENEWAL_REG.insert(), newLinks)
+
+        self.pendingMatches = {}
+
+    def matchRegistrations(self, renRec, regnum, origDate, existingIDs):
+        regIDs = self.regIndex.lookup(regnum, CCRFile.parseOrigDate(origDate))
+
+        if len(regIDs) > 1:
+            renRec.see_also_regs = '{}|{}'.format(
+                renRec.see_also_regs,
+                '|'.join([regnum] * (len(regIDs) - 1))
+            )
+
+        if len(regIDs) > 0:
             renRec.orphan = False
-        else:
-            print('Matching Registration not found!')
-            if len(renRec.registrations) < 1:
-                renRec.orphan = True
+            if regIDs[0] in existingIDs: return []
+            return [{'renewal_id': renRec.id, 'registration_id': regIDs[0]}]
+
+        logger.debug(
+            'No registration found for %s on renewal %s',
+            regnum, renRec.renewal_num
+        )
+        if len(existingIDs) < 1:
+            renRec.orphan = True
+        return []
+
+    @staticmethod
+    def parseOrigDate(origDate):
+        return parseFullDate(origDate)
 
     @staticmethod
     def cascadeFieldNameLoad(*fields, row=None):
@@ -188,5 +440,5 @@ class CCRFile():
                 return row[field]
             except KeyError:
                 pass
-        print('No matching field found!')
+        logger.warning('None of the fields %s found in row', fields)
         raise KeyError
@@ -1,38 +1,133 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import URL
 from sqlalchemy.orm import sessionmaker
 
+from helpers.logger import createLogger
 from model.core import Base
+from model.dataGeneration import DataGeneration
+
+logger = createLogger(__name__)
 
 class SessionManager():
-    def __init__(self, user=None, pswd=None, host=None, port=None, db=None):
+    def __init__(
+        self, user=None, pswd=None, host=None, port=None, db=None,
+        poolSize=None, maxOverflow=None, poolTimeout=None, poolRecycle=None,
+        prePing=None, statementTimeout=None, executemanyMode=None
+    ):
         self.user = user if user else os.environ.get('DB_USER', None)
         self.pswd = pswd if pswd else os.environ.get('DB_PSWD', None)
         self.host = host if host else os.environ.get('DB_HOST', None)
         self.port = port if port else os.environ.get('DB_PORT', None)
         self.db = db if db else os.environ.get('DB_NAME', None)
-        
+
+        self.poolSize = int(
+            poolSize or os.environ.get('DB_POOL_SIZE', 10)
+        )
+        self.maxOverflow = int(
+            maxOverflow or os.environ.get('DB_MAX_OVERFLOW', 20)
+        )
+        self.poolTimeout = int(
+            poolTimeout or os.environ.get('DB_POOL_TIMEOUT', 30)
+        )
+        self.poolRecycle = int(
+            poolRecycle or os.environ.get('DB_POOL_RECYCLE', 1800)
+        )
+        self.prePing = SessionManager.envFlag(
+            prePing, 'DB_POOL_PRE_PING', True
+        )
+        self.statementTimeout = int(
+            statementTimeout or os.environ.get('DB_STATEMENT_TIMEOUT', 0)
+        )
+        self.executemanyMode = executemanyMode or os.environ.get(
+            'DB_EXECUTEMANY_MODE', 'values_plus_batch'
+        )
+
         self.engine = None
         self.session = None
-    
+
+    @staticmethod
+    def envFlag(value, envVar, default):
+        if value is not None: return value
+        envValue = os.environ.get(envVar, None)
+        if envValue is None: return default
+        return envValue.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    def databaseURL(self):
+        return URL.create(
+            'postgresql+psycopg2',
+            username=self.user,
+            password=self.pswd,
+            host=self.host,
+            port=int(self.port) if self.port else None,
+            database=self.db
+        )
+
+    def engineOptions(self):
+        """Keyword arguments for create_engine, shared by the loader and the
+        API so that both use the same pool and connection settings.
+
+        A statement timeout of 0 leaves the server default in place."""
+        options = {
+            'pool_size': self.poolSize,
+            'max_overflow': self.maxOverflow,
+            'pool_timeout': self.poolTimeout,
+            'pool_recycle': self.poolRecycle,
+            'pool_pre_ping': self.prePing,
+            'executemany_mode': self.executemanyMode
+        }
+        if self.statementTimeout > 0:
+            options['connect_args'] = {
+                'options': '-c statement_timeout={}'.format(
+                    self.statementTimeout
+                )
+            }
+        return options
+
     def generateEngine(self):
         try:
             self.engine = create_engine(
-                'postgresql://{}:{}@{}:{}/{}'.format(
-                    self.user,
-                    self.pswd,
-                    self.host,
-                    self.port,
-                    self.db
-                )
+                self.databaseURL(), **self.engineOptions()
             )
         except Exception as e:
             raise e
 
     def initializeDatabase(self, reinit=False):
-        if reinit: Base.metadata.drop_all(self.engine, checkfirst=True)
-        if not self.engine.dialect.has_table(self.engine, 'cce'):
-            Base.metadata.create_all(self.engine)
+        """Create any missing tables, first dropping every table if reinit
+        is set. The data_generation table is kept, as the generation must
+        keep increasing across rebuilds for cached responses and ETags from
+        before the rebuild to be invalidated."""
+        if reinit:
+            Base.metadata.drop_all(
+                self.engine,
+                tables=[
+                    t for t in Base.metadata.sorted_tables
+                    if t is not DataGeneration.__table__
+                ],
+                checkfirst=True
+            )
+        Base.metadata.create_all(self.engine)
+        self.addMissingColumns()
+
+    def addMissingColumns(self):
+        """Add any columns defined on the models that are missing from
+        existing tables, so that new columns can be added without rebuilding
+        the database. New columns are always added as nullable."""
+        dbInspector = inspect(self.engine)
+        quoteName = self.engine.dialect.identifier_preparer.quote
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = set(
+                    c['name'] for c in dbInspector.get_columns(table.name)
+                )
+                for column in table.columns:
+                    if column.name in existing: continue
+                    logger.info('Adding column %s.%s', table.name, column.name)
+                    conn.execute(text('ALTER TABLE {} ADD COLUMN {} {}'.format(
+                        quoteName(table.name),
+                        quoteName(column.name),
+                        column.type.compile(dialect=self.engine.dialect)
+                    )))
 
     def createSession(self, autoflush=True):
         if not self.engine: self.generateEngine()
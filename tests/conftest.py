@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# model.elastic reads the index names when it is imported
+os.environ.setdefault('ES_CCE_INDEX', 'test_cce')
+os.environ.setdefault('ES_CCR_INDEX', 'test_ccr')
+
+from benchmarks.database import createSession
+from benchmarks.generators import writeSource
+from helpers.sources import LocalSource
+from sessionManager import SessionManager
+
+
+@pytest.fixture
+def session():
+    session = createSession('sqlite://')
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def manager(session):
+    manager = SessionManager()
+    manager.session = session
+    return manager
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A generated source with one volume of 12 entries and 8 renewals."""
+    writeSource(str(tmp_path), 1, 12, 8, seed=1)
+    return LocalSource(str(tmp_path))
+
+
+def fileInfo(source, path):
+    info = dict(source.listDir(os.path.dirname(path))[0])
+    info['filename'] = info['name']
+    return info
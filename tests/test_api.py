@@ -0,0 +1,82 @@
+from flask import Flask
+import pytest
+
+from api.cache import cache
+from api.db import db
+from api.prints import uuid
+from benchmarks.database import createSession
+from helpers.generation import GenerationManager
+from model.cce import CCE
+from model.dataGeneration import DataGeneration
+from sessionManager import SessionManager
+
+from test_builder import importVolume
+
+
+@pytest.fixture
+def dbSession(tmp_path, source):
+    dbSession = createSession('sqlite:///{}'.format(tmp_path / 'api.db'))
+    importVolume(dbSession, source)
+    GenerationManager(dbSession).advance()
+    yield dbSession
+    dbSession.close()
+
+
+@pytest.fixture
+def client(tmp_path, dbSession, monkeypatch):
+    monkeypatch.setenv('API_CACHE_GENERATION_INTERVAL', '0')
+    app = Flask(__name__)
+    app.register_blueprint(uuid.uuid)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite+benchmark:///{}'.format(
+        tmp_path / 'api.db'
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    cache.init_app(app)
+    cache.generationChecked = None
+    return app.test_client()
+
+
+def test_lookupAnswersConditionalRequests(client, dbSession):
+    entryURL = '/registration/{}'.format(dbSession.query(CCE).first().uuid)
+
+    firstResp = client.get(entryURL)
+    assert firstResp.status_code == 200
+    etag = firstResp.headers['ETag']
+    assert etag.startswith('W/"gen-1-')
+    assert firstResp.headers['Last-Modified']
+
+    notModified = client.get(entryURL, headers={'If-None-Match': etag})
+    assert notModified.status_code == 304
+    assert notModified.data == b''
+    assert notModified.headers['ETag'] == etag
+
+    sinceResp = client.get(entryURL, headers={
+        'If-Modified-Since': firstResp.headers['Last-Modified']
+    })
+    assert sinceResp.status_code == 304
+
+    GenerationManager(dbSession).advance()
+    modified = client.get(entryURL, headers={'If-None-Match': etag})
+    assert modified.status_code == 200
+    assert modified.headers['ETag'].startswith('W/"gen-2-')
+
+
+def test_etag_changes_after_reinitialize(client, dbSession, source):
+    entryURL = '/registration/{}'.format(dbSession.query(CCE).first().uuid)
+    etag = client.get(entryURL).headers['ETag']
+
+    # A database recreated from scratch starts its generation at 1 again
+    manager = SessionManager()
+    manager.engine = dbSession.get_bind()
+    manager.session = dbSession
+    manager.initializeDatabase(reinit=True)
+    dbSession.query(DataGeneration).delete()
+    dbSession.commit()
+    importVolume(dbSession, source)
+    assert GenerationManager(dbSession).advance() == 1
+
+    entryURL = '/registration/{}'.format(dbSession.query(CCE).first().uuid)
+    rebuilt = client.get(entryURL, headers={'If-None-Match': etag})
+    assert rebuilt.status_code == 200
+    assert rebuilt.headers['ETag'] != etag
@@ -0,0 +1,131 @@
+from functools import partial
+import logging
+import os
+from uuid import UUID
+
+from lxml import etree
+
+from benchmarks.database import createManager
+from benchmarks.generators import writeSource
+from benchmarks.loader import commitBatch
+from builder import CCEFile, CCEReader
+from helpers.sources import LocalSource
+from model.cce import CCE
+from model.volume import Volume
+
+from conftest import fileInfo
+
+
+def importVolume(session, source, resumePosition=0, onBatch=commitBatch):
+    cceFile = CCEFile(
+        source, fileInfo(source, 'xml/1950/1950-v00.xml'), session,
+        batchSize=5, onBatch=onBatch
+    )
+    cceFile.resumeFrom(resumePosition, {})
+    cceFile.loadFileXML()
+    cceFile.readXML()
+    session.commit()
+    return cceFile
+
+
+def test_resumedImportReusesVolume(session, source):
+    importVolume(session, source)
+    importVolume(session, source, resumePosition=4)
+
+    volumes = session.query(Volume).all()
+    assert len(volumes) == 1
+    assert volumes[0].path == 'xml/1950/1950-v00.xml'
+    assert set(e.volume_id for e in session.query(CCE).all()) == {volumes[0].id}
+
+
+def test_unchangedEntriesAreSkippedOnReimport(session, source):
+    importVolume(session, source)
+    volumePath = os.path.join(source.root, 'xml', '1950', '1950-v00.xml')
+    with open(volumePath, 'r', encoding='utf-8') as volumeFile:
+        volumeXML = volumeFile.read()
+    with open(volumePath, 'w', encoding='utf-8') as volumeFile:
+        volumeFile.write(volumeXML.replace('<title>', '<title>Revised ', 1))
+
+    changedIDs = []
+    def recordChanges(cceFile):
+        session.flush()
+        changedIDs.extend(cceFile.changedIDs())
+        commitBatch(cceFile)
+    cceFile = importVolume(session, source, onBatch=recordChanges)
+
+    assert cceFile.counts == {
+        'inserted': 0, 'updated': 1, 'skipped': 11, 'errors': 0
+    }
+    revised = session.query(CCE).filter(CCE.title.startswith('Revised')).one()
+    assert changedIDs == [revised.id]
+
+    assert importVolume(session, source).counts['skipped'] == 12
+
+
+def importYears(manager, source, workers, workerManager=None):
+    reader = CCEReader(
+        manager, source=source, workers=workers, batchSize=5,
+        workerManager=workerManager
+    )
+    reader.loadYears(None)
+    reader.getYearFiles(None)
+    reader.importYearData()
+    manager.session.commit()
+    return reader
+
+
+def test_groupFilesKeepsSharedUUIDsTogether():
+    yearFiles = ['a', 'b', 'c', 'd']
+    fileEntries = [{'u1'}, {'u2'}, {'u3', 'u1'}, {'u2', 'u4'}]
+
+    assert CCEReader.groupFiles(yearFiles, fileEntries) == [
+        ['a', 'c'], ['b', 'd']
+    ]
+    assert CCEReader.groupFiles(yearFiles, [{'u1'}, {'u2'}, {'u1', 'u2'}, set()])\
+        == [['a', 'b', 'c'], ['d']]
+
+
+def test_parallelImportMatchesSequentialWithSharedUUID(tmp_path):
+    writeSource(str(tmp_path / 'source'), 3, 6, 0, seed=2)
+    source = LocalSource(str(tmp_path / 'source'))
+    firstPath = tmp_path / 'source' / 'xml' / '1950' / '1950-v00.xml'
+    lastPath = tmp_path / 'source' / 'xml' / '1950' / '1950-v02.xml'
+    sharedID = etree.parse(str(firstPath)).find('.//copyrightEntry').get('id')
+    lastXML = etree.parse(str(lastPath))
+    lastXML.find('.//copyrightEntry').set('id', sharedID)
+    lastXML.write(str(lastPath), encoding='utf-8', xml_declaration=True)
+
+    results = {}
+    for workers in (1, 2):
+        dbURL = 'sqlite:///{}'.format(tmp_path / 'w{}.db'.format(workers))
+        manager = createManager(dbURL)
+        reader = importYears(
+            manager, source, workers, partial(createManager, dbURL)
+        )
+        sharedRecs = manager.session.query(CCE)\
+            .filter(CCE.uuid == UUID(sharedID)).all()
+        assert len(sharedRecs) == 1
+        results[workers] = (
+            sorted(str(e.uuid) for e in manager.session.query(CCE).all()),
+            sharedRecs[0].title,
+            len(reader.changes)
+        )
+        manager.session.close()
+
+    assert results[2] == results[1]
+    assert len(results[1][0]) == 17
+
+
+def test_eachBatchIsLogged(session, source, caplog):
+    caplog.set_level(logging.INFO, logger='builder')
+    importVolume(session, source)
+
+    batchRecords = [
+        r.fields for r in caplog.records if 'batch' in getattr(r, 'fields', {})
+    ]
+    assert [f['batch'] for f in batchRecords] == [1, 2, 3]
+    assert sum(f['records'] for f in batchRecords) == 12
+    for fields in batchRecords:
+        assert fields['label'] == '1950-v00.xml'
+        assert fields['seconds'] >= 0
+        assert fields['rssMB'] > 0 and fields['peakRssMB'] > 0
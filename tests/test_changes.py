@@ -0,0 +1,22 @@
+from helpers.changes import ChangeSet, PendingChanges
+
+
+def test_pendingChangesAreReplayedUntilCleared(session):
+    changes = ChangeSet()
+    changes.addEntries([1, 2])
+    changes.addRenewals([3])
+    changes.deleteRenewal('R100')
+    pending = PendingChanges(session)
+    pending.save(changes)
+    changes.addEntries([4])
+    pending.save(changes)
+    session.commit()
+
+    replayed = ChangeSet()
+    assert PendingChanges(session).load(replayed) == 5
+    assert replayed.entryIDs == {1, 2, 4}
+    assert replayed.renewalIDs == {3}
+    assert replayed.deletedRenewals == {'R100'}
+
+    PendingChanges(session).clear()
+    assert PendingChanges(session).load(ChangeSet()) == 0
@@ -0,0 +1,23 @@
+import pytest
+
+from helpers.dates import normalizeDate, parseFullDate
+
+
+@pytest.mark.parametrize('dateText, normalized', [
+    ('1950', '1950-01-01'),
+    ('1950-02', '1950-02-01'),
+    ('1950-2-5', '1950-02-05'),
+    ('1950-02-28', '1950-02-28'),
+    (None, None),
+    ('n.d.', None)
+])
+def test_normalizeDate(dateText, normalized):
+    assert normalizeDate(dateText) == normalized
+
+
+@pytest.mark.parametrize('dateText', [
+    '1950-02-30', '1950-13-01', '1950-00-00', '1950-13', '1950-04-31', '0000'
+])
+def test_invalidDatesAreNotNormalized(dateText):
+    assert normalizeDate(dateText) is None
+    assert parseFullDate(dateText) is None
@@ -0,0 +1,43 @@
+from benchmarks.documents import StubIndexer
+from benchmarks.loader import commitBatch
+from builder import CCEFile
+from esIndexer import ESIndexer
+from helpers.changes import ChangeSet
+
+from conftest import fileInfo
+
+
+def loadEntries(session, source):
+    cceFile = CCEFile(
+        source, fileInfo(source, 'xml/1950/1950-v00.xml'), session,
+        batchSize=5, onBatch=commitBatch
+    )
+    cceFile.loadFileXML()
+    cceFile.readXML()
+    session.commit()
+
+
+def test_retrieveRecordsPagesThroughAllRecords(
+    manager, source, monkeypatch
+):
+    loadEntries(manager.session, source)
+    monkeypatch.setattr(ESIndexer, 'pageSize', 5)
+
+    recIDs = [r.id for r in StubIndexer(manager, None).retrieveEntries()]
+
+    assert len(recIDs) == 12
+    assert recIDs == sorted(set(recIDs))
+
+
+def test_retrieveRecordsPagesThroughChangedRecords(
+    manager, source, monkeypatch
+):
+    loadEntries(manager.session, source)
+    monkeypatch.setattr(ESIndexer, 'pageSize', 5)
+    changes = ChangeSet()
+    changes.addEntries(range(2, 10))
+
+    indexer = StubIndexer(manager, None, changes=changes)
+    recIDs = [r.id for r in indexer.retrieveEntries()]
+
+    assert recIDs == list(range(2, 10))
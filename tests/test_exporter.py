@@ -0,0 +1,67 @@
+import csv
+import gzip
+from io import StringIO
+import json
+
+import pytest
+
+from exporter import Exporter
+from model.cce import CCE
+from model.renewal import Renewal
+
+from test_renBuilder import readRenewals
+from test_builder import importVolume
+
+
+@pytest.fixture
+def loaded(session, source):
+    importVolume(session, source)
+    readRenewals(session, source)
+    return session
+
+
+def test_tableExportAsNDJSON(loaded):
+    lines = list(Exporter(loaded, 'cce', 'ndjson').lines())
+
+    records = [json.loads(line) for line in lines]
+    assert len(records) == loaded.query(CCE).count()
+    assert [r['id'] for r in records] == sorted(r['id'] for r in records)
+    assert set(records[0].keys()) == set(c.name for c in CCE.__table__.columns)
+
+
+def test_tableExportAsCSV(loaded):
+    output = ''.join(Exporter(loaded, 'renewal', 'csv').lines())
+
+    rows = list(csv.DictReader(StringIO(output)))
+    assert len(rows) == loaded.query(Renewal).count()
+    assert list(rows[0].keys()) == [c.name for c in Renewal.__table__.columns]
+
+
+def test_linkedExportIncludesOrphanRenewals(loaded):
+    records = [
+        json.loads(line) for line in Exporter(loaded, 'linked').lines()
+    ]
+
+    entries = [r for r in records if r['type'] == 'registration']
+    orphans = [r for r in records if r['type'] == 'renewal']
+    assert len(entries) == loaded.query(CCE).count()
+    assert len(orphans) == loaded.query(Renewal)\
+        .filter(~Renewal.registrations.any()).count()
+    linked = sum(len(e['renewals']) for e in entries)
+    assert linked + len(orphans) >= loaded.query(Renewal).count()
+
+
+def test_gzippedExportMatchesPlainExport(loaded, tmp_path):
+    plainPath = str(tmp_path / 'cce.ndjson')
+    gzipPath = str(tmp_path / 'cce.ndjson.gz')
+    Exporter(loaded, 'cce').writeFile(plainPath)
+    Exporter(loaded, 'cce').writeFile(gzipPath)
+
+    with open(plainPath, 'rb') as plainFile:
+        with gzip.open(gzipPath, 'rb') as gzipFile:
+            assert gzipFile.read() == plainFile.read()
+
+
+def test_linkedExportRejectsCSV(loaded):
+    with pytest.raises(ValueError):
+        Exporter(loaded, 'linked', 'csv')
@@ -0,0 +1,19 @@
+from helpers.generation import GenerationManager
+from model.cce import CCE
+
+from test_builder import importVolume
+
+
+def test_generation_survives_reinitialize(manager, source):
+    importVolume(manager.session, source)
+    generations = GenerationManager(manager.session)
+    generations.advance()
+    generations.advance()
+
+    manager.engine = manager.session.get_bind()
+    manager.session.close()
+    manager.initializeDatabase(reinit=True)
+
+    assert manager.session.query(CCE).count() == 0
+    assert generations.current()[0] == 2
+    assert generations.advance() == 3
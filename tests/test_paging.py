@@ -0,0 +1,87 @@
+import pytest
+from elasticsearch_dsl import Search
+from elasticsearch_dsl.response import Response as SearchResponse
+from werkzeug.exceptions import BadRequest
+
+from api.elastic import Elastic
+from api.response import MultiResponse
+
+
+def searchResponse(sortValues):
+    search = Search(index='cce')
+    return SearchResponse(search, {'hits': {
+        'total': len(sortValues),
+        'hits': [
+            {
+                '_index': 'cce', '_type': 'doc', '_id': str(i),
+                '_score': sort[0], '_source': {}, 'sort': sort
+            }
+            for i, sort in enumerate(sortValues)
+        ]
+    }})
+
+
+def cursorResponse(cursor, perPage=2):
+    return MultiResponse(
+        'text', 10, '/search/fulltext', 'war', 0, perPage, cursor=cursor
+    )
+
+
+def test_paginate_by_page_number():
+    body = Elastic.paginate(Search(index='cce'), 2, 10).to_dict()
+
+    assert body['from'] == 20
+    assert body['size'] == 10
+    assert 'sort' not in body
+    assert 'search_after' not in body
+
+
+def test_paginate_with_cursor():
+    first = Elastic.paginate(Search(index='cce'), 5, 10, cursor=[]).to_dict()
+    assert first['sort'] == ['_score', {'uuid': 'asc'}]
+    assert first['size'] == 10
+    assert first.get('from', 0) == 0
+    assert 'search_after' not in first
+
+    after = Elastic.paginate(
+        Search(index='cce'), 5, 10, cursor=[1.5, 'abc']
+    ).to_dict()
+    assert after['search_after'] == [1.5, 'abc']
+    assert after.get('from', 0) == 0
+
+
+def test_cursor_round_trip():
+    sortValues = [2.25, '3f1c0a9e-uuid']
+    cursor = MultiResponse.encodeCursor(sortValues)
+
+    assert '=' not in cursor
+    assert MultiResponse.parseCursor({'cursor': cursor}) == sortValues
+    assert MultiResponse.parseCursor({'cursor': '*'}) == []
+    assert MultiResponse.parseCursor({}) is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!', MultiResponse.encodeCursor({'sort': 1})
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(BadRequest):
+        MultiResponse.parseCursor({'cursor': cursor})
+
+
+def test_cursor_paging_links():
+    response = cursorResponse([])
+    response.setNextCursor(searchResponse([[3.0, 'a'], [2.0, 'b']]))
+    paging = response.createPaging()
+
+    assert paging['first'] == '/search/fulltext?query=war&cursor=*&per_page=2'
+    assert paging['previous'] is None
+    assert paging['last'] is None
+    nextCursor = paging['next'].split('cursor=')[1].split('&')[0]
+    assert MultiResponse.parseCursor({'cursor': nextCursor}) == [2.0, 'b']
+
+
+def test_short_cursor_page_is_last():
+    response = cursorResponse(['x'])
+    response.setNextCursor(searchResponse([[1.0, 'c']]))
+
+    assert response.createPaging()['next'] is None
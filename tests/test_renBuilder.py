@@ -0,0 +1,117 @@
+from sqlalchemy import func, select
+
+from benchmarks.loader import commitBatch
+from model.registration import Registration
+from model.renewal import Renewal, RENEWAL_REG
+from renBuilder import CCRFile, CCRReader
+
+from conftest import fileInfo
+from test_builder import importVolume
+
+
+def readRenewals(session, source, rows=None):
+    ccrFile = CCRFile(
+        source, fileInfo(source, 'data/1977-from-db.tsv'), session,
+        batchSize=100, onBatch=commitBatch
+    )
+    ccrFile.loadFileTSV()
+    if rows is not None: ccrFile.rows = rows(list(ccrFile.rows))
+    ccrFile.readRows()
+    session.commit()
+    return ccrFile
+
+
+def linkCount(session):
+    return session.execute(
+        select(func.count()).select_from(RENEWAL_REG)
+    ).scalar()
+
+
+def test_repeatedRenewalInBatchIsLinkedOnce(session, source):
+    importVolume(session, source)
+    regnums = set(r for r, in session.query(Registration.regnum).all())
+
+    def repeatMatchedRow(rows):
+        matched = [r for r in rows if r['oreg'] in regnums][0]
+        return rows + [dict(matched, title='Corrected title')]
+    readRenewals(session, source, repeatMatchedRow)
+
+    linkedRows = session.execute(
+        select(RENEWAL_REG.c.renewal_id, func.count())
+            .group_by(RENEWAL_REG.c.renewal_id)
+    ).all()
+    assert len(linkedRows) > 0
+    assert all(count == 1 for _, count in linkedRows)
+
+
+def test_relinkOrphansWithoutSource(manager, source, monkeypatch):
+    monkeypatch.delenv('CCR_REPO', raising=False)
+    monkeypatch.delenv('CCR_SOURCE_PATH', raising=False)
+    session = manager.session
+    readRenewals(session, source)
+    assert linkCount(session) == 0
+    assert session.query(Renewal).filter(Renewal.orphan == False).count() == 0
+
+    importVolume(session, source)
+    reader = CCRReader(manager)
+    reader.relinkOrphans()
+
+    linked = session.query(Renewal).filter(Renewal.orphan == False).all()
+    assert len(linked) > 0
+    assert linkCount(session) == len(linked)
+    assert reader.changes.renewalIDs == set(r.id for r in linked)
+
+
+def test_relinkOrphansInBatches(manager, source, monkeypatch):
+    session = manager.session
+    readRenewals(session, source)
+    importVolume(session, source)
+
+    batchSizes = []
+    linkRegistrations = CCRFile.linkRegistrations
+    def recordBatch(ccrFile):
+        batchSizes.append(len(ccrFile.pendingMatches))
+        linkRegistrations(ccrFile)
+    monkeypatch.setattr(CCRFile, 'linkRegistrations', recordBatch)
+    reader = CCRReader(manager, batchSize=3)
+    reader.relinkOrphans()
+
+    assert len(batchSizes) == 3
+    assert max(batchSizes) <= 3
+    linked = session.query(Renewal).filter(Renewal.orphan == False).all()
+    assert len(linked) > 0
+    assert linkCount(session) == len(linked)
+    assert reader.changes.renewalIDs == set(r.id for r in linked)
+
+
+def test_renewalsWithInvalidEntryIDsAreSkipped(session, source):
+    def invalidateEntryIDs(rows):
+        rows[0]['entry_id'] = 'not-a-uuid'
+        rows[1]['entry_id'] = ''
+        return rows
+    ccrFile = readRenewals(session, source, invalidateEntryIDs)
+
+    assert ccrFile.counts == {
+        'inserted': 6, 'updated': 0, 'skipped': 0, 'errors': 2
+    }
+    assert session.query(Renewal).count() == 6
+
+
+def test_unchangedRenewalsAreSkippedOnReimport(session, source):
+    readRenewals(session, source)
+    hashes = dict(session.query(Renewal.uuid, Renewal.content_hash).all())
+
+    def reviseFirstRow(rows):
+        rows[0]['title'] = 'Revised {}'.format(rows[0]['title'])
+        return rows
+    ccrFile = readRenewals(session, source, reviseFirstRow)
+
+    assert ccrFile.counts == {
+        'inserted': 0, 'updated': 1, 'skipped': 7, 'errors': 0
+    }
+    changed = [
+        r for r in session.query(Renewal).all()
+        if hashes[r.uuid] != r.content_hash
+    ]
+    assert len(changed) == 1
+    assert changed[0].title.startswith('Revised')
@@ -0,0 +1,81 @@
+import json
+
+from sqlalchemy.orm import selectinload
+
+from api.prints import search
+from api.response import MultiResponse
+from esIndexer import ESDoc, ESRen
+from helpers.serialize import entryOptions
+from model.cce import CCE
+from model.registration import Registration
+from model.renewal import Renewal
+
+from test_exporter import loaded
+
+
+def normalize(results):
+    return json.loads(json.dumps(results, default=str))
+
+
+def entryDoc(entry):
+    esEntry = ESDoc(entry)
+    esEntry.indexEntry()
+    return esEntry.entry
+
+
+def renewalDoc(renewal):
+    esRen = ESRen(renewal)
+    esRen.indexRen()
+    return esRen.renewal
+
+
+def loadRenewals(session):
+    return session.query(Renewal)\
+        .options(
+            selectinload(Renewal.claimants),
+            selectinload(Renewal.registrations)
+                .selectinload(Registration.cce)
+                .options(*entryOptions())
+        )\
+        .order_by(Renewal.id).all()
+
+
+def test_liteEntriesMatchFullEntries(loaded):
+    entries = loaded.query(CCE).options(*entryOptions(xml=True)).all()
+
+    assert normalize([
+        MultiResponse.parseEntryDoc(entryDoc(e)) for e in entries
+    ]) == normalize([MultiResponse.parseEntry(e) for e in entries])
+
+    # The entry XML is not indexed, only the source of its renewals
+    fullEntries = [MultiResponse.parseEntry(e, xml=True) for e in entries]
+    for fullEntry in fullEntries: del fullEntry['xml']
+    assert normalize([
+        MultiResponse.parseEntryDoc(entryDoc(e), source=True) for e in entries
+    ]) == normalize(fullEntries)
+
+
+def test_liteRenewalsMatchFullRenewals(loaded, monkeypatch):
+    renewals = loadRenewals(loaded)
+    entryDocs = {
+        e.uuid: entryDoc(e)
+        for e in loaded.query(CCE).options(*entryOptions()).all()
+    }
+    monkeypatch.setattr(
+        search.elastic, 'query_uuids',
+        lambda index, uuids: [entryDocs[u] for u in uuids]
+    )
+    renewalDocs = [renewalDoc(r) for r in renewals]
+
+    liteResults = search.parseLiteRenewals(renewalDocs)
+    fullResults = [
+        result for r in renewals for result in search.parseRetRenewal(r)
+    ]
+    assert any(r.get('type') == 'renewal' for r in fullResults)
+    assert any(r.get('type') != 'renewal' for r in fullResults)
+    assert normalize(liteResults) == normalize(fullResults)
+
+    orphan = [r for r in renewals if len(r.registrations) == 0][0]
+    assert MultiResponse.parseRenewalDoc(
+        renewalDoc(orphan), source=True
+    ) == MultiResponse.parseRenewal(orphan, source=True)
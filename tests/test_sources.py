@@ -0,0 +1,38 @@
+import io
+import os
+import tarfile
+from datetime import datetime, timedelta, timezone
+
+from helpers.sources import LocalSource, TarballSource
+
+
+def writeTarball(path, files, mtime):
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo('repo-main/{}'.format(name))
+            info.size = len(data)
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(data))
+
+
+def test_tarball_lists_every_file_regardless_of_mtime(tmp_path):
+    path = str(tmp_path / 'repo.tar.gz')
+    writeTarball(path, {'xml/a.xml': b'<a/>'}, 0)
+    source = TarballSource(path)
+
+    since = datetime.now(timezone.utc)
+    assert source.changedPaths('xml', since) is None
+    assert [f['path'] for f in source.listDir('xml')] == ['xml/a.xml']
+
+
+def test_local_changed_paths_compare_utc_times(tmp_path):
+    os.makedirs(str(tmp_path / 'xml'))
+    filePath = str(tmp_path / 'xml' / 'a.xml')
+    with open(filePath, 'w') as xmlFile: xmlFile.write('<a/>')
+    source = LocalSource(str(tmp_path))
+
+    hourAgo = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert source.changedPaths('xml', hourAgo) == {'xml/a.xml'}
+    assert source.changedPaths('xml', hourAgo + timedelta(hours=2)) == set()
+    localHourAgo = datetime.now() - timedelta(hours=1)
+    assert source.changedPaths('xml', localHourAgo) == {'xml/a.xml'}